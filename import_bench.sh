@@ -0,0 +1,46 @@
+#!/bin/bash
+
+# Cold-import benchmark for rgwml. Fails if `import rgwml` gets slower than the
+# budget or starts pulling in heavy optional dependencies at import time.
+
+# Budget in seconds for the fastest of N cold imports (override via env)
+MAX_IMPORT_SECONDS="${MAX_IMPORT_SECONDS:-1.0}"
+RUNS="${RUNS:-5}"
+
+# Run from the src directory so the working tree is benchmarked, not an installed copy
+cd "$(dirname "$0")/src" || exit 1
+
+python3 - "$MAX_IMPORT_SECONDS" "$RUNS" <<'EOF'
+import subprocess
+import sys
+
+max_seconds = float(sys.argv[1])
+runs = int(sys.argv[2])
+
+probe = """
+import sys, time
+start = time.perf_counter()
+import rgwml
+elapsed = time.perf_counter() - start
+heavy = ['xgboost', 'sklearn', 'matplotlib', 'seaborn', 'scipy', 'openai', 'requests_html',
+         'slack_sdk', 'google.cloud.bigquery', 'pandas_gbq', 'flask', 'googleapiclient',
+         'clickhouse_connect', 'pymssql', 'mysql.connector', 'PIL', 'tqdm', 'requests']
+print(elapsed)
+print(','.join(name for name in heavy if name in sys.modules))
+"""
+
+timings = []
+for _ in range(runs):
+    output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True).stdout.split('\n')
+    timings.append(float(output[0]))
+    loaded = output[1]
+    if loaded:
+        print(f"FAIL: import rgwml eagerly loaded: {loaded}")
+        sys.exit(1)
+
+best = min(timings)
+print(f"Cold import rgwml: best {best:.3f}s over {runs} runs (budget {max_seconds:.3f}s)")
+if best > max_seconds:
+    print("FAIL: import time regressed beyond budget")
+    sys.exit(1)
+EOF
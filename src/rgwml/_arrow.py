@@ -0,0 +1,215 @@
+import os
+import pandas as pd
+
+
+def _nullable_dtypes(pa):
+    """pandas nullable dtypes for Arrow integer and boolean types."""
+    return {
+        pa.int8(): pd.Int8Dtype(),
+        pa.int16(): pd.Int16Dtype(),
+        pa.int32(): pd.Int32Dtype(),
+        pa.int64(): pd.Int64Dtype(),
+        pa.uint8(): pd.UInt8Dtype(),
+        pa.uint16(): pd.UInt16Dtype(),
+        pa.uint32(): pd.UInt32Dtype(),
+        pa.uint64(): pd.UInt64Dtype(),
+        pa.bool_(): pd.BooleanDtype(),
+    }
+
+
+def _strings_mapper(pa):
+    """types_mapper keeping Arrow strings as pyarrow-backed pandas strings instead of objects."""
+    def mapper(arrow_type):
+        if pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type):
+            return pd.StringDtype('pyarrow')
+        return None
+    return mapper
+
+
+def to_pandas(table):
+    """Convert an Arrow table to a typed DataFrame with as few copies as possible.
+
+    Numeric columns without nulls and strings are wrapped rather than copied, blocks are not
+    consolidated, and integer/boolean columns holding nulls become pandas nullable dtypes
+    instead of falling back to float or object.
+    """
+    import pyarrow as pa
+
+    nullable_dtypes = _nullable_dtypes(pa)
+    names = table.column_names
+    nullable = []
+    if len(set(names)) == len(names):
+        nullable = [name for name in names if table.column(name).null_count and table.column(name).type in nullable_dtypes]
+
+    rest = table.select([name for name in names if name not in nullable]) if nullable else table
+    df = rest.to_pandas(types_mapper=_strings_mapper(pa), split_blocks=True)
+    if not nullable:
+        return df
+
+    for name in nullable:
+        df[name] = table.column(name).to_pandas(types_mapper=nullable_dtypes.get)
+    return df[names]
+
+
+def write_batches(path, batches, schema=None):
+    """Write record batches to an uncompressed Arrow IPC file as they arrive, returning the row count.
+
+    schema is written when no batch arrives, so an empty result keeps its columns.
+    """
+    import pyarrow as pa
+
+    writer = None
+    rows = 0
+    try:
+        for batch in batches:
+            if writer is None:
+                writer = pa.ipc.new_file(path, batch.schema)
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        pa.ipc.new_file(path, schema if schema is not None else pa.schema([])).close()
+    return rows
+
+
+def read_mapped(path, columns=None):
+    """Memory-map an Arrow IPC file into an Arrow-backed DataFrame whose columns stay in the OS page cache.
+
+    Buffers of an uncompressed file are used in place, so loading is near-instant and processes
+    mapping the same file share its pages; compressed files are decompressed into memory.
+    """
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    if columns is not None:
+        table = table.select(list(columns))
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def write_ipc(df, path):
+    """Write a DataFrame as an uncompressed Arrow IPC file that read_mapped can map without copying.
+
+    The file is written beside path and renamed over it, so processes still mapping the old
+    file keep reading it instead of crashing on a truncated mapping.
+    """
+    import pyarrow as pa
+
+    table = from_pandas(df)
+    partial = f"{path}.{os.getpid()}.tmp"
+    try:
+        with pa.ipc.new_file(partial, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+
+def from_pandas(df):
+    """Convert a DataFrame to an Arrow table, spilling object columns that mix Python types as strings."""
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy(deep=False)
+        for col in df.columns:
+            if df[col].dtype == 'object':
+                try:
+                    pa.array(df[col], from_pandas=True)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def spill(df, directory, index):
+    """Write a chunk to directory/part-<index>.arrow as uncompressed Arrow IPC and return its path."""
+    import pyarrow as pa
+
+    path = os.path.join(directory, f"part-{index:05d}.arrow")
+    table = from_pandas(df)
+    with pa.ipc.new_file(path, table.schema) as writer:
+        writer.write_table(table)
+    return path
+
+
+def read_parts(paths):
+    """Memory-map Arrow IPC parts and combine them into one DataFrame converted with to_pandas.
+
+    Part schemas are unified, e.g. a column that is all null in one chunk. String columns keep
+    referencing the mapped files rather than being copied into RAM.
+    """
+    import pyarrow as pa
+
+    if not paths:
+        return pd.DataFrame()
+
+    tables = []
+    for path in paths:
+        with pa.memory_map(path, 'r') as source:
+            tables.append(pa.ipc.open_file(source).read_all())
+    try:
+        table = _concat(pa, tables)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # A mixed-type column can spill as numbers in one chunk and strings in another
+        tables = _strings_for_conflicts(pa, tables)
+        table = _concat(pa, tables)
+
+    return to_pandas(table)
+
+
+def _concat(pa, tables):
+    if int(pa.__version__.split('.')[0]) < 14:
+        return pa.concat_tables(tables, promote=True)
+    return pa.concat_tables(tables, promote_options='permissive')
+
+
+def _strings_for_conflicts(pa, tables):
+    """Cast columns whose non-null types differ between tables to strings."""
+    types = {}
+    for table in tables:
+        for field in table.schema:
+            if not pa.types.is_null(field.type):
+                types.setdefault(field.name, set()).add(field.type)
+    conflicts = {name for name, found in types.items() if len(found) > 1}
+
+    result = []
+    for table in tables:
+        for i, field in enumerate(table.schema):
+            if field.name in conflicts and not pa.types.is_string(field.type):
+                table = table.set_column(i, pa.field(field.name, pa.string()), table.column(i).cast(pa.string()))
+        result.append(table)
+    return result
+
+
+def append_parquet_part(df, directory):
+    """Write a chunk as the next part-<n>.parquet of a dataset directory and return its path.
+
+    Columns that are all null in the chunk take their type from the existing parts (strings for
+    a new dataset), so every part keeps one schema and the directory reads back as one table.
+    """
+    import glob
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    os.makedirs(directory, exist_ok=True)
+    existing = sorted(glob.glob(os.path.join(directory, 'part-*.parquet')))
+    schema = pq.read_schema(existing[0]) if existing else None
+
+    table = from_pandas(df)
+    for i, field in enumerate(table.schema):
+        if not pa.types.is_null(field.type):
+            continue
+        target = pa.string()
+        if schema is not None and field.name in schema.names and not pa.types.is_null(schema.field(field.name).type):
+            target = schema.field(field.name).type
+        table = table.set_column(i, pa.field(field.name, target), table.column(i).cast(target))
+
+    path = os.path.join(directory, f"part-{len(existing):05d}.parquet")
+    pq.write_table(table, path)
+    return path
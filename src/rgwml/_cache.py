@@ -0,0 +1,178 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from . import _arrow
+
+
+# Opt-in on-disk cache of fq() results, shared by every process of the user. Each entry is one
+# Arrow IPC file named after its key, with its expiry time in the schema metadata; the file's
+# mtime is its last access, so eviction is least recently used. Override the location and size
+# cap with the RGWML_CACHE_DIR and RGWML_CACHE_MAX_MB env vars.
+DEFAULT_DIR = "~/.rgwml_cache"
+DEFAULT_MAX_MB = 1024
+
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+
+def cache_dir():
+    """Directory holding the cache entries."""
+    return os.path.expanduser(os.environ.get('RGWML_CACHE_DIR', DEFAULT_DIR))
+
+
+def max_bytes():
+    """Total size the entries may take before the least recently used ones are evicted."""
+    return float(os.environ.get('RGWML_CACHE_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024
+
+
+def normalize(query):
+    """Collapse whitespace outside string literals and drop a trailing semicolon."""
+    parts = re.split(r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""", query.strip().rstrip(';').strip())
+    return ''.join(part if i % 2 else re.sub(r'\s+', ' ', part) for i, part in enumerate(parts)).strip()
+
+
+def key(db_preset, query, **params):
+    """Cache key of a query on a preset, plus any parameters that change its result."""
+    identity = [db_preset.get('name'), db_preset.get('db_type'), db_preset.get('host'), db_preset.get('username'), db_preset.get('database'), db_preset.get('project_id'), normalize(query), sorted(params.items())]
+    return hashlib.sha256(json.dumps(identity, default=str).encode('utf-8')).hexdigest()
+
+
+def _path(entry_key):
+    return os.path.join(cache_dir(), f"{entry_key}.arrow")
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def get(entry_key):
+    """Return the cached DataFrame for a key, or None when it is missing or expired."""
+    import pyarrow as pa
+
+    path = _path(entry_key)
+    try:
+        with pa.memory_map(path, 'r') as source:
+            reader = pa.ipc.open_file(source)
+            metadata = reader.schema.metadata or {}
+            expires = float(metadata.get(b'rgwml_expires', 0))
+            if time.time() >= expires:
+                table = None
+            else:
+                table = reader.read_all()
+    except (OSError, pa.ArrowInvalid):
+        _count('misses')
+        return None
+
+    if table is None:
+        remove(entry_key)
+        _count('misses')
+        return None
+
+    try:
+        # Mark the entry as recently used
+        os.utime(path)
+    except OSError:
+        pass
+    _count('hits')
+    return _arrow.to_pandas(table)
+
+
+def put(entry_key, df, ttl):
+    """Store a DataFrame under a key for ttl seconds, then evict down to the size cap.
+
+    Returns the DataFrame as get() will read it back, so a miss and later hits see the same dtypes.
+    """
+    import pyarrow as pa
+
+    directory = cache_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    table = _arrow.from_pandas(df)
+    table = table.replace_schema_metadata(dict(table.schema.metadata or {}, rgwml_expires=str(time.time() + float(ttl))))
+
+    # Write beside the entry and rename, so readers in other processes never see a partial file
+    path = _path(entry_key)
+    partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with pa.ipc.new_file(partial, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    _count('stores')
+    evict()
+    return _arrow.to_pandas(table)
+
+
+def remove(entry_key):
+    """Drop the entry for a key, returning whether it existed."""
+    try:
+        os.remove(_path(entry_key))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _entries():
+    """(path, size, last access) of every entry, least recently used first."""
+    directory = cache_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    entries = []
+    for name in names:
+        if not name.endswith('.arrow'):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((path, stat.st_size, stat.st_mtime))
+    return sorted(entries, key=lambda entry: entry[2])
+
+
+def evict():
+    """Remove least recently used entries until the cache fits within max_bytes()."""
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    limit = max_bytes()
+    for path, size, _ in entries:
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+            _count('evictions')
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def clear():
+    """Remove every entry, returning how many were removed."""
+    removed = 0
+    for path, _, _ in _entries():
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def stats():
+    """Hit/miss counters of this process plus the entries and bytes currently on disk."""
+    entries = _entries()
+    with _lock:
+        result = dict(_stats)
+    result['entries'] = len(entries)
+    result['bytes'] = sum(size for _, size, _ in entries)
+    return result
@@ -0,0 +1,71 @@
+import os
+import json
+import threading
+
+
+# Process-wide cache of ~/.rgwfuncsrc, shared by the p and m classes
+_lock = threading.Lock()
+_cache = {'path': None, 'mtime': None, 'config': None, 'presets': {}}
+
+
+def config_path():
+    """Path of the .rgwfuncsrc config file in the home directory."""
+    return os.path.expanduser("~/.rgwfuncsrc")
+
+
+def _snapshot():
+    """Return (config, presets), re-parsing the file only when its path or mtime changed."""
+    path = config_path()
+    mtime = os.stat(path).st_mtime_ns
+
+    with _lock:
+        if _cache['path'] != path or _cache['mtime'] != mtime:
+            with open(path, 'r') as f:
+                try:
+                    config = json.load(f)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Invalid JSON format in config file: {e}")
+
+            # Index every *_presets list by name, keeping the first entry for duplicate names
+            presets = {}
+            for category, entries in config.items():
+                if category.endswith('_presets') and isinstance(entries, list):
+                    index = presets.setdefault(category, {})
+                    for entry in entries:
+                        if isinstance(entry, dict):
+                            index.setdefault(entry.get('name'), entry)
+
+            _cache['path'] = path
+            _cache['mtime'] = mtime
+            _cache['config'] = config
+            _cache['presets'] = presets
+
+        return _cache['config'], _cache['presets']
+
+
+def load():
+    """Return the parsed configuration."""
+    config, _ = _snapshot()
+    return config
+
+
+def get(key, default=None):
+    """Return a top-level key of the configuration, e.g. 'open_ai_key'."""
+    config, _ = _snapshot()
+    return config.get(key, default)
+
+
+def preset(category, name):
+    """Return a copy of the preset called name in a category such as 'db_presets', or None."""
+    _, presets = _snapshot()
+    entry = presets.get(category, {}).get(name)
+    return dict(entry) if entry is not None else None
+
+
+def clear():
+    """Drop the cached configuration so the next lookup re-reads the file."""
+    with _lock:
+        _cache['path'] = None
+        _cache['mtime'] = None
+        _cache['config'] = None
+        _cache['presets'] = {}
@@ -0,0 +1,562 @@
+import ast
+import collections
+import datetime
+import decimal
+import inspect
+import io
+import math
+import re
+import tokenize
+import numpy as np
+
+
+# A recorded call of a deferrable p method, with every argument bound by name
+Step = collections.namedtuple('Step', ['op', 'params'])
+
+# Loads that start a new plan
+SOURCE_OPS = {'fq', 'fp'}
+
+# Row filters, which may be moved ahead of row-wise appends
+FILTER_OPS = {'f', 'fim', 'fimc'}
+
+# Row-wise appends that neither drop, add nor reorder rows
+APPEND_OPS = {'acc', 'abc', 'asc'}
+
+# Internal step inserted by the optimizer to drop columns nothing downstream reads
+PROJECT = '_prj'
+
+# db_types whose SQL an fq() source can absorb filters, projections and limits into
+SQL_DIALECTS = {'mysql', 'mssql', 'clickhouse', 'google_big_query'}
+
+# Dialects whose default string comparisons are case and trailing-space sensitive like pandas;
+# MySQL and MSSQL collations usually are not, so string equality there is only a pre-filter
+CASE_SENSITIVE_DIALECTS = {'clickhouse', 'google_big_query'}
+
+_SQL_OPERATORS = {ast.Eq: '=', ast.NotEq: '<>', ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>='}
+_FLIPPED_OPERATORS = {ast.Eq: ast.Eq, ast.NotEq: ast.NotEq, ast.Lt: ast.Gt, ast.LtE: ast.GtE, ast.Gt: ast.Lt, ast.GtE: ast.LtE}
+
+
+def bind(method, args, kwargs):
+    """Record a call of method as a Step, validating the arguments against its signature."""
+    bound = inspect.signature(method).bind(None, *args, **kwargs)
+    bound.apply_defaults()
+    params = dict(bound.arguments)
+    params.pop('self')
+    return Step(method.__name__, params)
+
+
+def describe(step):
+    """Render a step as a call, e.g. f(filter_expr='a > 1')."""
+    args = ', '.join(f"{name}={value!r}" for name, value in step.params.items())
+    return f"{step.op}({args})"
+
+
+def parse_expression(expr):
+    """Parse a query/eval expression the way pandas does (& and | as and/or), or return None."""
+    if not isinstance(expr, str) or '`' in expr or '@' in expr:
+        return None
+    try:
+        tokens = []
+        for token in tokenize.generate_tokens(io.StringIO(expr.strip()).readline):
+            if token.type == tokenize.OP and token.string in ('&', '|'):
+                tokens.append((tokenize.NAME, 'and' if token.string == '&' else 'or'))
+            else:
+                tokens.append((token.type, token.string))
+        return ast.parse(tokenize.untokenize(tokens).strip(), mode='eval')
+    except (SyntaxError, tokenize.TokenError):
+        return None
+
+
+def expression_columns(expr):
+    """Names referenced by a query/eval expression, or None if they cannot be determined."""
+    tree = parse_expression(expr)
+    if tree is None:
+        return None
+    functions = {node.func.id for node in ast.walk(tree) if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)}
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)} - functions
+
+
+def split_filter(expr, columns):
+    """Split a filter into (conjuncts reading only columns, the other conjuncts), each an expression or None.
+
+    A filter that cannot be parsed is returned whole as the second part.
+    """
+    tree = parse_expression(expr)
+    if tree is None:
+        return None, expr
+
+    body = tree.body
+    conjuncts = body.values if isinstance(body, ast.BoolOp) and isinstance(body.op, ast.And) else [body]
+    inside, outside = [], []
+    for conjunct in conjuncts:
+        names = expression_columns(ast.unparse(conjunct))
+        (inside if names and names <= set(columns) else outside).append(conjunct)
+
+    def join(parts):
+        return ' and '.join(f'({ast.unparse(part)})' for part in parts) if parts else None
+    return join(inside), join(outside)
+
+
+def _agg_column(agg_func):
+    """Output column of a g() aggregation such as 'col::sum', or None if malformed."""
+    parts = agg_func.split('::') if isinstance(agg_func, str) else []
+    return f'{parts[0]}_{parts[1]}' if len(parts) == 2 else None
+
+
+def reads(step):
+    """Columns a step needs from its input, or None if it may need any of them."""
+    op, params = step
+    if op in ('f', 'abc'):
+        return expression_columns(params.get('filter_expr', params.get('condition')))
+    if op in ('fim', 'fimc'):
+        return {params['mobile_col']}
+    if op in ('lim', 'asc'):
+        return set()
+    if op == 'cs':
+        return {col.split('::')[0] for col in params['columns']}
+    if op in ('ncl', 'ddrf'):
+        columns = params['column_names' if op == 'ncl' else 'columns']
+        return {col.strip() for col in columns.split(',')} if isinstance(columns, str) else None
+    if op == 'rtc':
+        columns = params['columns_to_retain']
+        return set(columns) if isinstance(columns, list) else None
+    if op == PROJECT:
+        return set(params['columns'])
+    if op == 'acc':
+        operation = params['operation']
+        if '(' in operation and ')' in operation:
+            return {operation.split('(')[1].replace(')', '')}
+        parts = operation.split()
+        return {parts[0], parts[2]} if len(parts) >= 3 else None
+    if op == 'g':
+        target_cols = params['target_cols']
+        columns = {target_cols} if isinstance(target_cols, str) else set(target_cols)
+        for agg_func in params['agg_funcs']:
+            if '::' not in agg_func:
+                return None
+            columns.add(agg_func.split('::')[0])
+        return columns
+    return None
+
+
+def optimize(steps, dialect=None, file_columns=None):
+    """Rewrite a recorded plan into an equivalent one that touches fewer rows and columns.
+
+    dialect is the db_type of an fq() source, letting leading steps run inside its query.
+    file_columns are the columns of a parquet fp() source (a file or a file set, with its partition
+    columns), letting it read only those needed. A filter pushed into a source drops rows before
+    they are numbered, so the result's index is 0..n-1 where eager f() keeps the source labels.
+    """
+    steps = _push_down(list(steps))
+    steps = _fuse_filters(steps)
+    steps = _prune_columns(steps)
+    steps = push_into_file(steps, file_columns)
+    return push_into_query(steps, dialect)
+
+
+def _push_down(steps):
+    """Move lim and filters ahead of row-wise appends whose output they do not depend on."""
+    changed = True
+    while changed:
+        changed = False
+        for i in range(1, len(steps)):
+            prev, step = steps[i - 1], steps[i]
+            if prev.op not in APPEND_OPS:
+                continue
+            if step.op == 'lim':
+                movable = True
+            elif step.op in FILTER_OPS:
+                columns = reads(step)
+                movable = columns is not None and prev.params['new_col_name'] not in columns
+            else:
+                movable = False
+            if movable:
+                steps[i - 1], steps[i] = step, prev
+                changed = True
+    return steps
+
+
+def _fuse_filters(steps):
+    """Merge runs of adjacent f() steps into a single query."""
+    fused = []
+    for step in steps:
+        if step.op == 'f' and fused and fused[-1].op == 'f':
+            expr = f"({fused[-1].params['filter_expr']}) and ({step.params['filter_expr']})"
+            fused[-1] = Step('f', {'filter_expr': expr})
+        else:
+            fused.append(step)
+    return fused
+
+
+def _prune_columns(steps):
+    """Walk the plan backwards, dropping dead appends and aggregations and projecting the input."""
+    start = 1 if steps and steps[0].op in SOURCE_OPS else 0
+    needed = None  # None means every column is needed
+    pruned = []
+
+    for step in reversed(steps[start:]):
+        op, params = step
+        if op == 'rtc':
+            columns = params['columns_to_retain']
+            if needed is not None and isinstance(columns, list):
+                kept = [col for col in columns if col in needed]
+                if kept:
+                    step = Step(op, dict(params, columns_to_retain=kept))
+            needed = reads(step)
+        elif op == 'g':
+            if needed is not None:
+                kept = [agg for agg in params['agg_funcs'] if _agg_column(agg) in needed]
+                if kept:
+                    step = Step(op, dict(params, agg_funcs=kept))
+            needed = reads(step)
+        elif op in APPEND_OPS:
+            produced = params['new_col_name']
+            if needed is not None:
+                if produced not in needed:
+                    continue  # Dead append: nothing downstream reads the column
+                columns = reads(step)
+                needed = None if columns is None else (needed - {produced}) | columns
+        elif op == 'rnc':
+            rename_pairs = params['rename_pairs']
+            if needed is not None:
+                if isinstance(rename_pairs, dict):
+                    inverse = {new: old for old, new in rename_pairs.items()}
+                    needed = {inverse.get(col, col) for col in needed}
+                else:
+                    needed = None
+        elif needed is not None:
+            columns = reads(step)
+            needed = None if columns is None else needed | columns
+        pruned.append(step)
+
+    pruned.reverse()
+    if needed is not None and not (pruned and pruned[0].op == 'rtc'):
+        pruned.insert(0, Step(PROJECT, {'columns': sorted(needed, key=str)}))
+    return steps[:start] + pruned
+
+
+def push_into_query(steps, dialect):
+    """Fold the projections, filters and limits that follow an fq() source into its SQL."""
+    if not steps or steps[0].op != 'fq' or dialect not in SQL_DIALECTS:
+        return steps
+
+    # Only plain SELECTs can be wrapped as a derived table; an ORDER BY inside one is not
+    # portable (MSSQL rejects it, MySQL may ignore it), so those queries run as written
+    query = steps[0].params['query'].strip().rstrip(';').strip()
+    if not re.match(r'select\b', query, re.IGNORECASE) or re.search(r'\border\s+by\b', query, re.IGNORECASE):
+        return steps
+
+    columns, where, limit = None, [], None
+    i = 1
+    while i < len(steps):
+        op, params = steps[i]
+        if op in (PROJECT, 'rtc'):
+            selected = params['columns'] if op == PROJECT else params['columns_to_retain']
+            if not isinstance(selected, list) or not selected or (op == PROJECT and 'index' in selected):
+                break
+            columns = list(selected)
+        elif op == 'f' and limit is None:
+            conditions, exact = _filter_to_sql(params['filter_expr'], dialect)
+            where.extend(conditions)
+            if not exact:
+                break  # The filter stays in the plan to finish the job locally
+        elif op == 'lim' and isinstance(params['num_rows'], int) and params['num_rows'] >= 0:
+            limit = params['num_rows'] if limit is None else min(limit, params['num_rows'])
+        else:
+            break
+        i += 1
+
+    if i == 1 and not where:
+        return steps
+
+    select = ', '.join(sql_identifier(col, dialect) for col in columns) if columns else '*'
+    top = f"TOP ({limit}) " if dialect == 'mssql' and limit is not None else ''
+    sql = f"SELECT {top}{select} FROM ({query}) AS rgwml_src"
+    if where:
+        sql += " WHERE " + " AND ".join(f"({condition})" for condition in where)
+    if dialect != 'mssql' and limit is not None:
+        sql += f" LIMIT {limit}"
+
+    return [Step('fq', dict(steps[0].params, query=sql))] + steps[i:]
+
+
+def push_into_file(steps, file_columns):
+    """Fold the projection and filter that follow a parquet fp() source (a file or file set) into its reader."""
+    if not steps or steps[0].op != 'fp':
+        return steps
+    params = steps[0].params
+    if (file_columns is None and not str(params['file_path']).endswith('.parquet')) or params.get('chunk_size') or params.get('usecols') is not None or params.get('filter_expr') is not None:
+        return steps
+
+    usecols, filter_expr = None, None
+    i = 1
+    while i < len(steps):
+        op, step_params = steps[i]
+        if op == PROJECT and usecols is None and file_columns is not None:
+            # Keep the file's column order, as the projection would
+            usecols = [col for col in file_columns if col in step_params['columns']]
+        elif op == 'f' and filter_expr is None:
+            # fp() pushes what it can to the reader and applies the rest itself
+            filter_expr = step_params['filter_expr']
+        else:
+            break
+        i += 1
+
+    if i == 1:
+        return steps
+    return [Step('fp', dict(params, usecols=usecols, filter_expr=filter_expr))] + steps[i:]
+
+
+def filter_to_arrow(expr, schema=None):
+    """Translate the conjuncts of a filter into a pyarrow dataset expression.
+
+    Returns (expression, exact) like _filter_to_sql, with expression None when nothing could be
+    translated. Parquet readers skip row groups whose min/max statistics exclude it. With the
+    file's schema, ISO strings compared with date and timestamp columns are parsed as pandas would.
+    """
+    tree = parse_expression(expr)
+    if tree is None:
+        return None, False
+
+    body = tree.body
+    conjuncts = body.values if isinstance(body, ast.BoolOp) and isinstance(body.op, ast.And) else [body]
+    translated = _arrow_conjunction([_node_to_arrow(conjunct, schema) for conjunct in conjuncts])
+    if translated is None:
+        return None, False
+    return translated
+
+
+def _node_to_arrow(node, schema):
+    """pyarrow expression for a boolean expression node as (expression, exact), or None."""
+    if isinstance(node, ast.BoolOp):
+        parts = [_node_to_arrow(value, schema) for value in node.values]
+        if isinstance(node.op, ast.Or):
+            if any(part is None for part in parts):
+                return None
+            expression = parts[0][0]
+            for part, _ in parts[1:]:
+                expression = expression | part
+            return expression, all(exact for _, exact in parts)
+        return _arrow_conjunction(parts)
+
+    if isinstance(node, ast.Compare):
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            parts.append(_comparison_to_arrow(left, op, right, schema))
+            left = right
+        return _arrow_conjunction(parts)
+
+    return None
+
+
+def _arrow_conjunction(parts):
+    """AND together translated parts; untranslatable ones are dropped, making the result inexact."""
+    known = [part for part in parts if part is not None]
+    if not known:
+        return None
+    expression = known[0][0]
+    for part, _ in known[1:]:
+        expression = expression & part
+    return expression, len(known) == len(parts) and all(exact for _, exact in known)
+
+
+def _comparison_to_arrow(left, op, right, schema):
+    """pyarrow expression for a single column comparison as (expression, exact), or None."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if not isinstance(left, ast.Name) and isinstance(right, ast.Name) and type(op) in _FLIPPED_OPERATORS:
+        left, right, op = right, left, _FLIPPED_OPERATORS[type(op)]()
+    if not isinstance(left, ast.Name) or not isinstance(op, (ast.In, ast.NotIn) + tuple(_SQL_OPERATORS)):
+        return None
+    column = pc.field(left.id)
+
+    values = None
+    if isinstance(right, ast.Name):
+        other = pc.field(right.id)
+    else:
+        try:
+            value = ast.literal_eval(right)
+        except (ValueError, TypeError, SyntaxError):
+            return None
+        values = list(value) if isinstance(value, (list, tuple, set)) else None
+        items = values if values is not None else [value]
+        for item in items:
+            if not isinstance(item, (bool, int, float, str, datetime.date)) or (isinstance(item, float) and not math.isfinite(item)):
+                return None
+
+        column_type = schema.field(left.id).type if schema is not None and left.id in schema.names else None
+        if column_type is not None and (pa.types.is_timestamp(column_type) or pa.types.is_date(column_type)) and any(isinstance(item, str) for item in items):
+            if pa.types.is_timestamp(column_type) and column_type.tz is not None:
+                return None
+            try:
+                items = [datetime.datetime.fromisoformat(item) if isinstance(item, str) else item for item in items]
+            except ValueError:
+                return None
+            if pa.types.is_date(column_type):
+                # A date column compared with a datetime string compares as midnight-based timestamps
+                column = column.cast(pa.timestamp('us'))
+            if values is not None:
+                values = items
+            else:
+                value = items[0]
+        other = value
+
+    negated = isinstance(op, (ast.NotEq, ast.NotIn))
+    if values is not None:
+        if not isinstance(op, (ast.Eq, ast.NotEq, ast.In, ast.NotIn)):
+            return None
+        expression = column.isin(values)
+        if negated:
+            expression = ~expression
+    elif isinstance(op, (ast.In, ast.NotIn)):
+        return None
+    elif isinstance(op, ast.Eq):
+        expression = column == other
+    elif isinstance(op, ast.NotEq):
+        expression = column != other
+    elif isinstance(op, ast.Lt):
+        expression = column < other
+    elif isinstance(op, ast.LtE):
+        expression = column <= other
+    elif isinstance(op, ast.Gt):
+        expression = column > other
+    else:
+        expression = column >= other
+
+    # pandas keeps missing values for != and not in, where Arrow comparisons drop nulls
+    if negated:
+        expression = expression | column.is_null()
+        if isinstance(right, ast.Name):
+            expression = expression | other.is_null()
+    return expression, True
+
+
+def _filter_to_sql(expr, dialect):
+    """Translate the conjuncts of a filter into SQL conditions.
+
+    Returns (conditions, exact) where exact means the conditions select exactly the rows the
+    filter would, so it can be dropped; otherwise they only narrow the rows fetched.
+    """
+    tree = parse_expression(expr)
+    if tree is None:
+        return [], False
+
+    body = tree.body
+    conjuncts = body.values if isinstance(body, ast.BoolOp) and isinstance(body.op, ast.And) else [body]
+    conditions, exact = [], True
+    for conjunct in conjuncts:
+        translated = _node_to_sql(conjunct, dialect)
+        if translated is None:
+            exact = False
+            continue
+        conditions.append(translated[0])
+        exact = exact and translated[1]
+    return conditions, exact
+
+
+def _node_to_sql(node, dialect):
+    """SQL for a boolean expression node as (sql, exact), or None if it cannot be translated."""
+    if isinstance(node, ast.BoolOp):
+        parts = [_node_to_sql(value, dialect) for value in node.values]
+        if isinstance(node.op, ast.Or):
+            if any(part is None for part in parts):
+                return None
+            return " OR ".join(f"({sql})" for sql, _ in parts), all(exact for _, exact in parts)
+        return _conjunction(parts)
+
+    if isinstance(node, ast.Compare):
+        # a < b < c is a chain of pairwise comparisons joined by AND
+        parts = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            parts.append(_comparison_to_sql(left, op, right, dialect))
+            left = right
+        return _conjunction(parts)
+
+    return None
+
+
+def _conjunction(parts):
+    """AND together translated parts; untranslatable ones are dropped, making the result inexact."""
+    known = [part for part in parts if part is not None]
+    if not known:
+        return None
+    sql = known[0][0] if len(known) == 1 else " AND ".join(f"({sql})" for sql, _ in known)
+    return sql, len(known) == len(parts) and all(exact for _, exact in known)
+
+
+def _comparison_to_sql(left, op, right, dialect):
+    """SQL for a single column comparison as (sql, exact), or None."""
+    if not isinstance(left, ast.Name) and isinstance(right, ast.Name) and type(op) in _FLIPPED_OPERATORS:
+        left, right, op = right, left, _FLIPPED_OPERATORS[type(op)]()
+    if not isinstance(left, ast.Name) or not isinstance(op, (ast.In, ast.NotIn) + tuple(_SQL_OPERATORS)):
+        return None
+    column = sql_identifier(left.id, dialect)
+
+    if isinstance(right, ast.Name):
+        other, textual, values = sql_identifier(right.id, dialect), True, None
+    else:
+        try:
+            value = ast.literal_eval(right)
+        except (ValueError, TypeError, SyntaxError):
+            return None
+        values = list(value) if isinstance(value, (list, tuple)) else None
+        literals = [sql_literal(item, dialect) for item in (values if values is not None else [value])]
+        if not literals or any(literal is None for literal in literals):
+            return None
+        textual = any(isinstance(item, str) for item in (values if values is not None else [value]))
+        other = literals[0] if values is None else ', '.join(literals)
+
+    # pandas compares strings case-sensitively; under a case-insensitive collation only
+    # equality can be pushed, as a superset of the rows pandas would keep
+    case_sensitive = dialect in CASE_SENSITIVE_DIALECTS
+    exact = case_sensitive or not textual
+    negated = isinstance(op, (ast.NotEq, ast.NotIn))
+    if not exact and (negated or not isinstance(op, (ast.Eq, ast.In))):
+        return None
+
+    if values is not None:
+        if not isinstance(op, (ast.Eq, ast.NotEq, ast.In, ast.NotIn)):
+            return None
+        sql = f"{column} {'NOT IN' if negated else 'IN'} ({other})"
+    elif isinstance(op, (ast.In, ast.NotIn)):
+        return None
+    else:
+        sql = f"{column} {_SQL_OPERATORS[type(op)]} {other}"
+
+    # pandas keeps missing values for != and not in, where SQL drops NULLs
+    if negated:
+        nulls = [column] + ([other] if isinstance(right, ast.Name) else [])
+        sql = " OR ".join([sql] + [f"{name} IS NULL" for name in nulls])
+    return sql, exact
+
+
+def sql_identifier(name, dialect):
+    """Quote a column name for the dialect."""
+    name = str(name)
+    if dialect == 'mssql':
+        return '[' + name.replace(']', ']]') + ']'
+    return '`' + name.replace('`', '``') + '`'
+
+
+def sql_literal(value, dialect):
+    """SQL literal for a number, string, date or datetime, or None for anything else."""
+    if isinstance(value, np.generic) and not isinstance(value, np.datetime64):
+        value = value.item()
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return repr(value) if math.isfinite(value) else None
+    if isinstance(value, decimal.Decimal):
+        return str(value) if value.is_finite() else None
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        # Databases coerce ISO strings when comparing them with date and datetime columns
+        value = value.isoformat(sep=' ') if isinstance(value, datetime.datetime) else value.isoformat()
+        return "'" + value + "'"
+    if isinstance(value, str):
+        if dialect == 'mssql':
+            return "N'" + value.replace("'", "''") + "'"
+        return "'" + value.replace('\\', '\\\\').replace("'", "\\'") + "'"
+    return None
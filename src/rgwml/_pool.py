@@ -0,0 +1,188 @@
+import os
+import time
+import atexit
+import threading
+import contextlib
+
+
+# Process-wide connection pools for MySQL, MSSQL and ClickHouse presets, shared by every p
+# method. Presets may set pool_size (0 disables pooling) and pool_idle_timeout in seconds.
+DEFAULT_POOL_SIZE = 5
+DEFAULT_IDLE_TIMEOUT = 300
+
+_lock = threading.Lock()
+_pools = {}
+
+
+class _Pool:
+    """A bounded LIFO pool of connections for one preset and database."""
+
+    def __init__(self, connect, db_type, max_size, idle_timeout):
+        self.connect = connect
+        self.db_type = db_type
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.pid = os.getpid()
+        self._idle = []  # (connection, time it was returned)
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Check out an idle healthy connection, opening a new one if below max_size."""
+        while True:
+            with self._cond:
+                while not self._idle and self._in_use >= self.max_size:
+                    self._cond.wait()
+                conn = None
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    if time.monotonic() - returned_at > self.idle_timeout:
+                        _close(conn)
+                        continue
+                self._in_use += 1
+
+            if conn is None:
+                try:
+                    return self.connect()
+                except BaseException:
+                    self._forget()
+                    raise
+            if _is_healthy(conn, self.db_type):
+                return conn
+            _close(conn)
+            self._forget()
+
+    def release(self, conn, discard=False):
+        """Return a connection, rolling back any open transaction, or close it if discard is set."""
+        if not discard:
+            try:
+                _reset(conn, self.db_type)
+            except Exception:
+                discard = True
+
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                _close(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close(self):
+        """Close every idle connection."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            _close(conn)
+
+    def _forget(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+
+
+@contextlib.contextmanager
+def connection(db_preset, database=None):
+    """Borrow a pooled connection (a ClickHouse client for clickhouse presets) for a db_preset.
+
+    The connection goes back to the pool when the block exits, and is closed instead if the
+    block raised, since its state is then unknown.
+    """
+    db_type = db_preset['db_type']
+    if db_type not in ('mysql', 'mssql', 'clickhouse'):
+        raise ValueError(f"Unsupported db_type for connection pooling: {db_type}")
+
+    def connect():
+        return _connect(db_preset, database)
+
+    max_size = int(db_preset.get('pool_size', DEFAULT_POOL_SIZE))
+    if max_size <= 0:
+        conn = connect()
+        try:
+            yield conn
+        finally:
+            _close(conn)
+        return
+
+    # Credentials are part of the key so an edited preset never reuses stale connections
+    key = (db_preset.get('name'), db_type, db_preset.get('host'), db_preset.get('username'), db_preset.get('password'), database)
+    with _lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            # Connections cannot be shared with a forked child, which starts a pool of its own
+            pool = _Pool(connect, db_type, max_size, float(db_preset.get('pool_idle_timeout', DEFAULT_IDLE_TIMEOUT)))
+            _pools[key] = pool
+
+    conn = pool.acquire()
+    try:
+        yield conn
+    except BaseException:
+        pool.release(conn, discard=True)
+        raise
+    pool.release(conn)
+
+
+def close_all():
+    """Close the idle connections of every pool."""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        if pool.pid == os.getpid():
+            pool.close()
+
+
+atexit.register(close_all)
+
+
+def _connect(db_preset, database):
+    """Open a new connection for a mysql, mssql or clickhouse preset."""
+    db_type = db_preset['db_type']
+    host = db_preset['host']
+    username = db_preset['username']
+    password = db_preset['password']
+
+    if db_type == 'mysql':
+        import mysql.connector
+        return mysql.connector.connect(host=host, user=username, password=password, database=database)
+    if db_type == 'mssql':
+        import pymssql
+        return pymssql.connect(server=host, user=username, password=password, database=database)
+
+    import clickhouse_connect
+    # Results are compressed on the wire unless the preset sets "compress": false
+    compress = db_preset.get('compress', True)
+    if database:
+        return clickhouse_connect.get_client(host=host, port=8123, username=username, password=password, database=database, compress=compress)
+    return clickhouse_connect.get_client(host=host, port=8123, username=username, password=password, compress=compress)
+
+
+def _is_healthy(conn, db_type):
+    """Cheap liveness check run before an idle connection is reused."""
+    try:
+        if db_type == 'mysql':
+            return conn.is_connected()
+        if db_type == 'clickhouse':
+            return conn.ping()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+def _reset(conn, db_type):
+    """End any transaction left open, so the next borrower does not see a stale snapshot."""
+    if db_type in ('mysql', 'mssql'):
+        conn.rollback()
+
+
+def _close(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
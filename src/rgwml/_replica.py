@@ -0,0 +1,324 @@
+import os
+import re
+import json
+import time
+import shlex
+import shutil
+import hashlib
+import threading
+import contextlib
+import subprocess
+import tempfile
+from . import _arrow
+
+
+# Local replicas of the remote databases of sqlite3 db_presets, so fslh() and sldbq() copy a
+# database only when it changed instead of once per query. Before use a replica is revalidated
+# against the remote file's size, mtime and header change counter over ssh (plus its sha256 when
+# the preset sets "replica_checksum": true), at most every "replica_max_age" seconds, and
+# re-downloaded with compression when they differ. Presets with "transport": "local" read db_path
+# as a local or mounted path. Override the location with the RGWML_REPLICA_DIR env var.
+#
+# Presets with "execution": "remote" skip the replica altogether: execute() pipes statements to
+# the sqlite3 shell on the host ("sqlite3_path", default sqlite3) over one compressed ssh session.
+DEFAULT_DIR = "~/.rgwml_replicas"
+DEFAULT_BUSY_TIMEOUT_MS = 30000
+
+_lock = threading.Lock()
+_locks = {}
+
+
+def replica_dir():
+    """Directory holding the replicas."""
+    return os.path.expanduser(os.environ.get('RGWML_REPLICA_DIR', DEFAULT_DIR))
+
+
+def _paths(db_preset):
+    """(replica, metadata, lock) paths of a preset's replica."""
+    identity = [db_preset.get('name'), db_preset.get('transport', 'ssh'), db_preset.get('host'), db_preset.get('ssh_user'), db_preset['db_path']]
+    digest = hashlib.sha256(json.dumps(identity).encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(replica_dir(), f"{re.sub(r'[^A-Za-z0-9_.-]', '_', str(db_preset.get('name')))}-{digest}")
+    return f"{base}.sqlite", f"{base}.json", f"{base}.lock"
+
+
+def _is_local(db_preset):
+    return db_preset.get('transport', 'ssh') == 'local'
+
+
+def _ssh_args(db_preset):
+    key_path = db_preset.get('ssh_key_path')
+    return ["-i", key_path] if key_path else []
+
+
+def _remote(db_preset, path):
+    return f"{db_preset['ssh_user']}@{db_preset['host']}:{path}"
+
+
+@contextlib.contextmanager
+def _locked(lock_path):
+    """Serialize work on one replica across threads and, where flock exists, across processes."""
+    with _lock:
+        thread_lock = _locks.setdefault(lock_path, threading.Lock())
+
+    with thread_lock:
+        try:
+            import fcntl
+        except ImportError:
+            fcntl = None
+        if fcntl is None:
+            yield
+            return
+
+        with open(lock_path, 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def remote_signature(db_preset):
+    """Size, sub-second mtime and SQLite header change counter of the remote database file, plus its sha256 if the preset asks for it.
+
+    The change counter (bytes 24-27 of the header) moves on every committed write outside WAL
+    mode, so a same-size write is caught even where the mtime does not resolve it.
+    """
+    db_path = db_preset['db_path']
+    checksum = db_preset.get('replica_checksum', False)
+
+    if _is_local(db_preset):
+        stat = os.stat(db_path)
+        with open(db_path, 'rb') as f:
+            f.seek(24)
+            signature = [str(stat.st_size), str(stat.st_mtime_ns), f.read(4).hex()]
+            if checksum:
+                f.seek(0)
+                digest = hashlib.sha256()
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+                signature.append(digest.hexdigest())
+        return signature
+
+    # One line each: GNU stat (%y has nanoseconds) or BSD stat (%Fm has fractional seconds),
+    # the change counter as hex bytes, then the checksum
+    quoted = shlex.quote(db_path)
+    command = f"(stat -c '%s %y' {quoted} 2>/dev/null || stat -f '%z %Fm' {quoted}) && od -A n -t x1 -j 24 -N 4 {quoted}"
+    if checksum:
+        command = f"{command} && (sha256sum {quoted} 2>/dev/null || shasum -a 256 {quoted})"
+    result = subprocess.run(["ssh", *_ssh_args(db_preset), f"{db_preset['ssh_user']}@{db_preset['host']}", command], check=True, capture_output=True, text=True)
+    lines = result.stdout.splitlines()
+    size, mtime = lines[0].split(None, 1)
+    signature = [size, mtime.strip(), ''.join(lines[1].split())]
+    return signature + [lines[2].split()[0]] if checksum else signature
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, signature):
+    partial = f"{meta_path}.{os.getpid()}.tmp"
+    with open(partial, 'w') as f:
+        json.dump({'signature': signature, 'checked': time.time()}, f)
+    os.replace(partial, meta_path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _download(db_preset, path):
+    """Copy the remote database over the replica, so readers of the old file are not disturbed."""
+    partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if _is_local(db_preset):
+            shutil.copyfile(db_preset['db_path'], partial)
+        else:
+            subprocess.run(["scp", "-C", *_ssh_args(db_preset), _remote(db_preset, db_preset['db_path']), partial], check=True)
+        os.replace(partial, path)
+    except BaseException:
+        _remove(partial)
+        raise
+
+
+def _upload(db_preset, path):
+    """Copy the replica over the remote database, renaming it into place once fully written."""
+    db_path = db_preset['db_path']
+    partial = f"{db_path}.rgwml-upload"
+    if _is_local(db_preset):
+        shutil.copyfile(path, partial)
+        os.replace(partial, db_path)
+    else:
+        subprocess.run(["scp", "-C", *_ssh_args(db_preset), path, _remote(db_preset, partial)], check=True)
+        subprocess.run(["ssh", *_ssh_args(db_preset), f"{db_preset['ssh_user']}@{db_preset['host']}", f"mv -f {shlex.quote(partial)} {shlex.quote(db_path)}"], check=True)
+
+
+def _fresh(db_preset, path, meta_path, refresh):
+    """Re-download the replica unless its recorded signature still matches the remote file."""
+    signature = remote_signature(db_preset)
+    meta = _read_meta(meta_path)
+    if refresh or meta is None or meta.get('signature') != signature or not os.path.exists(path):
+        _download(db_preset, path)
+    return signature
+
+
+def replica(db_preset, refresh=False):
+    """Path of an up-to-date local copy of a preset's database.
+
+    Concurrent callers wait for a single download; refresh=True downloads even when the remote
+    file looks unchanged.
+    """
+    path, meta_path, lock_path = _paths(db_preset)
+    os.makedirs(replica_dir(), exist_ok=True)
+    max_age = float(db_preset.get('replica_max_age', 0))
+
+    with _locked(lock_path):
+        meta = _read_meta(meta_path)
+        if not refresh and meta is not None and os.path.exists(path) and time.time() - meta.get('checked', 0) < max_age:
+            return path
+        _write_meta(meta_path, _fresh(db_preset, path, meta_path, refresh))
+    return path
+
+
+@contextlib.contextmanager
+def writable(db_preset):
+    """Hold an up-to-date replica for a write, yielding its path, then upload it to the remote.
+
+    If the block or the upload fails the replica is marked stale, so the next use downloads the
+    remote database again instead of serving changes it never received.
+    """
+    path, meta_path, lock_path = _paths(db_preset)
+    os.makedirs(replica_dir(), exist_ok=True)
+
+    with _locked(lock_path):
+        _fresh(db_preset, path, meta_path, False)
+        _remove(meta_path)
+        yield path
+        _upload(db_preset, path)
+        _write_meta(meta_path, remote_signature(db_preset))
+
+
+def _shell_command(db_preset):
+    """Command running the sqlite3 shell on the preset's database, over ssh unless transport is local."""
+    sqlite3_path = db_preset.get('sqlite3_path', 'sqlite3')
+    if _is_local(db_preset):
+        return [sqlite3_path, db_preset['db_path']]
+    return ["ssh", "-C", *_ssh_args(db_preset), f"{db_preset['ssh_user']}@{db_preset['host']}", f"{shlex.quote(sqlite3_path)} {shlex.quote(db_preset['db_path'])}"]
+
+
+def _json_rows(stream):
+    """Yield (column names, values) of each row printed by the sqlite3 shell in json mode.
+
+    The shell prints one row object per line, so rows are decoded as they stream in; pairs are
+    kept in order so duplicate column names survive.
+    """
+    for line in stream:
+        line = line.decode('utf-8').strip()
+        if line.startswith('['):
+            line = line[1:]
+        line = line[:-1] if line.endswith((',', ']')) else line
+        if line:
+            pairs = json.loads(line, object_pairs_hook=list)
+            yield tuple(name for name, _ in pairs), [value for _, value in pairs]
+
+
+def _frame(names, rows):
+    """Typed DataFrame of the rows of a sqlite3 result.
+
+    Each column takes the Arrow type of its values as SQLite stored them, so TEXT stays text
+    ('007', 'NA' and '' included) and only NULL becomes null; a column mixing storage classes
+    is kept as strings.
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    if names is None:
+        return pd.DataFrame()
+
+    arrays = []
+    for values in (zip(*rows) if rows else [()] * len(names)):
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+            arrays.append(pa.array([None if value is None else str(value) for value in values], pa.string()))
+    return _arrow.to_pandas(pa.Table.from_arrays(arrays, names=list(names)))
+
+
+def _single_select(query):
+    """Whether query is one SELECT (or WITH or VALUES) statement, whose columns a view can describe."""
+    import sqlite3
+
+    if not re.match(r'(SELECT|WITH|VALUES)\b', query, re.IGNORECASE):
+        return False
+    # No complete statement may end before the last one
+    return not any(sqlite3.complete_statement(query[:i + 1]) and query[i + 1:].strip() for i, char in enumerate(query) if char == ';')
+
+
+def _run(db_preset, script):
+    """Pipe a script to the preset's sqlite3 shell and return the column names (None without rows) and rows it prints in json mode."""
+    with tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(_shell_command(db_preset), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=stderr)
+        names = None
+        rows = []
+        parse_error = None
+        try:
+            try:
+                # The statements are tiny, so writing them all before reading cannot block
+                process.stdin.write("\n".join(script + [""]).encode('utf-8'))
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+            try:
+                for row_names, values in _json_rows(process.stdout):
+                    if names is None:
+                        names = row_names
+                    elif row_names != names:
+                        raise ValueError(f"columns {', '.join(row_names)} differ from {', '.join(names)}")
+                    rows.append(values)
+            except ValueError as e:
+                parse_error = e
+            process.stdout.read()
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+
+        if returncode != 0:
+            stderr.seek(0)
+            message = stderr.read().decode('utf-8', errors='replace').strip()
+            raise ValueError(f"SQLite error: {message or f'sqlite3 exited with status {returncode}'}")
+    if parse_error is not None:
+        raise ValueError(f"Could not parse the sqlite3 output, e.g. of several SELECTs with different columns: {parse_error}")
+    return names, rows
+
+
+def execute(db_preset, query, write=False):
+    """Run SQL in the sqlite3 shell on the preset's host and return what its SELECT prints as a DataFrame.
+
+    Only the statements and their JSON output cross the wire, and rows are decoded as they
+    stream in, typed as SQLite stored them. With write=True the statements run in one IMMEDIATE
+    transaction that commits only if all of them succeed, so concurrent writes on the host are
+    neither lost nor overwritten; other writers are waited for up to "remote_busy_timeout"
+    milliseconds. The json mode prints nothing for an empty result, so the columns of an empty
+    SELECT are read from a temporary view of it in a second session.
+    """
+    header = [".bail on", f".timeout {int(db_preset.get('remote_busy_timeout', DEFAULT_BUSY_TIMEOUT_MS))}", ".mode json"]
+    query = query.strip().rstrip(';').strip()
+    # The terminator goes on a line of its own, so a trailing -- comment cannot swallow it
+    statements = [query, ";"]
+    names, rows = _run(db_preset, header + (["BEGIN IMMEDIATE;", *statements, "COMMIT;"] if write else statements))
+
+    if names is None and not write and _single_select(query):
+        try:
+            _, described = _run(db_preset, header + ["CREATE TEMP VIEW rgwml_columns AS", *statements, "SELECT name FROM pragma_table_info('rgwml_columns') ORDER BY cid;"])
+            names = [row[0] for row in described] or None
+        except ValueError:
+            # Not every SELECT can back a view; the result is then empty without columns as before
+            pass
+    return _frame(names, rows)
@@ -1,26 +1,24 @@
-import os
 import json
 # import inspect
 import sqlite3
-import requests
 # import time
 import re
 import secrets
 from datetime import datetime, timedelta
-from flask import jsonify, make_response
-from google.oauth2 import id_token, service_account
-from google.auth.transport import requests as google_requests
-from googleapiclient.discovery import build
 import base64
 import random
 import string
 from email.mime.text import MIMEText
+from . import _config
 
 
 class m:
 
     def google_auth(self, invoking_function_name, request, google_client_id, sqlite_db_path, post_authentication_redirect_url,
                     telegram_bot_preset_name):
+        from flask import jsonify, make_response
+        from google.oauth2 import id_token
+        from google.auth.transport import requests as google_requests
 
         def verify_token(token, google_client_id):
             try:
@@ -129,23 +127,12 @@ class m:
             return jsonify({"error": error_message}), 500
 
     def validate_email(self, invoking_function_name, request, sqlite_db_path, gmail_bot_preset_name, telegram_bot_preset_name):
+        from flask import jsonify
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
 
-        # Set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_config():
-            with open(config_path, 'r') as file:
-                return json.load(file)
-
-        def get_gmail_bot_preset(config, preset_name):
-            presets = config.get("gmail_bot_presets", [])
-            for preset in presets:
-                if preset.get("name") == preset_name:
-                    return preset
-            return None
-
-        def get_gmail_bot_details(config, preset_name):
-            preset = get_gmail_bot_preset(config, preset_name)
+        def get_gmail_bot_details(preset_name):
+            preset = _config.preset("gmail_bot_presets", preset_name)
             if not preset:
                 raise RuntimeError(f"Gmail bot preset '{preset_name}' not found in the configuration file")
             service_account_credentials_path = preset.get("service_account_credentials_path")
@@ -211,8 +198,7 @@ class m:
             message = service.users().messages().send(userId="me", body=email_body).execute()
 
         # Load configuration
-        config = load_config()
-        service_account_credentials_path = get_gmail_bot_details(config, gmail_bot_preset_name)
+        service_account_credentials_path = get_gmail_bot_details(gmail_bot_preset_name)
         sender_email_id = gmail_bot_preset_name
 
         # Extract email from the request
@@ -286,6 +272,7 @@ class m:
 
     # Validates temp password
     def validate_password(self, invoking_function_name, request, sqlite_db_path, gmail_bot_preset_name, telegram_bot_preset_name):
+        from flask import jsonify
 
         # Load configuration
         # config = load_config()
@@ -333,6 +320,7 @@ class m:
             conn.close()
 
     def validate_user_password(self, invoking_function_name, request, sqlite_db_path, post_authentication_redirect_url, gmail_bot_preset_name, telegram_bot_preset_name):
+        from flask import jsonify
 
         def generate_auth_token(length=32):
             characters = string.ascii_letters + string.digits
@@ -406,24 +394,12 @@ class m:
             conn.close()
 
     def set_first_password(self, invoking_function_name, request, sqlite_db_path, post_authentication_redirect_url, gmail_bot_preset_name, telegram_bot_preset_name):
+        from flask import jsonify
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
 
-        # Set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_config():
-            """Load the configuration from the .rgwfuncsrc file."""
-            with open(config_path, 'r') as file:
-                return json.load(file)
-
-        def get_gmail_bot_preset(config, preset_name):
-            presets = config.get("gmail_bot_presets", [])
-            for preset in presets:
-                if preset.get("name") == preset_name:
-                    return preset
-            return None
-
-        def get_gmail_bot_details(config, preset_name):
-            preset = get_gmail_bot_preset(config, preset_name)
+        def get_gmail_bot_details(preset_name):
+            preset = _config.preset("gmail_bot_presets", preset_name)
             if not preset:
                 raise RuntimeError(f"Gmail bot preset '{preset_name}' not found in the configuration file")
             service_account_credentials_path = preset.get("service_account_credentials_path")
@@ -481,8 +457,7 @@ class m:
             cursor = conn.cursor()
 
             # Load configuration
-            config = load_config()
-            service_account_credentials_path = get_gmail_bot_details(config, gmail_bot_preset_name)
+            service_account_credentials_path = get_gmail_bot_details(gmail_bot_preset_name)
             sender_email_id = gmail_bot_preset_name
 
             # Check if the email and temp_password match with the records in the user_pending_validation table
@@ -601,24 +576,10 @@ class m:
             conn.close()
 
     def send_telegram_message(self, invoking_function_name, message, preset_name):
+        import requests
 
-        # Set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_config():
-            """Load the configuration from the .rgwfuncsrc file."""
-            with open(config_path, 'r') as file:
-                return json.load(file)
-
-        def get_telegram_preset(config, preset_name):
-            presets = config.get("telegram_bot_presets", [])
-            for preset in presets:
-                if preset.get("name") == preset_name:
-                    return preset
-            return None
-
-        def get_telegram_bot_details(config, preset_name):
-            preset = get_telegram_preset(config, preset_name)
+        def get_telegram_bot_details(preset_name):
+            preset = _config.preset("telegram_bot_presets", preset_name)
             if not preset:
                 raise RuntimeError(f"Telegram bot preset '{preset_name}' not found in the configuration file")
 
@@ -632,8 +593,7 @@ class m:
 
             return bot_token, chat_id
 
-        config = load_config()
-        bot_token, chat_id = get_telegram_bot_details(config, preset_name)
+        bot_token, chat_id = get_telegram_bot_details(preset_name)
         url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
         payload = {"chat_id": chat_id, "text": message}
 
@@ -641,24 +601,12 @@ class m:
         response.raise_for_status()
 
     def send_reset_password_link(self, invoking_function_name, request, sqlite_db_path, reset_password_page_url, gmail_bot_preset_name, telegram_bot_preset_name):
+        from flask import jsonify
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
 
-        # Set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_config():
-            """Load the configuration from the .rgwfuncsrc file."""
-            with open(config_path, 'r') as file:
-                return json.load(file)
-
-        def get_gmail_bot_preset(config, preset_name):
-            presets = config.get("gmail_bot_presets", [])
-            for preset in presets:
-                if preset.get("name") == preset_name:
-                    return preset
-            return None
-
-        def get_gmail_bot_details(config, preset_name):
-            preset = get_gmail_bot_preset(config, preset_name)
+        def get_gmail_bot_details(preset_name):
+            preset = _config.preset("gmail_bot_presets", preset_name)
             if not preset:
                 raise RuntimeError(f"Gmail bot preset '{preset_name}' not found in the configuration file")
             service_account_credentials_path = preset.get("service_account_credentials_path")
@@ -729,8 +677,7 @@ class m:
             message = service.users().messages().send(userId="me", body=email_body).execute()
 
         # Load configuration
-        config = load_config()
-        service_account_credentials_path = get_gmail_bot_details(config, gmail_bot_preset_name)
+        service_account_credentials_path = get_gmail_bot_details(gmail_bot_preset_name)
         sender_email_id = gmail_bot_preset_name
 
         # Extract email from the request
@@ -787,24 +734,12 @@ class m:
             conn.close()
 
     def reset_password_and_login(self, invoking_function_name, request, sqlite_db_path, post_authentication_redirect_url, gmail_bot_preset_name, telegram_bot_preset_name):
+        from flask import jsonify
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
 
-        # Set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_config():
-            """Load the configuration from the .rgwfuncsrc file."""
-            with open(config_path, 'r') as file:
-                return json.load(file)
-
-        def get_gmail_bot_preset(config, preset_name):
-            presets = config.get("gmail_bot_presets", [])
-            for preset in presets:
-                if preset.get("name") == preset_name:
-                    return preset
-            return None
-
-        def get_gmail_bot_details(config, preset_name):
-            preset = get_gmail_bot_preset(config, preset_name)
+        def get_gmail_bot_details(preset_name):
+            preset = _config.preset("gmail_bot_presets", preset_name)
             if not preset:
                 raise RuntimeError(f"Gmail bot preset '{preset_name}' not found in the configuration file")
             service_account_credentials_path = preset.get("service_account_credentials_path")
@@ -861,8 +796,7 @@ class m:
             cursor = conn.cursor()
 
             # Load configuration
-            config = load_config()
-            service_account_credentials_path = get_gmail_bot_details(config, gmail_bot_preset_name)
+            service_account_credentials_path = get_gmail_bot_details(gmail_bot_preset_name)
             sender_email_id = gmail_bot_preset_name
 
             # Check if the token exists and has not expired
@@ -942,6 +876,9 @@ class m:
             conn.close()
 
     def send_secure_data(self, invoking_function_name, request, secure_data, sqlite_db_path, telegram_bot_preset_name, google_client_id):
+        from flask import jsonify, make_response
+        from google.oauth2 import id_token
+        from google.auth.transport import requests as google_requests
 
         def verify_google_token(token, google_client_id):
             try:
@@ -1004,6 +941,9 @@ class m:
             return jsonify({"error": error_message}), 500
 
     def is_user_valid(self, invoking_function_name, request, sqlite_db_path, google_client_id, telegram_bot_preset_name):
+        from flask import jsonify
+        from google.oauth2 import id_token
+        from google.auth.transport import requests as google_requests
 
         def verify_google_token(token, google_client_id):
             try:
@@ -1,39 +1,28 @@
 import pandas as pd
 import numpy as np
-import pymssql
 import os
 import glob
 import json
-from datetime import datetime
+import csv
+from datetime import datetime, date
+import decimal
 import collections
 import time
-import copy
 import gc
-import mysql.connector
+import queue
+import threading
 import tempfile
-import clickhouse_connect
-from google.cloud import bigquery
-from google.oauth2 import service_account
-import pandas_gbq
-import xgboost as xgb
-import matplotlib.pyplot as plt
-import scipy.stats as stats
-import seaborn as sns
-from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering, MeanShift, SpectralClustering, Birch
-from sklearn.mixture import GaussianMixture
-from sklearn.metrics import silhouette_score
-from openai import OpenAI
+import shutil
 from pprint import pprint
-import requests
-from requests_html import AsyncHTMLSession
-import filetype
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from tqdm import tqdm
-import asyncio
 # import whisper
 # import warnings
 import re
-from slack_sdk import WebClient
+import sys
+import functools
+import uuid
+import contextlib
+import pathlib
 import sqlite3
 import subprocess
 # import smtplib
@@ -41,30 +30,1232 @@ import subprocess
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.base import MIMEBase
-from googleapiclient.discovery import build
 # from google.auth.transport.requests import Request
 from email import encoders
 import base64
 from io import BytesIO
-from PIL import Image, UnidentifiedImageError
+from . import _arrow
+from . import _cache
+from . import _config
+from . import _plan
+from . import _pool
+from . import _replica
+
+
+VERBOSITY_LEVELS = ['SILENT', 'SUMMARY', 'FULL']
+GC_POLICIES = ['ALWAYS', 'NEVER', 'AFTER_LOAD', 'RSS:n']
+
+
+def _verbosity(verbosity, name='verbosity'):
+    """A verbosity level in upper case, or ValueError naming the allowed levels."""
+    verbosity = verbosity.upper()
+    if verbosity not in VERBOSITY_LEVELS:
+        raise ValueError(f"{name} must be one of {', '.join(VERBOSITY_LEVELS)}, not {verbosity!r}.")
+    return verbosity
+
+
+def _gc_policy(policy, name='policy'):
+    """A garbage collection policy in upper case, or ValueError naming the allowed policies."""
+    policy = policy.upper()
+    if policy.startswith('RSS:'):
+        try:
+            float(policy.split(':', 1)[1])
+        except ValueError:
+            raise ValueError(f"{name} RSS threshold must be a number of MB, e.g. 'RSS:4096', not {policy!r}.")
+    elif policy not in GC_POLICIES:
+        raise ValueError(f"{name} must be one of {', '.join(GC_POLICIES)}, not {policy!r}.")
+    return policy
+
+# Bytes the streaming CSV reader parses per block; types are inferred from the first block
+_CSV_BLOCK_SIZE = 16 * 1024 * 1024
+
+# Plan steps a chunked fp() source runs chunk by chunk, before an optional g()
+_CHUNKED_OPS = {'f', 'fim', 'fimc', 'rtc', 'rnc', 'ncl', 'ddrf', 'lim', 'acc', 'abc', 'asc', _plan.PROJECT}
+
+
+def _rss_mb():
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+        except ImportError:
+            return 0.0
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        return max_rss / (1024 * 1024) if sys.platform == 'darwin' else max_rss / 1024
+
+
+def _bq_client(db_preset):
+    """BigQuery client for a google_big_query preset; tests can patch this to serve a local stub."""
+    from google.cloud import bigquery
+    from google.oauth2 import service_account
+
+    credentials = service_account.Credentials.from_service_account_file(db_preset['json_file_path'])
+    return bigquery.Client(credentials=credentials, project=db_preset['project_id'])
+
+
+def _keyset_chunks(db_preset, query, chunk_size, key_column, after=None, until=None):
+    """Yield DataFrame chunks of a query ordered by a unique, increasing key_column.
+
+    Every chunk seeks past the last key seen (keyset pagination) instead of skipping an offset,
+    so no row is scanned twice. after/until optionally bound the keys to (after, until].
+    """
+    db_type = db_preset['db_type']
+    if db_type not in ('mssql', 'mysql', 'clickhouse', 'google_big_query'):
+        raise ValueError(f"Unsupported db_type: {db_type}")
+    key = _plan.sql_identifier(key_column, db_type)
+
+    def where(last_seen):
+        conditions = [f"{key} {op} {_plan.sql_literal(value, db_type)}" for op, value in (('>', last_seen), ('<=', until)) if value is not None]
+        return " WHERE " + " AND ".join(conditions) if conditions else ""
+
+    if db_type == 'google_big_query':
+        import pyarrow as pa
+
+        # BigQuery bills a full scan per query, so run one ordered query and read its result page by page
+        results = _bq_client(db_preset).query(f"SELECT * FROM ({query}) AS rgwml_src{where(after)} ORDER BY {key}").result(page_size=chunk_size)
+        for batch in results.to_arrow_iterable():
+            yield _arrow.to_pandas(pa.Table.from_batches([batch]))
+        return
+
+    database = db_preset['database'] if db_type == 'clickhouse' else db_preset.get('database', '')
+    with _pool.connection(db_preset, database) as conn:
+        last_seen = after
+        while True:
+            if db_type == 'mssql':
+                chunk_query = f"SELECT TOP ({chunk_size}) * FROM ({query}) AS rgwml_src{where(last_seen)} ORDER BY {key}"
+            else:
+                chunk_query = f"SELECT * FROM ({query}) AS rgwml_src{where(last_seen)} ORDER BY {key} LIMIT {chunk_size}"
+
+            if db_type == 'clickhouse':
+                df_chunk = _arrow.to_pandas(conn.query_arrow(chunk_query))
+            else:
+                with conn.cursor() as cursor:
+                    cursor.execute(chunk_query)
+                    rows = cursor.fetchall()
+                    columns = [desc[0] for desc in cursor.description]
+                df_chunk = pd.DataFrame(rows, columns=columns)
+
+            if not df_chunk.empty:
+                yield df_chunk
+            if len(df_chunk) < chunk_size:
+                return
+            last_seen = df_chunk[key_column].iloc[-1]
+            if pd.isna(last_seen):
+                raise ValueError(f"key_column {key_column} must not contain NULLs")
+
+
+def _key_bounds(db_preset, query, key_column):
+    """Smallest and largest key_column value of a query, (None, None) when it has no rows."""
+    db_type = db_preset['db_type']
+    key = _plan.sql_identifier(key_column, db_type)
+    bounds_query = f"SELECT MIN({key}), MAX({key}) FROM ({query}) AS rgwml_src"
+
+    if db_type == 'google_big_query':
+        row = list(_bq_client(db_preset).query(bounds_query).result())[0]
+        return row[0], row[1]
+
+    database = db_preset['database'] if db_type == 'clickhouse' else db_preset.get('database', '')
+    with _pool.connection(db_preset, database) as conn:
+        if db_type == 'clickhouse':
+            row = conn.query(bounds_query).result_rows[0]
+        else:
+            with conn.cursor() as cursor:
+                cursor.execute(bounds_query)
+                row = cursor.fetchone()
+    return row[0], row[1]
+
+
+def _key_ranges(low, high, count):
+    """Split [low, high] into up to count (after, until] ranges, open-ended at both extremes.
+
+    Numeric, date and datetime keys are split into equal widths; any other key, e.g. a string,
+    stays a single range.
+    """
+    if isinstance(low, np.generic):
+        low, high = low.item(), high.item()
+    if count <= 1 or low is None or isinstance(low, bool) or not isinstance(low, (int, float, decimal.Decimal, date)):
+        return [(None, None)]
+
+    boundaries = []
+    for i in range(1, count):
+        if isinstance(low, int):
+            boundary = low + (high - low) * i // count
+        else:
+            boundary = low + (high - low) * i / count
+        if boundary >= low and boundary < high and boundary not in boundaries:
+            boundaries.append(boundary)
+
+    # The first and last ranges stay open, so rows outside the sampled bounds are still read
+    edges = [None] + boundaries + [None]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def _parallel_keyset_chunks(db_preset, query, chunk_size, key_column, parallel):
+    """Yield the chunks of _keyset_chunks in key order, fetching disjoint key ranges concurrently.
+
+    Each range is read by its own thread over its own pooled connection (drivers release the
+    GIL while waiting on the database) into a small bounded queue. Chunks are yielded range by
+    range, so order is preserved, and a range that gets ahead blocks on its full queue, so at
+    most about three chunks per range are held in memory.
+    """
+    if db_preset['db_type'] != 'google_big_query':
+        # Every range holds a connection for its whole scan; more ranges than the pool allows
+        # could leave the first range waiting on connections held by blocked later ranges
+        pool_size = int(db_preset.get('pool_size', _pool.DEFAULT_POOL_SIZE))
+        if pool_size > 0:
+            parallel = min(parallel, pool_size)
+
+    low, high = _key_bounds(db_preset, query, key_column)
+    if low is None:
+        return
+    ranges = _key_ranges(low, high, parallel)
+
+    done = object()
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=2) for _ in ranges]
+
+    def put(q, item):
+        # Give up waiting for room once the consumer has stopped
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def fetch(q, after, until):
+        chunks = _keyset_chunks(db_preset, query, chunk_size, key_column, after=after, until=until)
+        try:
+            for df_chunk in chunks:
+                if not put(q, df_chunk):
+                    return
+            put(q, done)
+        except BaseException as e:
+            put(q, e)
+        finally:
+            chunks.close()
+
+    executor = ThreadPoolExecutor(max_workers=len(ranges))
+    try:
+        for q, (after, until) in zip(queues, ranges):
+            executor.submit(fetch, q, after, until)
+        for q in queues:
+            while True:
+                item = q.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+
+
+def _read_csv(file_path, dtype=None, usecols=None):
+    """Read a CSV with the multithreaded pyarrow parser into a typed DataFrame.
+
+    Column types are inferred unless given in dtype, a dict of pyarrow types or type names
+    such as 'int64', 'float64', 'string', 'bool', 'date32' or 'timestamp[s]'. Empty fields
+    and the usual null markers (NULL, NA, NaN, ...) become nulls, strings included.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    try:
+        table = pv.read_csv(file_path, read_options=pv.ReadOptions(use_threads=True), convert_options=_csv_convert_options(dtype, usecols))
+    except pa.ArrowKeyError as e:
+        raise ValueError(str(e))
+    return _csv_to_pandas(table)
+
+
+def _filter_frame(df, filter_expr):
+    """Rows of df matching a filter expression, as f() selects them."""
+    try:
+        # Attempt to use query method for simple expressions
+        return df.query(filter_expr)
+    except BaseException:
+        # Fallback to eval for more complex expressions
+        return df[df.eval(filter_expr)]
+
+
+def _parquet_schema(file_path):
+    """Arrow schema of a parquet file or dataset directory, or None if it cannot be read."""
+    try:
+        import pyarrow.dataset as ds
+        return ds.dataset(file_path, format='parquet').schema
+    except Exception:
+        return None
+
+
+def _parquet_columns(file_path):
+    """Column names of a parquet file or dataset directory, or None if it cannot be read."""
+    schema = _parquet_schema(file_path)
+    return schema.names if schema is not None else None
+
+
+def _parquet_source_columns(file_path):
+    """Columns of a parquet fp() source, a file or a set of files with their partition columns; None for other sources."""
+    try:
+        if _is_multi_file(file_path):
+            paths = _expand_files(file_path)
+            if not paths[0].endswith('.parquet'):
+                return None
+            columns = _parquet_columns(paths[0])
+            return columns + [key for key in _partition_columns(paths) if key not in columns] if columns is not None else None
+    except ValueError:
+        return None
+    return _parquet_columns(file_path) if file_path.endswith('.parquet') else None
+
+
+def _read_parquet(file_path, usecols, filter_expr):
+    """Read a parquet file or dataset, pushing as much of filter_expr as possible into the scan.
+
+    The translated conjuncts are evaluated by pyarrow, which skips row groups whose statistics
+    exclude them; when the translation is partial, or pyarrow cannot evaluate it (e.g. comparing
+    a timestamp column with a string), the whole expression is applied to the result as f() would.
+    """
+    import pyarrow as pa
+
+    schema = _parquet_schema(file_path)
+    expression, exact = _plan.filter_to_arrow(filter_expr, schema)
+    columns = usecols
+    if not exact and usecols is not None and schema is not None:
+        # The local filter may read columns that are not loaded
+        columns = usecols + sorted((_plan.expression_columns(filter_expr) or set()) & set(schema.names) - set(usecols))
+
+    if expression is not None:
+        try:
+            df = pd.read_parquet(file_path, columns=columns, filters=expression)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+            expression, exact = None, False
+    if expression is None:
+        df = pd.read_parquet(file_path, columns=columns)
+    if not exact:
+        # Renumbered like a pushed-down read, so the index does not depend on how much translated
+        df = _filter_frame(df, filter_expr).reset_index(drop=True)
+        if columns is not usecols:
+            df = df[usecols]
+    return df
+
+
+def _read_file(file_path, dtype=None, usecols=None, compat=False, filter_expr=None):
+    """Read one csv, excel, json, parquet, feather/arrow or pickle file as fp() does."""
+    file_extension = file_path.split('.')[-1]
+
+    if file_extension == 'csv' and compat:
+        df = pd.read_csv(file_path, dtype=str, usecols=usecols)
+
+        # Replace empty strings with None
+        df.replace('', None, inplace=True)
+
+    elif file_extension == 'csv':
+        df = _read_csv(file_path, dtype, usecols)
+    elif file_extension in ['xls', 'xlsx']:
+        df = pd.read_excel(file_path, usecols=usecols)
+    elif file_extension == 'json':
+        df = pd.read_json(file_path)
+    elif file_extension == 'parquet' and filter_expr is not None:
+        df = _read_parquet(file_path, usecols, filter_expr)
+    elif file_extension == 'parquet':
+        df = pd.read_parquet(file_path, columns=usecols)
+    elif file_extension in ('feather', 'arrow', 'ipc'):
+        df = pd.read_feather(file_path, columns=usecols)
+    elif file_extension == 'pkl':
+        df = pd.read_pickle(file_path)
+    else:
+        raise ValueError(f"Unsupported file extension: {file_extension}")
+
+    if usecols is not None and file_extension in ('json', 'pkl'):
+        # These formats cannot skip columns while reading
+        df = df[usecols]
+    return df
+
+
+# Formats fp() can load many files of at once, from a glob pattern or a directory
+_MULTI_FILE_FORMATS = {'csv': 'csv', 'parquet': 'parquet', 'feather': 'arrow', 'arrow': 'arrow', 'ipc': 'arrow', 'json': 'json', 'xls': 'excel', 'xlsx': 'excel', 'pkl': 'pkl'}
+
+
+def _is_multi_file(file_path):
+    """Whether an fp() path names a set of files: a glob pattern or a (Hive-partitioned) directory."""
+    return os.path.isdir(file_path) or (not os.path.exists(file_path) and glob.has_magic(file_path))
+
+
+def _expand_files(file_path):
+    """Sorted data files matching a glob pattern or found under a directory, all of one format."""
+    if os.path.isdir(file_path):
+        paths = []
+        for root, dirs, names in os.walk(file_path):
+            # Skip hidden and bookkeeping entries such as .crc files, _SUCCESS and _temporary
+            dirs[:] = [d for d in dirs if not d.startswith(('.', '_'))]
+            paths.extend(os.path.join(root, name) for name in names if not name.startswith(('.', '_')))
+    else:
+        paths = [path for path in glob.glob(file_path, recursive=True) if os.path.isfile(path)]
+
+    paths = sorted(path for path in paths if path.split('.')[-1] in _MULTI_FILE_FORMATS)
+    if not paths:
+        raise ValueError(f"No {', '.join(_MULTI_FILE_FORMATS)} files found at {file_path}")
+    formats = {_MULTI_FILE_FORMATS[path.split('.')[-1]] for path in paths}
+    if len(formats) > 1:
+        raise ValueError(f"{file_path} holds files of several formats ({', '.join(sorted(formats))}); narrow it with a glob such as {os.path.join(file_path, '**', '*.csv')}")
+    return paths
+
+
+def _hive_partitions(file_path):
+    """Partition values encoded in the key=value directories of a path, e.g. {'dt': '2024-01-31'}."""
+    from urllib.parse import unquote
+
+    values = {}
+    for segment in os.path.dirname(os.path.abspath(file_path)).split(os.sep):
+        key, sep, value = segment.partition('=')
+        if sep and key:
+            values[key] = None if value == '__HIVE_DEFAULT_PARTITION__' else unquote(value)
+    return values
+
+
+def _partition_columns(paths):
+    """Partition columns of a set of files, each an array holding one typed value per file.
+
+    A column is integer (nullable Int64) or float when every value parses as a number, and a
+    string column otherwise.
+    """
+    partitions = [_hive_partitions(path) for path in paths]
+    columns = {}
+    for key in dict.fromkeys(key for values in partitions for key in values):
+        values = pd.Series([values.get(key) for values in partitions], dtype=object)
+        try:
+            typed = pd.to_numeric(values)
+            if typed.dropna().mod(1).eq(0).all():
+                typed = typed.astype('Int64')
+        except (ValueError, TypeError):
+            typed = values.astype(pd.StringDtype('pyarrow'))
+        columns[key] = typed.array
+    return columns
+
+
+def _read_files(file_path, dtype=None, usecols=None, compat=False, filter_expr=None, workers=None):
+    """Load every file matching a glob pattern or under a Hive-partitioned directory into one frame.
+
+    Files are read in parallel on a thread pool, where the pyarrow and pandas parsers release
+    the GIL, and concatenated once at the end. Conjuncts of filter_expr that only read partition
+    columns skip whole files; the rest is pushed into each file's reader as in fp().
+    """
+    paths = _expand_files(file_path)
+    partitions = _partition_columns(paths)
+
+    local_expr = None
+    if filter_expr is not None and partitions:
+        partition_expr, filter_expr = _plan.split_filter(filter_expr, partitions)
+        if partition_expr is not None:
+            keep = _filter_frame(pd.DataFrame(partitions), partition_expr).index.to_numpy()
+            if not len(keep):
+                # Read one file for the columns and types of the empty result
+                keep = np.array([0])
+                local_expr = partition_expr
+            paths = [paths[i] for i in keep]
+            partitions = {key: values.take(keep) for key, values in partitions.items()}
+        if filter_expr is not None and (_plan.expression_columns(filter_expr) or set(partitions)) & set(partitions):
+            # Conjuncts mixing partition and file columns run once the partition columns exist
+            local_expr = ' and '.join(f'({expr})' for expr in (local_expr, filter_expr) if expr)
+            filter_expr = None
+
+    if usecols is not None:
+        partitions = {key: values for key, values in partitions.items() if key in usecols}
+        file_usecols = [col for col in usecols if col not in partitions]
+        if local_expr is not None:
+            # The local filter may read columns that are not loaded
+            file_usecols += sorted((_plan.expression_columns(local_expr) or set()) - set(file_usecols) - set(partitions))
+    else:
+        file_usecols = None
+
+    def read(path):
+        return _read_file(path, dtype, file_usecols, compat, filter_expr)
+
+    workers = min(len(paths), workers or os.cpu_count() or 1)
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(read, paths))
+    else:
+        frames = [read(path) for path in paths]
+
+    lengths = [len(frame) for frame in frames]
+    non_empty = [frame for frame in frames if len(frame)]
+    if len(non_empty) > 1:
+        df = pd.concat(non_empty, ignore_index=True)
+    else:
+        df = (non_empty or frames)[0].reset_index(drop=True)
+    frames = non_empty = None
+
+    rows = np.repeat(np.arange(len(paths)), lengths)
+    for key, values in partitions.items():
+        # A column stored in the files themselves wins over the directory name
+        if key not in df.columns:
+            df[key] = values.take(rows)
+
+    if local_expr is not None:
+        df = _filter_frame(df, local_expr).reset_index(drop=True)
+    if usecols is not None:
+        df = df[usecols]
+    return df
+
+
+def _csv_convert_options(dtype=None, usecols=None):
+    """pyarrow ConvertOptions for dtype overrides, a column selection and nullable strings."""
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    column_types = {}
+    for column, column_type in (dtype or {}).items():
+        if column_type is str:
+            column_type = pa.string()
+        elif column_type is int:
+            column_type = pa.int64()
+        elif column_type is float:
+            column_type = pa.float64()
+        elif isinstance(column_type, str):
+            try:
+                column_type = pa.type_for_alias(column_type)
+            except ValueError:
+                raise ValueError(f"Unsupported type for column {column}: {column_type}")
+        column_types[column] = column_type
+
+    return pv.ConvertOptions(column_types=column_types, include_columns=usecols, strings_can_be_null=True)
+
+
+def _csv_to_pandas(table):
+    """Convert a parsed CSV table, loading dates as datetime64 columns rather than Python date objects."""
+    import pyarrow as pa
+
+    for i, field in enumerate(table.schema):
+        if pa.types.is_date(field.type):
+            table = table.set_column(i, pa.field(field.name, pa.timestamp('ns')), table.column(i).cast(pa.timestamp('ns')))
+    return _arrow.to_pandas(table)
+
+
+def _csv_chunks(file_path, chunk_size, dtype=None, usecols=None, compat=False):
+    """Yield DataFrames of about chunk_size rows parsed from a CSV by the streaming pyarrow reader.
+
+    Types are inferred from the first block of the file and then enforced, so a later value that
+    does not fit (e.g. text in a column that started numeric) raises; pass dtype for such columns
+    or compat=True to read every column as a string. usecols columns missing from the file are
+    ignored.
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    read_options = pv.ReadOptions(use_threads=True, block_size=_CSV_BLOCK_SIZE)
+    with pv.open_csv(file_path, read_options=read_options) as reader:
+        names = reader.schema.names
+    if usecols is not None:
+        usecols = [name for name in names if name in set(usecols)]
+    if compat:
+        dtype = dict.fromkeys(names, pa.string())
+
+    reader = pv.open_csv(file_path, read_options=read_options, convert_options=_csv_convert_options(dtype, usecols))
+
+    def convert(table):
+        df = _csv_to_pandas(table)
+        if compat:
+            # Python strings with NaN for missing values, as fp(compat=True) loads them
+            df = df.astype(object).where(df.notna(), np.nan)
+        return df
+
+    batches = []
+    rows = 0
+    try:
+        while True:
+            try:
+                batch = reader.read_next_batch()
+            except StopIteration:
+                break
+            except pa.ArrowInvalid as e:
+                raise ValueError(f"{e}. Pass dtype for this column, or compat=True to read every column as a string.")
+            batches.append(batch)
+            rows += batch.num_rows
+            if rows >= chunk_size:
+                # A block may hold more rows than a chunk; carry the remainder over
+                table = pa.Table.from_batches(batches)
+                offset = 0
+                while table.num_rows - offset >= chunk_size:
+                    yield convert(table.slice(offset, chunk_size))
+                    offset += chunk_size
+                batches = table.slice(offset).to_batches()
+                rows = table.num_rows - offset
+        if rows:
+            yield convert(pa.Table.from_batches(batches))
+    finally:
+        reader.close()
+
+
+# Aggregations g() can compute chunk by chunk, as the partial aggregates they are combined from
+_PARTIAL_AGGREGATES = {'sum': ['sum'], 'count': ['count'], 'size': ['size'], 'min': ['min'], 'max': ['max'], 'mean': ['sum', 'count']}
+_COMBINE_PARTIALS = {'sum': 'sum', 'count': 'sum', 'size': 'sum', 'min': 'min', 'max': 'max'}
+
+
+def _partial_aggregate(df, target_cols, agg_funcs):
+    """Partial aggregates of one chunk for g(target_cols, agg_funcs), to be merged by _combine_partials."""
+    target_cols = [target_cols] if isinstance(target_cols, str) else list(target_cols)
+    data = {col: df[col] for col in target_cols}
+    specs = {}
+    for agg_func in agg_funcs:
+        col, func = agg_func.split('::')
+        values = df[col]
+        # Convert text as g() does before numeric aggregations
+        if func in ('sum', 'mean', 'min', 'max') and pd.api.types.is_string_dtype(values.dtype):
+            values = pd.to_numeric(values.str.replace(' ', ''), errors='coerce')
+        for part in _PARTIAL_AGGREGATES[func]:
+            name = f'{col}_{func}:{part}'
+            data[name] = values
+            specs[name] = part
+    return pd.DataFrame(data).groupby(target_cols).agg(specs).reset_index()
+
+
+def _agg_inputs(group):
+    """Columns a g() step reads, in order."""
+    target_cols = [group['target_cols']] if isinstance(group['target_cols'], str) else list(group['target_cols'])
+    return list(dict.fromkeys(target_cols + [agg_func.split('::')[0] for agg_func in group['agg_funcs']]))
+
+
+def _merge_partials(partials, target_cols):
+    """Merge a list of partial aggregate frames into one with a row per group."""
+    target_cols = [target_cols] if isinstance(target_cols, str) else list(target_cols)
+    partials = pd.concat(partials, ignore_index=True)
+    specs = {name: _COMBINE_PARTIALS[name.rsplit(':', 1)[1]] for name in partials.columns if name not in target_cols}
+    return partials.groupby(target_cols).agg(specs).reset_index()
+
+
+def _combine_partials(merged, target_cols, agg_funcs):
+    """Turn merged partial aggregates into the frame g(target_cols, agg_funcs) would return."""
+    target_cols = [target_cols] if isinstance(target_cols, str) else list(target_cols)
+    combined = merged.set_index(target_cols)
+
+    result = pd.DataFrame(index=combined.index)
+    for agg_func in agg_funcs:
+        col, func = agg_func.split('::')
+        if func == 'mean':
+            total = combined[f'{col}_{func}:sum']
+            count = combined[f'{col}_{func}:count']
+            result[f'{col}_{func}'] = total / count.where(count > 0)
+        else:
+            result[f'{col}_{func}'] = combined[f'{col}_{func}:{func}']
+    return result.reset_index()
+
+
+def _query_chunks(db_preset, query, chunk_size):
+    """Yield DataFrame chunks of a query read from a single streaming result.
+
+    MySQL and MSSQL cursors are drained with fetchmany, ClickHouse returns Arrow blocks of
+    about chunk_size rows and BigQuery result pages of chunk_size rows, so only the current
+    chunk is held in memory.
+    """
+    db_type = db_preset['db_type']
+    if db_type not in ('mssql', 'mysql', 'clickhouse', 'google_big_query'):
+        raise ValueError(f"Unsupported db_type: {db_type}")
+
+    if db_type == 'google_big_query':
+        import pyarrow as pa
+
+        results = _bq_client(db_preset).query(query).result(page_size=chunk_size)
+        for batch in results.to_arrow_iterable():
+            yield _arrow.to_pandas(pa.Table.from_batches([batch]))
+        return
+
+    database = db_preset['database'] if db_type == 'clickhouse' else db_preset.get('database', '')
+    with _pool.connection(db_preset, database) as conn:
+        if db_type == 'clickhouse':
+            import pyarrow as pa
+
+            with conn.query_arrow_stream(query, settings={'max_block_size': chunk_size}) as stream:
+                for batch in stream:
+                    yield _arrow.to_pandas(pa.Table.from_batches([batch]))
+            return
+
+        with conn.cursor() as cursor:
+            cursor.execute(query)
+            columns = [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield pd.DataFrame(rows, columns=columns)
+
+
+def _file_chunks(file_path, chunk_size):
+    """Yield DataFrame chunks of chunk_size rows from a parquet (file or dataset directory) or feather file."""
+    file_extension = file_path.split('.')[-1]
+
+    if file_extension == 'parquet':
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        for batch in ds.dataset(file_path, format='parquet').to_batches(batch_size=chunk_size):
+            if batch.num_rows:
+                yield _arrow.to_pandas(pa.Table.from_batches([batch]))
+
+    elif file_extension in ('feather', 'arrow'):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        # Memory-mapped, so each slice only pages in the rows it converts
+        table = feather.read_table(file_path, memory_map=True)
+        for offset in range(0, table.num_rows, chunk_size):
+            yield _arrow.to_pandas(table.slice(offset, chunk_size))
+
+    else:
+        raise ValueError(f"Unsupported file extension for streaming: {file_extension}")
+
+
+def _source_chunks(file_path, chunk_size, dtype=None, usecols=None, compat=False):
+    """Chunks of one file of a chunked fp() plan; usecols only narrows CSV parsing."""
+    file_extension = file_path.split('.')[-1]
+    if file_extension == 'csv':
+        return _csv_chunks(file_path, chunk_size, dtype, usecols, compat)
+    if file_extension in ('parquet', 'feather', 'arrow'):
+        return _file_chunks(file_path, chunk_size)
+    raise ValueError(f"Unsupported file extension for chunked reading: {file_extension}")
+
+
+def _files_chunks(file_path, chunk_size, dtype=None, usecols=None, compat=False):
+    """Yield the chunks of every file of a glob or directory in turn, with their partition columns."""
+    paths = _expand_files(file_path)
+    partitions = _partition_columns(paths)
+    file_usecols = [col for col in usecols if col not in partitions] if usecols is not None else None
+    for i, path in enumerate(paths):
+        for df_chunk in _source_chunks(path, chunk_size, dtype, file_usecols, compat):
+            for key, values in partitions.items():
+                if key not in df_chunk.columns:
+                    df_chunk[key] = values.take(np.full(len(df_chunk), i))
+            yield df_chunk
+
+
+def _append(df, full_path):
+    """Append a frame to a CSV file (header only for a new file) or a parquet dataset directory."""
+    if full_path.lower().endswith('.csv'):
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        new_file = not os.path.exists(full_path) or os.path.getsize(full_path) == 0
+        if not new_file:
+            with open(full_path, 'r', newline='') as f:
+                header = next(csv.reader(f), [])
+            if header != [str(col) for col in df.columns]:
+                raise ValueError(f"Columns do not match the header of {full_path}: {header}")
+        df.to_csv(full_path, mode='a', header=new_file, index=False)
+    else:
+        if os.path.isfile(full_path):
+            raise ValueError(f"{full_path} is a parquet file; appending needs a dataset directory path.")
+        _arrow.append_parquet_part(df, full_path)
+
+
+def _same_keys(left, right):
+    """Row-wise mask of where two equally long key frames hold the same values, nulls matching nulls."""
+    same = np.ones(len(left), dtype=bool)
+    for a, b in zip(left.columns, right.columns):
+        x, y = left[a].reset_index(drop=True), right[b].reset_index(drop=True)
+        same &= x.eq(y).fillna(False).to_numpy(dtype=bool) | (x.isna() & y.isna()).to_numpy()
+    return same
+
+
+def _first_occurrences(df, columns, seen):
+    """Mask of rows whose columns were not seen in this or an earlier chunk, and the updated seen state.
+
+    seen is None or the sorted 64-bit hashes of the distinct keys so far with the keys in the same
+    order. The hashes find the earlier key a row may repeat and its values confirm it, so a hash
+    collision never drops a distinct row; the cost is keeping one copy of each distinct key.
+    """
+    keys = df[columns].reset_index(drop=True)
+    first = ~keys.duplicated().to_numpy()
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    if seen is not None:
+        seen_hashes, seen_keys = seen
+        start = np.searchsorted(seen_hashes, hashes)
+        candidates = np.flatnonzero(first & (seen_hashes[np.minimum(start, len(seen_hashes) - 1)] == hashes)) if len(seen_hashes) else np.empty(0, dtype=np.intp)
+        same = _same_keys(keys.iloc[candidates], seen_keys.iloc[start[candidates]])
+        first[candidates[same]] = False
+        # Only a hash collision leaves a candidate unconfirmed, so this loop sees next to no rows
+        for row in candidates[~same]:
+            for position in range(start[row] + 1, np.searchsorted(seen_hashes, hashes[row], 'right')):
+                if _same_keys(keys.iloc[[row]], seen_keys.iloc[[position]])[0]:
+                    first[row] = False
+                    break
+        hashes = np.concatenate([seen_hashes, hashes[first]])
+        keys = pd.concat([seen_keys, keys[first]], ignore_index=True)
+    else:
+        hashes, keys = hashes[first], keys[first]
+    order = np.argsort(hashes, kind='stable')
+    return first, (hashes[order], keys.take(order).reset_index(drop=True))
+
+
+def _sql_values(df):
+    """Rows of a frame as lists of plain Python values for DB-API drivers.
+
+    NaN, NaT and NA become None, timestamps datetimes, and lists and dicts JSON strings.
+    """
+    values = df.astype(object).where(df.notna(), None)
+    columns = [[json.dumps(v) if isinstance(v, (list, dict)) else v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in values.iloc[:, i]] for i in range(values.shape[1])]
+    return [list(row) for row in zip(*columns)]
+
+
+def _upsert_rows(df, key_columns):
+    """The rows of a keyed upsert that decide the table's final state.
+
+    Applied one at a time, a row updates any earlier row with the same key, so only the last row
+    per key is kept; rows with a null key never match anything and are all kept.
+    """
+    keyed = df[key_columns].notna().all(axis=1)
+    return df[~(keyed & df.duplicated(subset=key_columns, keep='last'))]
+
+
+def _staged_upsert(conn, table_name, df, key_columns, update_columns, insert_columns, batch_size=10000, print_query=False, dialect='mysql'):
+    """Upsert a frame into a MySQL or SQLite table through a temporary staging table, in one transaction.
+
+    The rows are staged with batched executemany INSERTs. One UPDATE joined to the stage then
+    sets update_columns on every table row whose key_columns equal a staged row's, taking the
+    values of the last staged row with that key, and one INSERT ... SELECT adds every staged row
+    that matched nothing (null keys never match). Returns (inserted, updated), updated counting
+    the distinct staged keys that matched existing rows.
+    """
+    stage = f"rgwml_stage_{uuid.uuid4().hex[:12]}"
+    staged_columns = list(dict.fromkeys(key_columns + update_columns + insert_columns))
+    match = " AND ".join(f"t.{col} = s.{col}" for col in key_columns)
+    placeholder = '%s' if dialect == 'mysql' else '?'
+    drop_table = f"DROP TEMPORARY TABLE {{}}{stage}" if dialect == 'mysql' else f"DROP TABLE {{}}temp.{stage}"
+    # Flag the last row per key, the one whose values an update ends up with
+    last = (~df.duplicated(subset=key_columns, keep='last')).astype(int).tolist()
+    rows = [row + [flag] for row, flag in zip(_sql_values(df[staged_columns]), last)]
+
+    cursor = conn.cursor()
+
+    def run(query):
+        if print_query:
+            print(query)
+        cursor.execute(query)
+
+    try:
+        if dialect == 'sqlite':
+            run("BEGIN IMMEDIATE")
+        key_index = None
+        if dialect == 'sqlite' and not _sqlite_key_index(conn, table_name, key_columns):
+            # Index the keys for the merge only; dropped again before the commit, the schema never changes
+            schema, _, table = table_name.rpartition('.')
+            key_index = f"{schema + '.' if schema else ''}rgwml_key_{stage[len('rgwml_stage_'):]}"
+            run(f"CREATE INDEX {key_index} ON {table} ({', '.join(key_columns)})")
+
+        # Typed like the target columns, but without its keys and indexes
+        run(f"CREATE TEMPORARY TABLE {stage} AS SELECT {', '.join(staged_columns)}, 1 AS rgwml_last FROM {table_name} WHERE 1 = 0")
+        stage_query = f"INSERT INTO {stage} ({', '.join(staged_columns)}, rgwml_last) VALUES ({', '.join([placeholder] * (len(staged_columns) + 1))})"
+        if print_query:
+            print(stage_query, f"({len(rows)} rows in batches of {batch_size})")
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(stage_query, rows[start:start + batch_size])
+
+        last_match = f"{match} AND s.rgwml_last = 1"
+        run(f"SELECT COUNT(*) FROM {stage} AS s WHERE s.rgwml_last = 1 AND EXISTS (SELECT 1 FROM {table_name} AS t WHERE {match})")
+        updated = cursor.fetchone()[0]
+        if updated and update_columns:
+            if dialect == 'mysql':
+                run(f"UPDATE {table_name} AS t JOIN {stage} AS s ON {last_match} SET {', '.join(f't.{col} = s.{col}' for col in update_columns)}")
+            elif sqlite3.sqlite_version_info >= (3, 33, 0):
+                run(f"UPDATE {table_name} AS t SET {', '.join(f'{col} = s.{col}' for col in update_columns)} FROM {stage} AS s WHERE {last_match}")
+            else:
+                # UPDATE ... FROM needs SQLite 3.33
+                run(f"UPDATE {table_name} AS t SET ({', '.join(update_columns)}) = (SELECT {', '.join(f's.{col}' for col in update_columns)} FROM {stage} AS s WHERE {last_match}) WHERE EXISTS (SELECT 1 FROM {stage} AS s WHERE {last_match})")
+
+        run(f"INSERT INTO {table_name} ({', '.join(insert_columns)}) SELECT {', '.join(f's.{col}' for col in insert_columns)} FROM {stage} AS s WHERE NOT EXISTS (SELECT 1 FROM {table_name} AS t WHERE {match})")
+        inserted = cursor.rowcount
+        run(drop_table.format(''))
+        if key_index is not None:
+            run(f"DROP INDEX {key_index}")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        try:
+            # MySQL temporary tables outlive a rollback and the pooled connection is reused
+            cursor.execute(drop_table.format('IF EXISTS '))
+        except Exception:
+            pass
+        raise
+    finally:
+        cursor.close()
+    return inserted, updated
+
+
+def _sqlite_key_index(conn, table_name, key_columns, unique=False):
+    """Whether a SQLite table has an index led by key_columns, for fast key lookups.
+
+    With unique=True only its primary key or a unique index of exactly key_columns counts, as
+    INSERT ... ON CONFLICT needs.
+    """
+    schema, _, table = table_name.rpartition('.')
+    pragma = f"PRAGMA {schema}." if schema else "PRAGMA "
+    key_columns = set(key_columns)
+
+    primary_key = [row[1] for row in sorted(conn.execute(f"{pragma}table_info({table})"), key=lambda row: row[5]) if row[5]]
+    if set(primary_key[:len(key_columns)]) == key_columns and (len(primary_key) == len(key_columns) or not unique):
+        return True
+    for row in conn.execute(f"{pragma}index_list({table})"):
+        name, is_unique, partial = row[1], row[2], row[4]
+        if partial or (unique and not is_unique):
+            continue
+        columns = [info[2] for info in sorted(conn.execute(f"{pragma}index_info(\"{name}\")"))]
+        if set(columns[:len(key_columns)]) == key_columns and (len(columns) == len(key_columns) or not unique):
+            return True
+    return False
+
+
+def _sqlite_conflict_upsert(conn, table_name, df, key_columns, update_columns, insert_columns, batch_size=10000, print_query=False):
+    """Upsert a frame into a SQLite table with INSERT ... ON CONFLICT DO UPDATE, in one transaction.
+
+    Needs a primary key or unique index on exactly key_columns, and at most one row per non-null
+    key. Returns (inserted, updated), counted by looking the keys up in that index beforehand.
+    """
+    rows = _sql_values(df[insert_columns])
+    keys = [key for key, keyed in zip(_sql_values(df[key_columns]), df[key_columns].notna().all(axis=1)) if keyed]
+    # Within the 999 variables older SQLite builds allow per statement
+    keys_per_query = max(1, 999 // len(key_columns))
+    key_tuple = f"({', '.join(['?'] * len(key_columns))})"
+    if update_columns:
+        action = f"DO UPDATE SET {', '.join(f'{col} = excluded.{col}' for col in update_columns)}"
+    else:
+        action = "DO NOTHING"
+    upsert_query = f"INSERT INTO {table_name} ({', '.join(insert_columns)}) VALUES ({', '.join(['?'] * len(insert_columns))}) ON CONFLICT ({', '.join(key_columns)}) {action}"
+    if print_query:
+        print(upsert_query, f"({len(rows)} rows in batches of {batch_size})")
+
+    cursor = conn.cursor()
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        updated = 0
+        for start in range(0, len(keys), keys_per_query):
+            batch = keys[start:start + keys_per_query]
+            count_query = f"SELECT COUNT(*) FROM {table_name} WHERE ({', '.join(key_columns)}) IN (VALUES {', '.join([key_tuple] * len(batch))})"
+            updated += cursor.execute(count_query, [value for key in batch for value in key]).fetchone()[0]
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(upsert_query, rows[start:start + batch_size])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    # The rows are unique per key, so each one either updated an existing key or inserted
+    return len(rows) - updated, updated
+
+
+def _deferrable(method):
+    """Record calls in the pending plan instead of running them while the instance is lazy."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if not self._lazy or self._executing:
+            return method(self, *args, **kwargs)
+        step = _plan.bind(method, args, kwargs)
+        if step.op in _plan.SOURCE_OPS:
+            # A load replaces the frame, so nothing recorded before it matters
+            self._pending = [step]
+        else:
+            self._pending.append(step)
+        return self
+    return wrapper
 
 
 class p:
 
+    # Global default for how chainable methods render the frame after each step.
+    # Override per process with p.verbosity = 'SILENT' or the RGWML_VERBOSITY env var,
+    # and per instance with d.sv('SUMMARY').
+    verbosity = _verbosity(os.environ.get('RGWML_VERBOSITY', 'FULL'), 'RGWML_VERBOSITY')
+
+    # Global default for forced garbage collections at the end of methods: ALWAYS, NEVER,
+    # AFTER_LOAD (only after LOAD methods) or RSS:n (only once resident memory reaches n MB).
+    # Override per process with p.gc_policy or RGWML_GC_POLICY, per instance with d.sgc().
+    gc_policy = _gc_policy(os.environ.get('RGWML_GC_POLICY', 'ALWAYS'), 'RGWML_GC_POLICY')
+
     def __init__(self, df=None, source=None):
         """Initialize the p class with an empty DataFrame and source path."""
+        self._lazy = False
+        self._executing = False
+        self._pending = []
+        self._shared = False
         self.df = df
         self.source = source
+        self._step_started = time.perf_counter()
+        self._gc_stats = {'collections': 0, 'seconds': 0.0, 'skipped': 0}
+
+    @property
+    def df(self):
+        """The current DataFrame, executing any pending lazy plan first."""
+        if self._pending:
+            self._run_plan()
+        if self._shared and sys._getframe(1).f_globals.get('__name__') != __name__:
+            # Read from outside this module, where it may be written in place
+            return self._private()
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        # Assigning a frame directly supersedes whatever plan was pending
+        self._df = value
+        self._pending = []
+
+    def _private(self):
+        """The frame, first copied if it may share buffers with a clone."""
+        if self._shared and self._df is not None:
+            self._df = self._df.copy()
+        self._shared = False
+        return self._df
 
     def cl(self):
-        """UTILS::[d.clo()] Clone."""
+        """UTILS::[d.clo()] Clone. p methods on either side only copy the columns they change; the first gdf() or d.df on a side copies its whole frame, so in-place edits never reach the other."""
+        self._gc()
+        # A shallow copy gets its own column index, so appends, drops and column replacements
+        # on either side stay private; the only in-place write (ur) copies its column first.
+        # Both sides are marked shared, so the frame is copied before it leaves this module.
+        clone = p(df=self.df.copy(deep=False) if self.df is not None else None)
+        if self.df is not None:
+            self._shared = clone._shared = True
+        clone.verbosity = self.verbosity
+        clone.gc_policy = self.gc_policy
+        clone._lazy = self._lazy
+        return clone
+
+    def sv(self, verbosity):
+        """UTILS::[d.sv('SUMMARY')] Set verbosity for this instance. Options: SILENT (render nothing), SUMMARY (shape, dtypes and step timing), FULL (default, print the frame after every step)."""
+        self.verbosity = _verbosity(verbosity)
+        return self
+
+    def sgc(self, policy):
+        """UTILS::[d.sgc('RSS:4096')] Set garbage collection policy for this instance. Options: ALWAYS (default), NEVER, AFTER_LOAD, RSS:n (collect only once resident memory reaches n MB)."""
+        self.gc_policy = _gc_policy(policy)
+        return self
+
+    def lz(self, enabled=True):
+        """UTILS::[d.lz()] Lazy mode. Record subsequent fq, fp, f, fim, fimc, rtc, rnc, ncl, ddrf, lim, cs, g, acc, abc and asc calls as a plan that is optimized and executed in one pass when the frame is next used, e.g. by gdf(), pr() or s(). d.lz(False) executes the pending plan and returns to eager mode."""
+        if not enabled and self._pending:
+            self._run_plan()
+        self._lazy = enabled
+        return self
+
+    def xp(self):
+        """INSPECT::[d.xp()] Explain. Print the pending lazy plan as recorded and as it will run after optimization."""
+        if not self._pending:
+            print("No pending plan.")
+            return self
+
+        for title, steps in (("Recorded plan", self._pending), ("Optimized plan", self._optimized_plan())):
+            print(f"{title}:")
+            for i, step in enumerate(steps):
+                branch = "└──" if i == len(steps) - 1 else "├──"
+                print(f"{branch} {_plan.describe(step)}")
+        return self
+
+    def _optimized_plan(self):
+        """The pending plan after optimization, pushing leading steps into the SQL of an fq() source or the reader of a parquet fp() source."""
+        dialect = None
+        file_columns = None
+        source = self._pending[0]
+        if source.op == 'fq':
+            db_preset = _config.preset('db_presets', source.params['db_preset_name'])
+            dialect = db_preset.get('db_type') if db_preset else None
+        elif source.op == 'fp':
+            file_columns = _parquet_source_columns(str(source.params['file_path']))
+        return _plan.optimize(self._pending, dialect, file_columns)
+
+    def _run_plan(self, sink=None):
+        """Execute the pending lazy plan, rendering and collecting once at the end instead of after every step."""
+        steps = self._optimized_plan()
+        self._pending = []
+        self._step_started = time.perf_counter()
+        self._executing = True
+        try:
+            if steps[0].op == 'fp' and steps[0].params.get('chunk_size'):
+                self._run_chunked(steps, sink)
+            else:
+                self._apply(steps)
+        finally:
+            self._executing = False
+
+        self._pr(step='plan')
+        self._gc(load=steps[0].op in _plan.SOURCE_OPS)
+
+    def _apply(self, steps):
+        """Run plan steps in order on the current frame."""
+        for op, params in steps:
+            if op == _plan.PROJECT:
+                if self.df is not None:
+                    self.df = self.df[[col for col in self.df.columns if col in params['columns']]]
+            else:
+                getattr(self, op)(**params)
+
+    def _run_chunked(self, steps, sink=None):
+        """Run a plan on fp(path, chunk_size=n) one chunk at a time in bounded memory.
+
+        Row-wise steps run on every chunk, with lim and ddrf carrying their state across chunks.
+        A g() is computed as per-chunk partial aggregates merged as they arrive, after which any
+        remaining steps run on the (small) grouped frame. Without a g() the processed chunks are
+        appended to sink, or spilled to Arrow files and assembled when there is no sink.
+        """
+        source = steps[0].params
+        steps = steps[1:]
+        split = next((i for i, step in enumerate(steps) if step.op == 'g'), len(steps))
+        chunk_steps, rest = steps[:split], steps[split:]
+
+        for op, params in chunk_steps:
+            if op not in _CHUNKED_OPS:
+                raise ValueError(f"{op}() cannot run chunk by chunk. Chunked fp() plans support {', '.join(sorted(o for o in _CHUNKED_OPS if o != _plan.PROJECT))}, then g().")
+            if op == 'ncl' and params['irregular_value_treatment'] == 'MEAN':
+                raise ValueError("ncl() with MEAN needs the whole column and cannot run chunk by chunk.")
+        group = rest[0].params if rest else None
+        if group is not None:
+            for agg_func in group['agg_funcs']:
+                if '::' not in agg_func or agg_func.split('::')[1] not in _PARTIAL_AGGREGATES:
+                    raise ValueError(f"Chunked g() supports the {', '.join(_PARTIAL_AGGREGATES)} aggregations, not {agg_func}.")
+
+        file_path = source['file_path']
+        self.source = os.path.abspath(file_path)
+        usecols = source['usecols']
+        if usecols is None and chunk_steps and chunk_steps[0].op == _plan.PROJECT:
+            # Parse only the columns the plan reads
+            usecols = chunk_steps[0].params['columns']
+        if _is_multi_file(file_path):
+            chunks = _files_chunks(file_path, source['chunk_size'], source['dtype'], usecols, source['compat'])
+        else:
+            chunks = _source_chunks(file_path, source['chunk_size'], source['dtype'], usecols, source['compat'])
+
+        limits = {}
+        seen = {}
+        partials = []
+        merged = None
+        parts = []
+        spill_dir = None
+        columns = []
+        rows_in = rows_out = 0
+        started = time.perf_counter()
+        peak_mb = _rss_mb()
+        try:
+            for number, df_chunk in enumerate(chunks, 1):
+                rows_in += len(df_chunk)
+                self.df = df_chunk
+                df_chunk = None
+                # Each step replaces the frame, so writes into a filtered chunk are not chained
+                # assignments; without a collection after every step pandas would warn they are
+                with pd.option_context('mode.chained_assignment', None):
+                    for i, (op, params) in enumerate(chunk_steps):
+                        if op == _plan.PROJECT:
+                            self.df = self.df[[col for col in self.df.columns if col in params['columns']]]
+                        elif op == 'lim':
+                            self.df = self.df.head(limits.get(i, params['num_rows']))
+                            limits[i] = limits.get(i, params['num_rows']) - len(self.df)
+                        elif op == 'ddrf':
+                            first, seen[i] = _first_occurrences(self.df, [col.strip() for col in params['columns'].split(',')], seen.get(i))
+                            self.df = self.df[first]
+                        else:
+                            getattr(self, op)(**params)
+
+                out = self.df
+                rows_out += len(out)
+                columns = list(out.columns)
+                if group is not None:
+                    partials.append(_partial_aggregate(out, group['target_cols'], group['agg_funcs']))
+                    if len(partials) >= 16:
+                        # Keep the partial aggregates at about one row per group
+                        merged = _merge_partials(([merged] if merged is not None else []) + partials, group['target_cols'])
+                        partials = []
+                elif sink is not None:
+                    _append(out, sink)
+                else:
+                    if spill_dir is None:
+                        spill_dir = tempfile.mkdtemp(prefix='rgwml_fp_')
+                    parts.append(_arrow.spill(out, spill_dir, len(parts)))
+                self.df = None
+
+                peak_mb = max(peak_mb, _rss_mb())
+                if self.verbosity != 'SILENT':
+                    elapsed = time.perf_counter() - started
+                    print(f"Chunk {number}: {rows_in:,} rows read, {rows_out:,} kept, {rows_in / elapsed if elapsed else 0:,.0f} rows/s, RSS {peak_mb:,.0f} MB peak")
+                if any(remaining <= 0 for remaining in limits.values()):
+                    break
+
+            if group is not None:
+                if merged is None and not partials:
+                    # Nothing was read: aggregate an empty frame for the output columns
+                    partials = [_partial_aggregate(pd.DataFrame(columns=columns or _agg_inputs(group)), group['target_cols'], group['agg_funcs'])]
+                merged = _merge_partials(([merged] if merged is not None else []) + partials, group['target_cols'])
+                self.df = _combine_partials(merged, group['target_cols'], group['agg_funcs'])
+                self._apply(rest[1:])
+                if sink is not None:
+                    _append(self.df, sink)
+            elif sink is not None:
+                # The rows are in the sink; keep an empty frame with their columns
+                self.df = pd.DataFrame(columns=columns)
+            else:
+                self.df = _arrow.read_parts(parts)
+        finally:
+            chunks.close()
+            if spill_dir is not None:
+                shutil.rmtree(spill_dir, ignore_errors=True)
+
+        elapsed = time.perf_counter() - started
+        if self.verbosity != 'SILENT':
+            print(f"Processed {rows_in:,} rows in {elapsed:.1f}s ({rows_in / elapsed if elapsed else 0:,.0f} rows/s), kept {rows_out:,}, peak RSS {max(peak_mb, _rss_mb()):,.0f} MB" + (f", appended to {sink}" if sink is not None else ""))
+
+    def qcs(self):
+        """INSPECT::[d.qcs()] Query cache stats. Print this process's fq() cache hits, misses, stores and evictions, and the entries and size on disk."""
+        stats = _cache.stats()
+        print(f"Query cache {_cache.cache_dir()}: {stats['entries']} entries, {stats['bytes'] / (1024 * 1024):.1f} MB. Hits: {stats['hits']}, misses: {stats['misses']}, stores: {stats['stores']}, evictions: {stats['evictions']}.")
+        return self
+
+    def qci(self, db_preset_name=None, query=None):
+        """UTILS::[d.qci('preset_name', 'SELECT * FROM your_table')] Query cache invalidate. Drop the cached fq() result of a query, or every cached result when called without arguments."""
+        if db_preset_name is None and query is None:
+            print(f"Removed {_cache.clear()} cached query results.")
+            return self
+        if db_preset_name is None or query is None:
+            raise ValueError("Pass both db_preset_name and query, or neither to clear the whole cache.")
+
+        db_preset = _config.preset('db_presets', db_preset_name)
+        if not db_preset:
+            raise ValueError(f"No matching db_preset found for {db_preset_name}")
+        removed = _cache.remove(_cache.key(db_preset, query))
+        print("Removed the cached query result." if removed else "No cached result for this query.")
+        return self
+
+    def gcs(self):
+        """INSPECT::[d.gcs()] GC stats. Print the number of forced garbage collections run by this pipeline and the time spent in them."""
+        stats = self._gc_stats
+        print(f"GC policy: {self.gc_policy}. Forced collections: {stats['collections']} taking {stats['seconds']:.3f}s, skipped: {stats['skipped']}.")
+        return self
+
+    def _gc(self, load=False):
+        """Force a garbage collection if the GC policy asks for one, timing it for gcs()."""
+        if self._executing:
+            return
+
+        policy = self.gc_policy
+        if policy == 'NEVER' or (policy == 'AFTER_LOAD' and not load):
+            collect = False
+        elif policy.startswith('RSS:'):
+            collect = _rss_mb() >= float(policy.split(':', 1)[1])
+        else:
+            collect = True
+
+        if not collect:
+            self._gc_stats['skipped'] += 1
+            return
+
+        started = time.perf_counter()
         gc.collect()
-        return p(df=copy.deepcopy(self.df))
+        self._gc_stats['collections'] += 1
+        self._gc_stats['seconds'] += time.perf_counter() - started
 
     def gdf(self):
         """UTILS::[d.gdf()] Get DataFrame."""
-        return self.df
+        self.df  # Runs any pending plan
+        return self._private()
 
+    @_deferrable
     def ncl(self, column_names, column_type, irregular_value_treatment):
         """CLEAN::[d.ncl('Column7, Column9', column_type='INTEGER', irregular_value_treatment='NAN')] Numeric clean. Cleans the numeric column based on the specified treatments. column_type (can be INTEGER or FLOAT), irregular_value_treatment (can be NAN, TO_ZERO or MEAN)"""
 
@@ -96,16 +1287,17 @@ class p:
                 mean_value = self.df[column_name].mean()
                 self.df[column_name] = self.df[column_name].fillna(mean_value)
 
-        self.pr()
+        self._pr()
         return self
 
+    @_deferrable
     def lim(self, num_rows):
         """TINKER::[d.lim(7)] Limit the DataFrame to a specified number of rows."""
         if not isinstance(num_rows, int):
             raise ValueError("The number of rows should be an integer.")
         if self.df is not None:
             self.df = self.df.head(num_rows)
-        self.pr()
+        self._pr()
         return self
 
     def frd(self, headers, data):
@@ -115,7 +1307,7 @@ class p:
             self.source = None  # Clear the source since data is from raw input
         else:
             raise ValueError("Data should be an array of arrays.")
-        self.pr()
+        self._pr()
         return self
 
     def ar(self, rows):
@@ -131,7 +1323,7 @@ class p:
             new_rows_df = pd.DataFrame(rows, columns=self.df.columns)
             # Append the new rows to the existing DataFrame
             self.df = pd.concat([self.df, new_rows_df], ignore_index=True)
-        self.pr()
+        self._pr()
         return self
 
     def ac(self, *col_names):
@@ -144,7 +1336,7 @@ class p:
         for col_name in col_names:
             self.df[col_name] = pd.Series([None] * len(self.df), dtype='object')
 
-        self.pr()
+        self._pr()
         return self
 
     def ur(self, condition, updates):
@@ -167,9 +1359,11 @@ class p:
 
         # Update the specified columns
         for col_name, new_value in updates.items():
+            # Write into a private copy of the column, which may be shared with a clone
+            self.df[col_name] = self.df[col_name].copy()
             self.df.loc[mask.index, col_name] = new_value
 
-        self.pr()
+        self._pr()
         return self
 
     def dr(self, condition):
@@ -180,7 +1374,7 @@ class p:
             raise ValueError("No rows match the given condition.")
         # Drop the rows that match the condition
         self.df = self.df.drop(mask.index).reset_index(drop=True)
-        self.pr()
+        self._pr()
         return self
 
     def dd(self):
@@ -188,11 +1382,12 @@ class p:
         if self.df is not None:
             # Drop duplicates keeping the first occurrence
             self.df = self.df.drop_duplicates(keep='first')
-            self.pr()
+            self._pr()
             return self
         else:
             raise ValueError("DataFrame is not initialized.")
 
+    @_deferrable
     def ddrf(self, columns):
         """CLEAN::[d.ddrf('Column1, Column7')] Drop duplicates retaining the first occurrence based on the specified columns."""
         if self.df is not None:
@@ -200,7 +1395,7 @@ class p:
             columns_list = [col.strip() for col in columns.split(',')]
             # Drop duplicates keeping the first occurrence
             self.df = self.df.drop_duplicates(subset=columns_list, keep='first')
-            self.pr()
+            self._pr()
             return self
         else:
             raise ValueError("DataFrame is not initialized.")
@@ -212,47 +1407,48 @@ class p:
             columns_list = [col.strip() for col in columns.split(',')]
             # Drop duplicates keeping the last occurrence
             self.df = self.df.drop_duplicates(subset=columns_list, keep='last')
-            self.pr()
+            self._pr()
             return self
         else:
             raise ValueError("DataFrame is not initialized.")
 
-    def fq(self, db_preset_name, query):
-        """LOAD::[d.fq('preset_name','SELECT * FROM your_table')] From query."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+    @_deferrable
+    def fq(self, db_preset_name, query, dataset_path=None, cache_ttl=None, cache_refresh=False):
+        """LOAD::[d.fq('preset_name','SELECT * FROM your_table')] From query. Optional: dataset_path streams a BigQuery result into a memory-mapped Arrow file; cache_ttl and cache_refresh serve the result from the on-disk query cache."""
 
         # Find the matching db_preset
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
         db_type = db_preset['db_type']
+        if dataset_path is not None and db_type != 'google_big_query':
+            raise ValueError("dataset_path is only supported for google_big_query presets.")
+
+        cache_key = None
+        if cache_ttl is not None:
+            if dataset_path is not None:
+                raise ValueError("cache_ttl cannot be combined with dataset_path.")
+            cache_key = _cache.key(db_preset, query)
+            cached = None if cache_refresh else _cache.get(cache_key)
+            if cached is not None:
+                self.df = cached
+                self._pr()
+                self._gc(load=True)
+                return self
 
         if db_type == 'mssql':
-            host = db_preset['host']
-            username = db_preset['username']
-            password = db_preset['password']
             database = db_preset.get('database', '')
 
-            with pymssql.connect(server=host, user=username, password=password, database=database) as conn:
+            with _pool.connection(db_preset, database) as conn:
                 with conn.cursor() as cursor:
                     cursor.execute(query)
                     rows = cursor.fetchall()
                     columns = [desc[0] for desc in cursor.description]
         elif db_type == 'mysql':
-            host = db_preset['host']
-            username = db_preset['username']
-            password = db_preset['password']
             database = db_preset.get('database', '')
 
-            with mysql.connector.connect(host=host, user=username, password=password, database=database) as conn:
+            with _pool.connection(db_preset, database) as conn:
                 with conn.cursor() as cursor:
                     cursor.execute(query)
                     if cursor.description is not None:
@@ -263,34 +1459,14 @@ class p:
             retry_delay = 5
             for attempt in range(max_retries):
                 try:
-                    host = db_preset['host']
-                    username = db_preset['username']
-                    password = db_preset['password']
-                    database = db_preset['database']
-
-                    # Connect to ClickHouse
-                    client = clickhouse_connect.get_client(
-                        host=host,
-                        port='8123',
-                        username=username,
-                        password=password,
-                        database=database
-                    )
-
-                    # Execute the query
-                    data = client.query(query)
-                    rows = data.result_rows
-                    columns = data.column_names
-
-                    # Convert the result into a DataFrame
-                    df = pd.DataFrame(rows, columns=columns)
-
-                    # Clean up resources
-                    self.df = df
-                    self.pr()
+                    # Borrow a pooled ClickHouse client and fetch the result as compressed
+                    # columnar Arrow blocks rather than Python row tuples
+                    with _pool.connection(db_preset, db_preset['database']) as client:
+                        table = client.query_arrow(query)
 
-                    gc.collect()
-                    return self
+                    # Convert the result into a typed DataFrame
+                    df = _arrow.to_pandas(table)
+                    break
 
                 except Exception as e:
                     print(f"Attempt {attempt + 1} failed: {e}")
@@ -299,39 +1475,37 @@ class p:
                         time.sleep(retry_delay)
                     else:
                         print("All attempts failed. Please check the connection and query.")
+                        raise
 
         elif db_type == 'google_big_query':
-            json_file_path = db_preset['json_file_path']
-            project_id = db_preset['project_id']
-
-            if not db_preset:
-                raise ValueError(f"No matching Google BigQuery preset found for {db_preset_name}")
-
-            credentials = service_account.Credentials.from_service_account_file(json_file_path)
-            client = bigquery.Client(credentials=credentials, project=project_id)
-
-            # Run the query and manually fetch the results
-            query_job = client.query(query)
-            results = query_job.result()
-
-            # Extract rows and columns
-            rows = [list(row.values()) for row in results]
-            columns = results.schema
-
-            # Convert to DataFrame
-            df = pd.DataFrame(rows, columns=[field.name for field in columns])
-            self.df = df
-            self.pr()
-            gc.collect()
-            return self
+            client = _bq_client(db_preset)
+            results = client.query(query).result()
+
+            if dataset_path is not None:
+                # Stream result pages to disk one Arrow record batch at a time and memory-map the
+                # file; an empty result has no pages, so its schema comes from to_arrow()
+                if results.total_rows == 0:
+                    _arrow.write_batches(dataset_path, [], results.to_arrow().schema)
+                else:
+                    _arrow.write_batches(dataset_path, results.to_arrow_iterable())
+                df = _arrow.read_parts([dataset_path])
+            else:
+                # Download Arrow record batches, over parallel BigQuery Storage read streams when
+                # google-cloud-bigquery-storage is installed and over the REST API otherwise
+                df = _arrow.to_pandas(results.to_arrow())
         else:
             raise ValueError(f"Unsupported db_type: {db_type}")
 
-        # Convert to DataFrame
-        df = pd.DataFrame(rows, columns=columns)
+        if db_type in ('mssql', 'mysql'):
+            # Convert to DataFrame
+            df = pd.DataFrame(rows, columns=columns)
+
+        if cache_key is not None:
+            df = _cache.put(cache_key, df, cache_ttl)
+
         self.df = df
-        self.pr()
-        gc.collect()
+        self._pr()
+        self._gc(load=True)
         return self
 
     def fqsp(self, db_abs_path, query):
@@ -362,31 +1536,23 @@ class p:
         finally:
             cursor.close()
             conn.close()
-            gc.collect()
+            self._gc(load=True)
 
         # Convert the results to a DataFrame
         df = pd.DataFrame(rows, columns=columns)
         self.df = df
 
         # Optionally print or process the DataFrame
-        self.pr()
+        self._pr()
 
         # Return self for method chaining or further operations
         return self
 
-    def fslh(self, db_preset_name, query):
-        """LOAD::[d.fslh('preset_name', 'SELECT * FROM tablename')] From SQLite host."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+    def fslh(self, db_preset_name, query, refresh=False):
+        """LOAD::[d.fslh('preset_name', 'SELECT * FROM tablename')] From SQLite host. Queries a local replica, downloaded again only when the remote file changed; refresh=True downloads it regardless."""
 
         # Retrieve the db_preset matching the given db_preset_name
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
@@ -395,33 +1561,12 @@ class p:
         if db_type != 'sqlite3':
             raise ValueError(f"{db_preset_name}: db_type '{db_type}' is not supported by this method")
 
-        # Extract connection details
-        host = db_preset['host']
-        ssh_key_path = db_preset['ssh_key_path']
-        ssh_user = db_preset['ssh_user']
-        db_path = db_preset['db_path']
-
         try:
-            # Prepare a temporary file for the SQLite database
-            with tempfile.NamedTemporaryFile(delete=False) as temp_db_file:
-                temp_db_file_path = temp_db_file.name
-
-            # Use SCP to copy the SQLite database from the remote host to the local machine
-            scp_command = [
-                "scp",
-                "-i", ssh_key_path,
-                f"{ssh_user}@{host}:{db_path}",
-                temp_db_file_path
-            ]
-
-            subprocess.run(scp_command, check=True)
-
-            # Connect to the local SQLite database and execute the query
-            with sqlite3.connect(temp_db_file_path) as conn:
-                self.df = pd.read_sql_query(query, conn)
+            replica_path = _replica.replica(db_preset, refresh=refresh)
 
-            # Remove the temporary database file
-            os.remove(temp_db_file_path)
+            # Read-only, so a query can never modify the replica behind the remote's back
+            with contextlib.closing(sqlite3.connect(f"{pathlib.Path(replica_path).as_uri()}?mode=ro", uri=True)) as conn:
+                self.df = pd.read_sql_query(query, conn)
 
         except subprocess.CalledProcessError as e:
             raise ValueError(f"SCP error: {e}")
@@ -429,23 +1574,35 @@ class p:
             raise ValueError(f"SQLite error: {e}")
 
         # Process and cleanup
-        self.pr()
-        gc.collect()
+        self._pr()
+        self._gc(load=True)
         return self
 
-    def sldbq(self, db_preset_name, query):
-        """DATABASE::[d.sldbq('preset_name', 'SQL QUERY')] SQLite Database Query. Execute and handle both SELECT and alteration queries."""
+    def fslhr(self, db_preset_name, query):
+        """LOAD::[d.fslhr('preset_name', 'SELECT * FROM tablename')] From SQLite host, remotely. Runs the query in the sqlite3 shell on the host over ssh and returns only its typed result, downloading nothing."""
 
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
+        # Retrieve the db_preset matching the given db_preset_name
+        db_preset = _config.preset('db_presets', db_preset_name)
+        if not db_preset:
+            raise ValueError(f"No matching db_preset found for {db_preset_name}")
+
+        # Check that the database type is 'sqlite3'
+        db_type = db_preset['db_type']
+        if db_type != 'sqlite3':
+            raise ValueError(f"{db_preset_name}: db_type '{db_type}' is not supported by this method")
+
+        self.df = _replica.execute(db_preset, query)
+
+        # Process and cleanup
+        self._pr()
+        self._gc(load=True)
+        return self
 
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+    def sldbq(self, db_preset_name, query):
+        """DATABASE::[d.sldbq('preset_name', 'SQL QUERY')] SQLite Database Query. Execute and handle both SELECT and alteration queries, on the local replica (uploading alterations) or, with "execution": "remote", on the host."""
 
         # Retrieve the db_preset matching the given db_preset_name
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
@@ -454,77 +1611,45 @@ class p:
         if db_type != 'sqlite3':
             raise ValueError(f"{db_preset_name}: db_type '{db_type}' is not supported by this method")
 
-        # Extract connection details
-        host = db_preset['host']
-        ssh_key_path = db_preset['ssh_key_path']
-        ssh_user = db_preset['ssh_user']
-        db_path = db_preset['db_path']
+        # Check if the query is an alteration query
+        alteration_keywords = ('insert', 'update', 'delete', 'create', 'alter', 'drop', 'rename')
+        alteration_query = query.strip().lower().startswith(alteration_keywords)
 
-        try:
-            # Prepare a temporary file for the SQLite database
-            with tempfile.NamedTemporaryFile(delete=False) as temp_db_file:
-                temp_db_file_path = temp_db_file.name
-
-            # Use SCP to copy the SQLite database from the remote host to the local machine
-            scp_command = [
-                "scp",
-                "-i", ssh_key_path,
-                f"{ssh_user}@{host}:{db_path}",
-                temp_db_file_path
-            ]
-
-            subprocess.run(scp_command, check=True)
-
-            # Check if the query is an alteration query
-            alteration_keywords = ('insert', 'update', 'delete', 'create', 'alter', 'drop', 'rename')
-            alteration_query = query.strip().lower().startswith(alteration_keywords)
-
-            with sqlite3.connect(temp_db_file_path) as conn:
-                if alteration_query:
-                    # Execute the alteration query
-                    conn.execute(query)
-                    conn.commit()
-                    self.df = pd.DataFrame()
-
-                    # Copy the updated database back to the remote host
-                    scp_command = [
-                        "scp",
-                        "-i", ssh_key_path,
-                        temp_db_file_path,
-                        f"{ssh_user}@{host}:{db_path}"
-                    ]
+        if db_preset.get('execution') == 'remote':
+            self.df = _replica.execute(db_preset, query, write=alteration_query)
+            self._pr()
+            self._gc(load=True)
+            return self
 
-                    subprocess.run(scp_command, check=True)
-                else:
-                    # Execute a select query and load the results into a DataFrame
+        try:
+            if alteration_query:
+                # Execute the alteration query, then copy the updated database back to the remote host
+                with _replica.writable(db_preset) as replica_path:
+                    with contextlib.closing(sqlite3.connect(replica_path)) as conn:
+                        conn.execute(query)
+                        conn.commit()
+                self.df = pd.DataFrame()
+            else:
+                # Execute a select query and load the results into a DataFrame
+                replica_path = _replica.replica(db_preset)
+                with contextlib.closing(sqlite3.connect(f"{pathlib.Path(replica_path).as_uri()}?mode=ro", uri=True)) as conn:
                     self.df = pd.read_sql_query(query, conn)
 
-            # Remove the temporary database file
-            os.remove(temp_db_file_path)
-
         except subprocess.CalledProcessError as e:
             raise ValueError(f"SCP error: {e}")
         except sqlite3.Error as e:
             raise ValueError(f"SQLite error: {e}")
 
         # Process and cleanup
-        self.pr()
-        gc.collect()
+        self._pr()
+        self._gc(load=True)
         return self
 
     def dbq(self, preset_name, db_or_dataset_name, query):
         """DATABASE::[d.dbq('preset_name', 'db_or_dataset_name', 'YOUR QUERY')] Execute a query on the specified database and print the results if it returns data."""
 
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
         # Retrieve the db_preset matching the given preset_name
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == preset_name), None)
+        db_preset = _config.preset('db_presets', preset_name)
 
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {preset_name}")
@@ -539,12 +1664,9 @@ class p:
         db_type = db_preset['db_type']
 
         if db_type == 'mssql':
-            host = db_preset['host']
-            username = db_preset['username']
-            password = db_preset['password']
             database = db_preset.get('database', '')
 
-            with pymssql.connect(server=host, user=username, password=password, database=database) as conn:
+            with _pool.connection(db_preset, database) as conn:
                 with conn.cursor() as cursor:
                     cursor.execute(query)
                     if cursor.description:
@@ -556,12 +1678,9 @@ class p:
                         conn.commit()
 
         elif db_type == 'mysql':
-            host = db_preset['host']
-            username = db_preset['username']
-            password = db_preset['password']
             database = db_preset.get('database', '')
 
-            with mysql.connector.connect(host=host, user=username, password=password, database=database) as conn:
+            with _pool.connection(db_preset, database) as conn:
                 with conn.cursor() as cursor:
                     cursor.execute(query)
                     if cursor.description:
@@ -576,12 +1695,8 @@ class p:
                         pass
 
         elif db_type == 'clickhouse':
-            host = db_preset['host']
-            username = db_preset['username']
-            password = db_preset['password']
-
-            client = clickhouse_connect.get_client(host=host, port='8123', username=username, password=password)
-            data = client.query(query)
+            with _pool.connection(db_preset) as client:
+                data = client.query(query)
             rows = data.result_rows
             columns = data.column_names
 
@@ -599,11 +1714,7 @@ class p:
                 print(df)
 
         elif db_type == 'google_big_query':
-            json_file_path = db_preset['json_file_path']
-            project_id = db_preset['project_id']
-
-            credentials = service_account.Credentials.from_service_account_file(json_file_path)
-            client = bigquery.Client(credentials=credentials, project=project_id)
+            client = _bq_client(db_preset)
 
             query_job = client.query(query)
             result = query_job.result()
@@ -619,22 +1730,13 @@ class p:
         # Reset pandas display options
         pd.reset_option('display.max_rows')
         pd.reset_option('display.max_columns')
-        gc.collect()
+        self._gc()
         return self
 
     def dbct(self, db_preset_name, db_name, table_name, columns_str, print_query=False):
         """DATABASE::[d.dbct('preset_name', 'db_name', 'your_table', 'Column1, Column2, Column3[VARCHAR(1000)]', print_query=False)] Create table."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
         # Find the matching db_preset
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
@@ -643,11 +1745,6 @@ class p:
         if db_type != 'mysql':
             raise ValueError(f"Unsupported db_type for this method: {db_type}")
 
-        # Retrieve connection details
-        host = db_preset['host']
-        username = db_preset['username']
-        password = db_preset['password']
-
         # Process columns from the input string
         columns = columns_str.split(',')
         columns = [col.strip() for col in columns]
@@ -669,7 +1766,7 @@ class p:
         create_query = f"CREATE TABLE `{table_name}` ({', '.join(processed_columns)})"
 
         # Connect to the database and execute the query
-        with mysql.connector.connect(host=host, user=username, password=password, database=db_name) as conn:
+        with _pool.connection(db_preset, db_name) as conn:
             cursor = conn.cursor()
 
             try:
@@ -680,23 +1777,14 @@ class p:
 
             finally:
                 cursor.close()
-                gc.collect()
+                self._gc()
 
         return self
 
     def dbrct(self, db_preset_name, db_name, table_name, columns_str, print_query=False):
         """DATABASE::[d.dbrct('preset_name', 'db_name', 'your_table', 'Column1, Column2, Column3[VARCHAR(1000)]', print_query=False)] Recreate table. Deletes existing table and recreates it."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
         # Find the matching db_preset
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
@@ -705,11 +1793,6 @@ class p:
         if db_type != 'mysql':
             raise ValueError(f"Unsupported db_type for this method: {db_type}")
 
-        # Retrieve connection details
-        host = db_preset['host']
-        username = db_preset['username']
-        password = db_preset['password']
-
         # Process the columns from the input string
         columns = columns_str.split(',')
         columns = [col.strip() for col in columns]
@@ -731,7 +1814,7 @@ class p:
         create_query = f"CREATE TABLE `{table_name}` ({', '.join(processed_columns)})"
 
         # Connect to the database
-        with mysql.connector.connect(host=host, user=username, password=password, database=db_name) as conn:
+        with _pool.connection(db_preset, db_name) as conn:
             cursor = conn.cursor()
 
             try:
@@ -750,7 +1833,7 @@ class p:
 
             finally:
                 cursor.close()
-                gc.collect()
+                self._gc()
 
         return self
 
@@ -964,17 +2047,8 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def dbi(self, db_preset_name, db_name, table_name, insert_columns=None, print_query=False):
         """DATABASE::[d.dbi('preset_name', 'db_name', 'your_table', insert_columns=['Column7', 'Column9', 'Column3'])] Simply insert all rows in the DataFrame into the specified table."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
         # Find the matching db_preset
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
@@ -983,11 +2057,6 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         if db_type != 'mysql':
             raise ValueError(f"Unsupported db_type for this method: {db_type}")
 
-        # Retrieve connection details
-        host = db_preset['host']
-        username = db_preset['username']
-        password = db_preset['password']
-
         # Determine columns to insert
         if insert_columns is None:
             insert_columns = self.df.columns.tolist()
@@ -995,7 +2064,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             insert_columns = [col.strip() for col in insert_columns]
 
         # Connect to the database and execute the insert query
-        with mysql.connector.connect(host=host, user=username, password=password, database=db_name) as conn:
+        with _pool.connection(db_preset, db_name) as conn:
             cursor = conn.cursor()
 
             try:
@@ -1010,23 +2079,16 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             finally:
                 cursor.close()
-                gc.collect()
+                self._gc()
 
         return self
 
-    def dbiu(self, db_preset_name, db_name, table_name, unique_columns, insert_columns=None, print_query=False):
-        """DATABASE::[d.dbiu('preset_name', 'db_name', 'your_table', unique_columns=['Column1', 'Column2'], insert_columns=['Column7', 'Column9', 'Column3'], print_query=False)] Insert only unique rows based on specified unique_columns."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+    def dbiu(self, db_preset_name, db_name, table_name, unique_columns, insert_columns=None, print_query=False, batch_size=10000):
+        """DATABASE::[d.dbiu('preset_name', 'db_name', 'your_table', unique_columns=['Column1', 'Column2'], insert_columns=['Column7', 'Column9', 'Column3'], print_query=False)] Insert only unique rows based on specified unique_columns, updating rows whose key exists, in one transaction."""
+        import mysql.connector
 
         # Find the matching db_preset
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
@@ -1035,11 +2097,6 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         if db_type != 'mysql':
             raise ValueError(f"Unsupported db_type for this method: {db_type}")
 
-        # Retrieve connection details
-        host = db_preset['host']
-        username = db_preset['username']
-        password = db_preset['password']
-
         # Determine columns to insert
         if insert_columns is None:
             insert_columns = self.df.columns.tolist()
@@ -1050,59 +2107,25 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         for col in unique_columns:
             if col not in insert_columns:
                 insert_columns.append(col)
+        update_columns = [col for col in insert_columns if col not in unique_columns]
 
-        # Convert complex data types to a string for compatibility
-        for col in insert_columns:
-            self.df[col] = self.df[col].apply(lambda x: json.dumps(x) if isinstance(x, (list, dict)) else x)
-
-        # Connect to the database and handle row insertion/updating
-        with mysql.connector.connect(host=host, user=username, password=password, database=db_name) as conn:
-            cursor = conn.cursor()
-
+        # Connect to the database and merge the rows
+        with _pool.connection(db_preset, db_name) as conn:
             try:
-                # Iterate over DataFrame rows for potential insertion or update
-                for _, row in self.df.iterrows():
-                    # Construct the WHERE clause to find existing rows
-                    where_clause = " AND ".join([f"{col} = %s" for col in unique_columns])
-                    where_values = [row[col] for col in unique_columns]
-
-                    # Check if the row already exists
-                    select_query = f"SELECT COUNT(*) FROM {table_name} WHERE {where_clause}"
-                    cursor.execute(select_query, where_values)
-                    exists = cursor.fetchone()[0] > 0
-
-                    if exists:
-                        # Update the existing row
-                        set_clause = ", ".join([f"{col} = %s" for col in insert_columns if col not in unique_columns])
-                        update_query = f"UPDATE {table_name} SET {set_clause} WHERE {where_clause}"
-                        update_values = [row[col] for col in insert_columns if col not in unique_columns] + where_values
-                        if print_query:
-                            print("Update query:", update_query, "Values:", update_values)
-                        cursor.execute(update_query, update_values)
-                    else:
-                        # Insert the new row
-                        cols = ", ".join(insert_columns)
-                        placeholders = ", ".join(['%s'] * len(insert_columns))
-                        insert_query = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"
-                        insert_values = [row[col] for col in insert_columns]
-                        if print_query:
-                            print("Insert query:", insert_query, "Values:", insert_values)
-                        cursor.execute(insert_query, insert_values)
-
-                    # Commit changes
-                    conn.commit()
+                inserted, updated = _staged_upsert(conn, table_name, _upsert_rows(self.df[insert_columns], list(unique_columns)), list(unique_columns), update_columns, insert_columns, batch_size, print_query)
+                if self.verbosity != 'SILENT':
+                    print(f"{table_name}: {inserted} rows inserted, {updated} rows updated")
 
             except mysql.connector.Error as err:
                 print(f"Error: {err}")
 
             finally:
-                cursor.close()
-                gc.collect()
+                self._gc()
 
         return self
 
-    def dbiusp(self, db_abs_path, table_name, unique_columns, insert_columns=None, print_query=False):
-        """DATABASE::[d.dbiusp('/path/to/db.sqlite', 'your_table', unique_columns=['Column1', 'Column2'], insert_columns=['Column7', 'Column9', 'Column3'], print_query=False)] Insert only unique rows based on specified unique_columns."""
+    def dbiusp(self, db_abs_path, table_name, unique_columns, insert_columns=None, print_query=False, batch_size=10000):
+        """DATABASE::[d.dbiusp('/path/to/db.sqlite', 'your_table', unique_columns=['Column1', 'Column2'], insert_columns=['Column7', 'Column9', 'Column3'], print_query=False)] Insert only unique rows based on specified unique_columns, updating rows whose key exists, in one transaction."""
 
         # Establish the columns for insertion
         if insert_columns is None:
@@ -1114,75 +2137,41 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         for col in unique_columns:
             if col not in insert_columns:
                 insert_columns.append(col)
+        update_columns = [col for col in insert_columns if col not in unique_columns]
 
-        # Convert complex data types to string for SQLite compatibility
-        for col in insert_columns:
-            self.df[col] = self.df[col].apply(lambda x: json.dumps(x) if isinstance(x, (list, dict)) else x)
-            if pd.api.types.is_datetime64_any_dtype(self.df[col]):
-                self.df[col] = self.df[col].astype(str)
+        rows = _upsert_rows(self.df[insert_columns], list(unique_columns))
 
-        # print("DataFrame to process:", self.df.head())
+        # Store timestamps as text, as SQLite has no datetime type
+        datetime_columns = [col for col in insert_columns if pd.api.types.is_datetime64_any_dtype(rows[col])]
+        if datetime_columns:
+            rows = rows.copy()
+            for col in datetime_columns:
+                rows[col] = rows[col].astype(str).where(rows[col].notna(), None)
 
         # Connect to the SQLite database
         conn = sqlite3.connect(db_abs_path)
-        cursor = conn.cursor()
 
         try:
-            # Iterate over DataFrame rows for potential insertion or update
-            for _, row in self.df.iterrows():
-                # Construct the WHERE clause to find existing rows
-                where_clause = " AND ".join([f"{col} = ?" for col in unique_columns])
-                where_values = [row[col] for col in unique_columns]
-
-                # Check if the row already exists
-                select_query = f"SELECT COUNT(*) FROM {table_name} WHERE {where_clause}"
-                cursor.execute(select_query, where_values)
-                exists = cursor.fetchone()[0] > 0
-
-                if exists:
-                    # Update the existing row
-                    set_clause = ", ".join([f"{col} = ?" for col in insert_columns if col not in unique_columns])
-                    update_query = f"UPDATE {table_name} SET {set_clause} WHERE {where_clause}"
-                    update_values = [row[col] for col in insert_columns if col not in unique_columns] + where_values
-                    if print_query:
-                        print("Update query:", update_query, "Values:", update_values)
-                    cursor.execute(update_query, update_values)
-                else:
-                    # Insert the new row
-                    cols = ", ".join(insert_columns)
-                    placeholders = ", ".join(['?'] * len(insert_columns))
-                    insert_query = f"INSERT INTO {table_name} ({cols}) VALUES ({placeholders})"
-                    insert_values = [row[col] for col in insert_columns]
-                    if print_query:
-                        print("Insert query:", insert_query, "Values:", insert_values)
-                    cursor.execute(insert_query, insert_values)
-
-                # Commit changes
-                conn.commit()
+            if _sqlite_key_index(conn, table_name, unique_columns, unique=True):
+                inserted, updated = _sqlite_conflict_upsert(conn, table_name, rows, list(unique_columns), update_columns, insert_columns, batch_size, print_query)
+            else:
+                inserted, updated = _staged_upsert(conn, table_name, rows, list(unique_columns), update_columns, insert_columns, batch_size, print_query, dialect='sqlite')
+            if self.verbosity != 'SILENT':
+                print(f"{table_name}: {inserted} rows inserted, {updated} rows updated")
 
         except sqlite3.Error as err:
             print(f"SQLite Error: {err}")
 
         finally:
-            cursor.close()
             conn.close()
-            gc.collect()
+            self._gc()
 
         return self
 
     def dbtai(self, db_preset_name, db_name, table_name, insert_columns=None, print_query=False):
         """DATABASE::[d.dbtai('preset_name', 'db_name', 'your_table', insert_columns=['Column7', 'Column9', 'Column3'], print_query=False)] Truncate and insert. Truncates the table and inserts the DataFrame."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
         # Find the matching db_preset
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
@@ -1191,11 +2180,6 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         if db_type != 'mysql':
             raise ValueError(f"Unsupported db_type for this method: {db_type}")
 
-        # Retrieve connection details
-        host = db_preset['host']
-        username = db_preset['username']
-        password = db_preset['password']
-
         # Determine columns to insert
         if insert_columns is None:
             insert_columns = self.df.columns.tolist()
@@ -1206,7 +2190,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         data_to_insert = self.df[insert_columns].replace({np.nan: None}).values.tolist()
 
         # Connect to the database
-        with mysql.connector.connect(host=host, user=username, password=password, database=db_name) as conn:
+        with _pool.connection(db_preset, db_name) as conn:
             cursor = conn.cursor()
 
             try:
@@ -1227,7 +2211,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             finally:
                 cursor.close()
-                gc.collect()
+                self._gc()
 
         return self
 
@@ -1289,24 +2273,15 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             finally:
                 cursor.close()
-                gc.collect()
+                self._gc()
 
         return self
 
-    def dbuoi(self, db_preset_name, db_name, table_name, update_where_columns, update_at_column_names, print_query=False):
+    def dbuoi(self, db_preset_name, db_name, table_name, update_where_columns, update_at_column_names, print_query=False, batch_size=10000):
         """DATABASE::[d.dbuoi('preset_name', 'db_name', 'your_table', ['where_column1', 'where_column2'], ['update_column1', 'update_column2'], print_query=False)]
-        Update or insert. Updates rows based on columns, inserts if no update occurs."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
+        Update or insert. Updates rows based on columns, inserts if no update occurs, in one transaction."""
         # Find the matching db_preset
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
@@ -1315,61 +2290,15 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         if db_type != 'mysql':
             raise ValueError(f"Unsupported db_type for this method: {db_type}")
 
-        # Retrieve connection details
-        host = db_preset['host']
-        username = db_preset['username']
-        password = db_preset['password']
-
-        # Connect to the database
-        with mysql.connector.connect(host=host, user=username, password=password, database=db_name) as conn:
-            cursor = conn.cursor()
-
+        # Connect to the database and merge the rows
+        with _pool.connection(db_preset, db_name) as conn:
             try:
-                # Fetch existing data from the table
-                select_query = f"SELECT * FROM {table_name}"
-                if print_query:
-                    print(select_query)
-                cursor.execute(select_query)
-                existing_data = cursor.fetchall()
-                existing_columns = [desc[0] for desc in cursor.description]
-                existing_df = pd.DataFrame(existing_data, columns=existing_columns)
-
-                # Ensure column types match for merging
-                for col in update_where_columns:
-                    self.df[col] = self.df[col].astype(str)
-                    existing_df[col] = existing_df[col].astype(str)
-
-                # Merge new data with existing data
-                merge_df = pd.merge(self.df, existing_df, on=update_where_columns, how='left', suffixes=('', '_existing'), indicator=True)
-
-                # Determine rows to update and insert
-                rows_to_update = merge_df[merge_df['_merge'] == 'both']
-                rows_to_insert = merge_df[merge_df['_merge'] == 'left_only']
-
-                # Prepare update queries
-                for _, row in rows_to_update.iterrows():
-                    set_clause = ", ".join([f"{col} = %s" for col in update_at_column_names])
-                    where_clause = " AND ".join([f"{col} = %s" for col in update_where_columns])
-                    update_query = f"UPDATE {table_name} SET {set_clause} WHERE {where_clause}"
-                    update_values = [row[f"{col}"] for col in update_at_column_names] + [row[col] for col in update_where_columns]
-                    if print_query:
-                        print(update_query, update_values)
-                    cursor.execute(update_query, update_values)
-
-                # Prepare insert queries
-                if not rows_to_insert.empty:
-                    cols = ", ".join(self.df.columns)
-                    insert_query = f"INSERT INTO {table_name} ({cols}) VALUES ({', '.join(['%s'] * len(self.df.columns))})"
-                    if print_query:
-                        print(insert_query)
-                    insert_values = rows_to_insert[self.df.columns].values.tolist()
-                    cursor.executemany(insert_query, insert_values)
-
-                conn.commit()
+                inserted, updated = _staged_upsert(conn, table_name, self.df, list(update_where_columns), list(update_at_column_names), self.df.columns.tolist(), batch_size, print_query)
+                if self.verbosity != 'SILENT':
+                    print(f"{table_name}: {inserted} rows inserted, {updated} rows updated")
 
             finally:
-                cursor.close()
-                gc.collect()
+                self._gc()
 
         return self
 
@@ -1434,160 +2363,198 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             finally:
                 cursor.close()
-                gc.collect()
+                self._gc()
 
         return self
 
-    def fcq(self, db_preset_name, query, chunk_size):
-        """LOAD::[d.fcq('preset_name', 'SELECT * FROM your_table', chunk_size)] From chunkable query."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        # Read the .rgwfuncsrc config file from the home directory
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
+    def fcq(self, db_preset_name, query, chunk_size, key_column=None, dataset_path=None, parallel=None):
+        """LOAD::[d.fcq('preset_name', 'SELECT * FROM your_table', chunk_size)] From chunkable query. Optional: key_column pages on a unique increasing key, parallel fetches key ranges concurrently, dataset_path keeps the chunks on disk."""
         # Find the matching db_preset
-        db_presets = config.get('db_presets', [])
-        db_preset = next((preset for preset in db_presets if preset['name'] == db_preset_name), None)
+        db_preset = _config.preset('db_presets', db_preset_name)
         if not db_preset:
             raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
         db_type = db_preset['db_type']
+        if db_type not in ('mssql', 'mysql', 'clickhouse', 'google_big_query'):
+            raise ValueError(f"Unsupported db_type: {db_type}")
+        if parallel is not None:
+            if key_column is None:
+                raise ValueError("parallel requires a key_column to split into ranges")
+            if int(parallel) < 1:
+                raise ValueError("parallel must be at least 1")
         total_rows = 0
-        temp_files = []
 
-        if db_type == 'mssql':
-            host = db_preset['host']
-            username = db_preset['username']
-            password = db_preset['password']
-            database = db_preset.get('database', '')
+        # Chunks are spilled as typed Arrow IPC parts rather than CSV, to a temporary directory
+        # unless the caller keeps them as a dataset
+        spill_dir = dataset_path if dataset_path is not None else tempfile.mkdtemp(prefix='rgwml_fcq_')
+        os.makedirs(spill_dir, exist_ok=True)
+        parts = []
 
-            with pymssql.connect(server=host, user=username, password=password, database=database) as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(f"SELECT COUNT(*) FROM ({query}) AS total_query")
-                    total_rows = cursor.fetchone()[0]
+        try:
+            if key_column is not None:
+                if parallel is not None and int(parallel) > 1:
+                    chunks = _parallel_keyset_chunks(db_preset, query, chunk_size, key_column, int(parallel))
+                else:
+                    chunks = _keyset_chunks(db_preset, query, chunk_size, key_column)
+                for df_chunk in chunks:
+                    if self.verbosity == 'FULL':
+                        print(df_chunk)
+                    parts.append(_arrow.spill(df_chunk, spill_dir, len(parts)))
 
-                    offset = 0
-                    while offset < total_rows:
-                        chunk_query = f"{query} ORDER BY (SELECT NULL) OFFSET {offset} ROWS FETCH NEXT {chunk_size} ROWS ONLY"
-                        cursor.execute(chunk_query)
-                        rows = cursor.fetchall()
-                        columns = [desc[0] for desc in cursor.description]
+            elif db_type == 'mssql':
+                database = db_preset.get('database', '')
 
-                        df_chunk = pd.DataFrame(rows, columns=columns)
-                        print(df_chunk)
-                        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-                        df_chunk.to_csv(temp_file.name, index=False)
-                        temp_files.append(temp_file.name)
+                with _pool.connection(db_preset, database) as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(f"SELECT COUNT(*) FROM ({query}) AS total_query")
+                        total_rows = cursor.fetchone()[0]
 
-                        offset += chunk_size
+                        offset = 0
+                        while offset < total_rows:
+                            chunk_query = f"{query} ORDER BY (SELECT NULL) OFFSET {offset} ROWS FETCH NEXT {chunk_size} ROWS ONLY"
+                            cursor.execute(chunk_query)
+                            rows = cursor.fetchall()
+                            columns = [desc[0] for desc in cursor.description]
 
-        elif db_type == 'mysql':
-            host = db_preset['host']
-            username = db_preset['username']
-            password = db_preset['password']
-            database = db_preset.get('database', '')
+                            df_chunk = pd.DataFrame(rows, columns=columns)
+                            print(df_chunk)
+                            parts.append(_arrow.spill(df_chunk, spill_dir, len(parts)))
 
-            with mysql.connector.connect(host=host, user=username, password=password, database=database) as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(f"SELECT COUNT(*) FROM ({query}) AS total_query")
-                    total_rows = cursor.fetchone()[0]
+                            offset += chunk_size
+
+            elif db_type == 'mysql':
+                database = db_preset.get('database', '')
+
+                with _pool.connection(db_preset, database) as conn:
+                    with conn.cursor() as cursor:
+                        cursor.execute(f"SELECT COUNT(*) FROM ({query}) AS total_query")
+                        total_rows = cursor.fetchone()[0]
+
+                        offset = 0
+                        while offset < total_rows:
+                            chunk_query = f"{query} LIMIT {chunk_size} OFFSET {offset}"
+                            cursor.execute(chunk_query)
+                            rows = cursor.fetchall()
+                            columns = [desc[0] for desc in cursor.description]
+
+                            df_chunk = pd.DataFrame(rows, columns=columns)
+                            print(df_chunk)
+                            parts.append(_arrow.spill(df_chunk, spill_dir, len(parts)))
+
+                            offset += chunk_size
+
+            elif db_type == 'clickhouse':
+                with _pool.connection(db_preset) as client:
+                    total_rows = client.execute(f"SELECT COUNT(*) FROM ({query}) AS total_query")[0][0]
 
                     offset = 0
                     while offset < total_rows:
                         chunk_query = f"{query} LIMIT {chunk_size} OFFSET {offset}"
-                        cursor.execute(chunk_query)
-                        rows = cursor.fetchall()
-                        columns = [desc[0] for desc in cursor.description]
+                        rows = client.execute(chunk_query)
+                        columns_query = f"DESCRIBE TABLE {query.split('FROM')[1].strip()}"
+                        columns = [row[0] for row in client.execute(columns_query)]
 
                         df_chunk = pd.DataFrame(rows, columns=columns)
                         print(df_chunk)
-                        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-                        df_chunk.to_csv(temp_file.name, index=False)
-                        temp_files.append(temp_file.name)
+                        parts.append(_arrow.spill(df_chunk, spill_dir, len(parts)))
 
                         offset += chunk_size
 
-        elif db_type == 'clickhouse':
-            host = db_preset['host']
-            username = db_preset['username']
-            password = db_preset['password']
-
-            client = clickhouse_connect.get_client(host=host, port=8123, username=username, password=password)
+            elif db_type == 'google_big_query':
+                from google.oauth2 import service_account
+                import pandas_gbq
 
-            total_rows = client.execute(f"SELECT COUNT(*) FROM ({query}) AS total_query")[0][0]
+                json_file_path = db_preset['json_file_path']
+                project_id = db_preset['project_id']
 
-            offset = 0
-            while offset < total_rows:
-                chunk_query = f"{query} LIMIT {chunk_size} OFFSET {offset}"
-                rows = client.execute(chunk_query)
-                columns_query = f"DESCRIBE TABLE {query.split('FROM')[1].strip()}"
-                columns = [row[0] for row in client.execute(columns_query)]
+                credentials = service_account.Credentials.from_service_account_file(json_file_path)
+                query_job = pandas_gbq.read_gbq(f"SELECT COUNT(*) AS total FROM ({query}) as total_query", project_id=project_id, credentials=credentials)
+                total_rows = query_job['total'][0]
 
-                df_chunk = pd.DataFrame(rows, columns=columns)
-                print(df_chunk)
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-                df_chunk.to_csv(temp_file.name, index=False)
-                temp_files.append(temp_file.name)
-
-                offset += chunk_size
+                offset = 0
+                while offset < total_rows:
+                    chunk_query = f"{query} LIMIT {chunk_size} OFFSET {offset}"
+                    query_job = pandas_gbq.read_gbq(chunk_query, project_id=project_id, credentials=credentials, chunksize=chunk_size)
 
-        elif db_type == 'google_big_query':
-            json_file_path = db_preset['json_file_path']
-            project_id = db_preset['project_id']
+                    for chunk in query_job:
+                        parts.append(_arrow.spill(chunk, spill_dir, len(parts)))
 
-            credentials = service_account.Credentials.from_service_account_file(json_file_path)
-            query_job = pandas_gbq.read_gbq(f"SELECT COUNT(*) AS total FROM ({query}) as total_query", project_id=project_id, credentials=credentials)
-            total_rows = query_job['total'][0]
+                    offset += chunk_size
+        except BaseException:
+            if dataset_path is None:
+                shutil.rmtree(spill_dir, ignore_errors=True)
+            raise
 
-            offset = 0
-            while offset < total_rows:
-                chunk_query = f"{query} LIMIT {chunk_size} OFFSET {offset}"
-                query_job = pandas_gbq.read_gbq(chunk_query, project_id=project_id, credentials=credentials, chunksize=chunk_size)
+        # Memory-map the parts and assemble a single typed frame, leaving the parts on disk
+        # when they are kept as a dataset
+        self.df = _arrow.read_parts(parts)
+        if dataset_path is None:
+            shutil.rmtree(spill_dir, ignore_errors=True)
 
-                for chunk in query_job:
-                    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.csv')
-                    chunk.to_csv(temp_file.name, index=False)
-                    temp_files.append(temp_file.name)
+        self._pr()
+        self._gc(load=True)
+        return self
 
-                offset += chunk_size
+    def iter_query(self, db_preset_name, query, chunk_size, key_column=None):
+        """LOAD::[for c in d.iter_query('preset_name', 'SELECT * FROM your_table', chunk_size): c.f('amount > 0').sa('/path/out.csv')] Iterate query. Yields a p instance per chunk of up to chunk_size rows. Optional: key_column pages on a unique increasing key."""
+        db_preset = _config.preset('db_presets', db_preset_name)
+        if not db_preset:
+            raise ValueError(f"No matching db_preset found for {db_preset_name}")
 
+        if key_column is not None:
+            chunks = _keyset_chunks(db_preset, query, chunk_size, key_column)
         else:
-            raise ValueError(f"Unsupported db_type: {db_type}")
-
-        # Combine all chunks into a single DataFrame
-        all_chunks = [pd.read_csv(temp_file) for temp_file in temp_files]
-        df = pd.concat(all_chunks, ignore_index=True)
-        self.df = df
-
-        # Clean up temporary files
-        for temp_file in temp_files:
-            os.remove(temp_file)
-
-        self.pr()
-        gc.collect()
-        return self
-
-    def fp(self, file_path):
-        """LOAD::[d.fp('/absolute/path')] From path."""
+            chunks = _query_chunks(db_preset, query, chunk_size)
+        for df_chunk in chunks:
+            yield self._chunk(df_chunk)
+
+    def iter_file(self, file_path, chunk_size, dtype=None, compat=False):
+        """LOAD::[for c in d.iter_file('/absolute/path.csv', chunk_size): c.dbi('preset_name', 'db_name', 'your_table')] Iterate file. Yields a p instance per chunk of up to chunk_size rows of a csv, parquet or feather file, typed as fp() types it. Optional: dtype, compat."""
+        source = os.path.abspath(file_path)
+        for df_chunk in _source_chunks(file_path, chunk_size, dtype, None, compat):
+            yield self._chunk(df_chunk, source)
+
+    def _chunk(self, df, source=None):
+        """A p instance for one streamed chunk, with this instance's settings."""
+        chunk = p(df=df, source=source)
+        chunk.verbosity = self.verbosity
+        chunk.gc_policy = self.gc_policy
+        chunk._lazy = self._lazy
+        return chunk
+
+    @_deferrable
+    def fp(self, file_path, dtype=None, usecols=None, compat=False, chunk_size=None, mmap=False, filter_expr=None, workers=None):
+        """LOAD::[d.fp('/absolute/path')] From path. CSV column types are inferred. Optional: dtype, usecols, compat, chunk_size (lazy, larger than RAM), mmap, filter_expr (parquet) and workers (globs and directories)."""
+        if chunk_size is not None:
+            raise ValueError("chunk_size streams a lazy plan, e.g. d.lz().fp(path, chunk_size=1000000).f('amount > 0').sa('/path/out.csv').")
         self.source = os.path.abspath(file_path)  # Set the source to the absolute path of the given file
 
         file_extension = file_path.split('.')[-1]
+        multi_file = _is_multi_file(file_path)
+        if multi_file:
+            file_extension = _expand_files(file_path)[0].split('.')[-1]
+            if mmap:
+                raise ValueError("mmap maps a single file; load file sets without it.")
+        if dtype is not None and (file_extension != 'csv' or compat):
+            raise ValueError("dtype is only supported for CSV files read without compat.")
+        if mmap and file_extension not in ('feather', 'arrow', 'ipc'):
+            raise ValueError("mmap is only supported for feather, arrow and ipc (Arrow IPC) files.")
+        if filter_expr is not None and file_extension != 'parquet':
+            raise ValueError("filter_expr is only supported for parquet files.")
+        if usecols is not None:
+            usecols = list(usecols)
+
+        if multi_file:
+            self.df = _read_files(file_path, dtype, usecols, compat, filter_expr, workers)
+
+        elif mmap:
+            import pyarrow as pa
+
+            allocated = pa.total_allocated_bytes()
+            self.df = _arrow.read_mapped(file_path, columns=usecols)
+            if pa.total_allocated_bytes() > allocated:
+                print(f"{file_path} is compressed, so it was decompressed into memory rather than mapped. Save it uncompressed with d.s('{os.path.splitext(file_path)[0]}.arrow') to share it through the page cache.")
 
-        if file_extension == 'csv':
-            self.df = pd.read_csv(file_path, dtype=str)
-
-            # Replace empty strings with None
-            self.df.replace('', None, inplace=True)
-
-        elif file_extension in ['xls', 'xlsx']:
-            self.df = pd.read_excel(file_path)
-        elif file_extension == 'json':
-            self.df = pd.read_json(file_path)
-        elif file_extension == 'parquet':
-            self.df = pd.read_parquet(file_path)
         elif file_extension in ['h5', 'hdf5']:
             with pd.HDFStore(file_path, mode='r') as store:
                 available_keys = store.keys()
@@ -1606,31 +2573,22 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                             break
                         else:
                             print(f"Key '{key}' is not in the available keys. Please try again.")
-        elif file_extension == 'feather':
-            self.df = pd.read_feather(file_path)
-        elif file_extension == 'pkl':
-            self.df = pd.read_pickle(file_path)
+
+            if usecols is not None:
+                # HDF5 stores cannot skip columns while reading
+                self.df = self.df[usecols]
+
         else:
-            raise ValueError(f"Unsupported file extension: {file_extension}")
+            self.df = _read_file(file_path, dtype, usecols, compat, filter_expr)
 
-        self.pr()
-        gc.collect()
+        self._pr()
+        self._gc(load=True)
         return self
 
     def fm(self, preset_name, email_count=50):
         """LOAD::[d.fm('preset-name', 50)] From mail. Fetch recent emails into a DataFrame."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def get_config(config_path):
-            """Load the configuration file."""
-            with open(config_path, 'r') as file:
-                config = file.read()
-                try:
-                    return json.loads(config)
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Invalid JSON format in config file: {e}")
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
 
         def authenticate_service_account(service_account_credentials_path, sender_email_id):
             """Authenticate the service account and return a Gmail API service instance."""
@@ -1642,10 +2600,8 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             service = build('gmail', 'v1', credentials=credentials)
             return service
 
-        config = get_config(config_path)
-
         # Retrieve Gmail preset configuration
-        gmail_config = next((preset for preset in config['gmail_bot_presets'] if preset['name'] == preset_name), None)
+        gmail_config = _config.preset('gmail_bot_presets', preset_name)
 
         if not gmail_config:
             raise ValueError(f"No preset found with the name {preset_name}")
@@ -1695,8 +2651,8 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         self.df.sort_values(by='received_at', ascending=False, inplace=True)
         self.df.reset_index(drop=True, inplace=True)
 
-        self.pr()
-        gc.collect()
+        self._pr()
+        self._gc(load=True)
 
         return self
 
@@ -1711,8 +2667,8 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         except sqlite3.Error as e:
             raise ValueError(f"SQLite error: {e}")
 
-        self.pr()
-        gc.collect()
+        self._pr()
+        self._gc(load=True)
         return self
 
     def fd(self):
@@ -1728,7 +2684,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
         if not files:
             print("No parseable files found in the specified directories.")
-            gc.collect()
+            self._gc(load=True)
             return self
 
         files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
@@ -1752,11 +2708,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                     file_extension = file_path.split('.')[-1]
 
                     if file_extension == 'csv':
-                        self.df = pd.read_csv(file_path, dtype=str)
-
-                        # Replace empty strings with None
-                        self.df.replace('', None, inplace=True)
-
+                        self.df = _read_csv(file_path)
                     elif file_extension in ['xls', 'xlsx']:
                         self.df = pd.read_excel(file_path)
                     elif file_extension == 'json':
@@ -1784,7 +2736,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                                             print(f"Key '{key}' is not in the available keys. Please try again.")
                         except Exception as e:
                             print(f"Error opening HDF5 file: {e}")
-                            gc.collect()
+                            self._gc(load=True)
                             return self
                     elif file_extension == 'feather':
                         self.df = pd.read_feather(file_path)
@@ -1799,14 +2751,14 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                     else:
                         print("Failed to load DataFrame.")
 
-                    self.pr()
+                    self._pr()
                     break
                 else:
                     print("Invalid choice. Please choose a valid number between 1 and 7.")
             except ValueError as e:
                 print(f"ValueError: {e}. Invalid input. Please enter a number.")
 
-        gc.collect()
+        self._gc(load=True)
         return self
 
     def des(self, date_column_name=None, column_aggregation_operations=None):
@@ -1824,7 +2776,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             # Convert object columns to numeric where possible
             for col in working_df.columns:
-                if working_df[col].dtype == 'object' and col != date_column_name:
+                if pd.api.types.is_string_dtype(working_df[col].dtype) and col != date_column_name:
                     working_df[col] = pd.to_numeric(working_df[col], errors='coerce')
 
             # Initialize dataframe to hold aggregated results
@@ -1984,7 +2936,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         else:
             raise ValueError("No DataFrame to describe. Please load a DataFrame first.")
 
-        gc.collect()
+        self._gc()
         return self
 
     def fnr(self, n):
@@ -1997,7 +2949,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         else:
             raise ValueError("No DataFrame to display. Please load a file first using the frm or frml method.")
 
-        gc.collect()
+        self._gc()
         return self
 
     def lnr(self, n):
@@ -2010,7 +2962,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         else:
             raise ValueError("No DataFrame to display. Please load a file first using the frm or frml method.")
 
-        gc.collect()
+        self._gc()
         return self
 
     def tnuv(self, n, columns):
@@ -2039,7 +2991,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             raise ValueError("No DataFrame to display. Please load a file first using the frm or frml method.")
 
         # Ensure garbage collection if needed
-        gc.collect()
+        self._gc()
         return self
 
     def bnuv(self, n, columns):
@@ -2068,7 +3020,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             raise ValueError("No DataFrame to display. Please load a file first using the frm or frml method.")
 
         # Ensure garbage collection if needed
-        gc.collect()
+        self._gc()
         return self
 
     def prc(self, column_pairs):
@@ -2093,7 +3045,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         else:
             print("The DataFrame is empty.")
 
-        gc.collect()
+        self._gc()
         return self
 
     def mem(self):
@@ -2107,46 +3059,45 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         else:
             raise ValueError("No DataFrame to print. Please load a file first using the frm or frml method.")
 
-        gc.collect()
+        self._gc()
         return self
 
+    @_deferrable
     def f(self, filter_expr):
         """TINKER::[d.f("col1 > 100 and Col1 == Col3 and Col5 == 'XYZ'")] Filter."""
         if self.df is not None:
-            try:
-                # Attempt to use query method for simple expressions
-                self.df = self.df.query(filter_expr)
-            except BaseException:
-                # Fallback to eval for more complex expressions
-                self.df = self.df[self.df.eval(filter_expr)]
-            self.pr()
+            self.df = _filter_frame(self.df, filter_expr)
+            self._pr()
         else:
             raise ValueError("No DataFrame to filter. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
+    @_deferrable
     def fim(self, mobile_col):
         """TINKER::[d.fim('mobile')] Filter Indian mobiles."""
         if self.df is not None:
             self.df = self.df[self.df[mobile_col].apply(lambda x: (str(x).isdigit() and str(x).startswith(('6', '7', '8', '9')) and len(set(str(x))) >= 4))]
-            self.pr()
+            self._pr()
         else:
             raise ValueError(
                 "No DataFrame to filter. Please load a file first using the frm or frml method."
             )
-        gc.collect()
+        self._gc()
         return self
 
+    @_deferrable
     def fimc(self, mobile_col):
         """TINKER::[d.fimc('mobile')] Filter Indian mobiles (complement)."""
         if self.df is not None:
             self.df = self.df[~self.df[mobile_col].apply(lambda x: str(x).isdigit() and str(x).startswith(('6', '7', '8', '9')) and len(set(str(x))) >= 4)]
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to filter. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
+    @_deferrable
     def g(self, target_cols, agg_funcs):
         """TRANSFORM::[d.(['group_by_columns'], ['column1::sum', 'column1::count', 'column3::sum'])] Group. Permits multiple aggregations on the same column. Available agg options: sum, mean, min, max, count, size, std, var, median, css (comma-separated strings), etc."""
 
@@ -2185,7 +3136,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
                 # Convert columns to numeric if the aggregation function requires it
                 if func in numeric_funcs:
-                    if df_copy[new_col_name].dtype == 'object':
+                    if pd.api.types.is_string_dtype(df_copy[new_col_name].dtype):
                         df_copy[new_col_name] = pd.to_numeric(df_copy[new_col_name].str.replace(' ', ''), errors='coerce')
 
             # Step 2: Perform group-by and aggregations
@@ -2207,13 +3158,13 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             try:
                 grouped_df = df_copy.groupby(target_cols).agg(agg_dict).reset_index()
                 self.df = grouped_df
-                self.pr()
+                self._pr()
             except Exception as e:
                 print(f"Aggregation error: {e}")
         else:
             raise ValueError("No DataFrame to transform. Please load a file first using the frm or frml method.")
 
-        gc.collect()
+        self._gc()
         return self
 
     def p(self, index, values, aggfunc='sum', seg_columns=None):
@@ -2223,10 +3174,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                 self.df = self.df.pivot_table(index=index, columns=seg_columns, values=values, aggfunc=aggfunc).reset_index()
             else:
                 self.df = self.df.pivot_table(index=index, values=values, aggfunc=aggfunc).reset_index()
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to pivot. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
     def doc(self, method_type_filter=None):
@@ -2277,11 +3228,11 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                         sub_branch_end = "├──"
                     print(f"{sub_branch}{sub_branch_end} {method}: {description}")
 
-        gc.collect()
+        self._gc()
         return self
 
     def s(self, name_or_path=None):
-        """PERSIST::[d.s('/filename/or/path')] Save the DataFrame as a CSV or HDF5 file."""
+        """PERSIST::[d.s('/filename/or/path')] Save the DataFrame as a CSV, HDF5 or uncompressed Arrow IPC (.arrow/.feather, for fp(path, mmap=True)) file."""
         if self.df is None:
             raise ValueError("No DataFrame to save. Please load or create a DataFrame first.")
 
@@ -2291,7 +3242,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             name_or_path = self.source
 
         # Ensure the file has the correct extension
-        if not name_or_path.lower().endswith(('.csv', '.h5')):
+        if not name_or_path.lower().endswith(('.csv', '.h5', '.arrow', '.feather')):
             name_or_path += '.csv'
 
         # Determine the desktop path
@@ -2306,8 +3257,13 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         # Ensure the directory exists
         os.makedirs(os.path.dirname(full_path), exist_ok=True)
 
+        # Uncompressed Arrow IPC, which fp(path, mmap=True) maps without copying
+        if full_path.lower().endswith(('.arrow', '.feather')):
+            _arrow.write_ipc(self.df, full_path)
+            print(f"DataFrame saved to {full_path}")
+
         # Convert all columns to type object for CSV
-        if full_path.lower().endswith('.csv'):
+        elif full_path.lower().endswith('.csv'):
             self.df = self.df.astype('object')
             self.df.to_csv(full_path, index=False)
             print(f"DataFrame saved to {full_path}")
@@ -2335,7 +3291,28 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             self.df.to_hdf(full_path, key='df', mode='w', format='table')
             print(f"DataFrame saved to {full_path}")
 
-        gc.collect()
+        self._gc()
+        return self
+
+    def sa(self, path):
+        """PERSIST::[d.sa('/filename/or/path.csv')] Save append. Append the DataFrame to a CSV file, writing the header only when the file is new, or as a new part file of a parquet dataset directory."""
+        # Relative paths go to the desktop, as in s()
+        if os.path.isabs(path):
+            full_path = path
+        else:
+            full_path = os.path.join(os.path.expanduser("~"), "Desktop", path)
+        if not full_path.lower().endswith(('.csv', '.parquet')):
+            raise ValueError("Save append supports .csv files and .parquet dataset directories.")
+
+        if self._pending and self._pending[0].op == 'fp' and self._pending[0].params.get('chunk_size'):
+            self._run_plan(sink=full_path)
+            return self
+
+        if self.df is None:
+            raise ValueError("No DataFrame to save. Please load or create a DataFrame first.")
+        _append(self.df, full_path)
+        print(f"{len(self.df)} rows appended to {full_path}")
+        self._gc()
         return self
 
     def pr(self):
@@ -2349,24 +3326,34 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         else:
             raise ValueError("No DataFrame to print. Please load a file first using the frm or frml method.")
 
-        gc.collect()
+        self._gc()
         return self
 
-    def tg(self, bot_name, message=None, as_file=True, remove_after_send=True):
-        """SHARE::[d.tg("bot-name","custom message")] Telegram using the specified bot name."""
+    def _pr(self, step=None):
+        """Render the frame after a chainable step according to the verbosity setting."""
+        if self._executing:
+            return self
 
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
+        if self.verbosity == 'FULL':
+            self.pr()
+        elif self.verbosity == 'SUMMARY':
+            step = step or sys._getframe(1).f_code.co_name
+            elapsed = time.perf_counter() - self._step_started
+            if self.df is not None:
+                columns_with_types = [f"{col} ({dtype})" for col, dtype in self.df.dtypes.items()]
+                print(f"[{step}] {self.df.shape[0]} rows x {self.df.shape[1]} columns in {elapsed:.3f}s. Columns: {columns_with_types}")
+            else:
+                print(f"[{step}] No DataFrame loaded, {elapsed:.3f}s.")
 
-        def get_config(config_path):
-            """Load the configuration file."""
-            with open(config_path, 'r') as file:
-                return json.load(file)
+        self._step_started = time.perf_counter()
+        return self
 
-        config = get_config(config_path)
+    def tg(self, bot_name, message=None, as_file=True, remove_after_send=True):
+        """SHARE::[d.tg("bot-name","custom message")] Telegram using the specified bot name."""
+        import requests
 
         # Retrieve bot configuration
-        bot_config = next((bot for bot in config['telegram_bot_presets'] if bot['name'] == bot_name), None)
+        bot_config = _config.preset('telegram_bot_presets', bot_name)
 
         if not bot_config:
             raise ValueError(f"No bot found with the name {bot_name}")
@@ -2427,18 +3414,8 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def gm(self, preset_name, to_email, subject=None, body=None, as_file=True, remove_after_send=True):
         """SHARE::[d.gm("preset-name", "to_email@example.com", "email subject", "custom message body")] Gmail via specified preset."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def get_config(config_path):
-            """Load the configuration file."""
-            with open(config_path, 'r') as file:
-                config = file.read()
-                try:
-                    return json.loads(config)
-                except json.JSONDecodeError as e:
-                    raise ValueError(f"Invalid JSON format in config file: {e}")
+        from google.oauth2 import service_account
+        from googleapiclient.discovery import build
 
         def authenticate_service_account(service_account_credentials_path, sender_email_id):
             """Authenticate the service account and return a Gmail API service instance."""
@@ -2450,10 +3427,8 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             service = build('gmail', 'v1', credentials=credentials)
             return service
 
-        config = get_config(config_path)
-
         # Retrieve Gmail preset configuration
-        gmail_config = next((preset for preset in config['gmail_bot_presets'] if preset['name'] == preset_name), None)
+        gmail_config = _config.preset('gmail_bot_presets', preset_name)
 
         if not gmail_config:
             raise ValueError(f"No preset found with the name {preset_name}")
@@ -2511,19 +3486,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def slk(self, bot_name, message=None, as_file=True, remove_after_send=True):
         """SHARE::[d.slk("bot-name","custom message")] Slack using the specified bot name."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def get_config(config_path):
-            """Load the configuration file."""
-            with open(config_path, 'r') as file:
-                return json.load(file)
-
-        config = get_config(config_path)
+        from slack_sdk import WebClient
 
         # Retrieve bot configuration
-        bot_config = next((bot for bot in config['slack_bot_presets'] if bot['name'] == bot_name), None)
+        bot_config = _config.preset('slack_bot_presets', bot_name)
 
         if not bot_config:
             raise ValueError(f"No bot found with the name {bot_name}")
@@ -2605,31 +3571,34 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             new_order = new_order[:pos] + remaining + new_order[pos:]
 
         self.df = self.df[new_order]
-        self.pr()
+        self._pr()
         return self
 
+    @_deferrable
     def asc(self, new_col_name, static_value):
         """APPEND::[d.asc('new_column_name', static_value)] Append static column. Append a column with a static value for all rows."""
         if self.df is not None:
             self.df[new_col_name] = static_value
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to append a static value column. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
+    @_deferrable
     def abc(self, condition, new_col_name):
         """APPEND::[d.abc('column1 > 30 and column2 < 50', 'new_column_name')] Append boolean classification column."""
         if self.df is not None:
             # Replace column names in the condition with DataFrame access syntax
             condition = condition.replace(' and ', ' & ').replace(' or ', ' | ')
             self.df[new_col_name] = self.df.eval(condition)
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to append a boolean column. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
+    @_deferrable
     def acc(self, operation, new_col_name):
         """APPEND::[d.acc('column1 / column2','col1_2_ratio') OR d.acc('column1 * column2','col1_2_product') OR d.acc('column1 + column2','col1_2_sum') OR d.acc('column1 - column2','col1_2_diff') OR d.acc('log(column1)', 'col1_log')] Append Computational Column. Available binary operations: /, *, +, -, **, %. Available unary operations: log, log10, sqrt, abs, sin, cos, tan."""
         if self.df is not None:
@@ -2685,13 +3654,13 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                         raise ValueError(f"One or both of the specified columns ('{col1}', '{col2}') do not exist in the DataFrame.")
 
                 # Print the DataFrame to ensure the new column has been added
-                self.pr()
+                self._pr()
             except Exception as e:
                 raise ValueError(f"Error while performing operation '{operation}': {e}")
         else:
             raise ValueError("No DataFrame to append a computational column. Please load a file first using the frm or frml method.")
 
-        gc.collect()
+        self._gc()
         return self
 
     def arcc(self, column, new_col_name, ref='previous'):
@@ -2710,13 +3679,13 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                     raise ValueError("Unsupported reference value. Use 'previous' or 'next'.")
 
                 # Print the DataFrame to ensure the new column has been added
-                self.pr()
+                self._pr()
             else:
                 raise ValueError(f"The specified column '{column}' does not exist in the DataFrame.")
         else:
             raise ValueError("No DataFrame to append a computational column. Please load a file first.")
 
-        gc.collect()
+        self._gc()
         return self
 
     def arpcc(self, column, new_col_name, ref='previous'):
@@ -2735,13 +3704,13 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                     raise ValueError("Unsupported reference value. Use 'previous' or 'next'.")
 
                 # Print the DataFrame to ensure the new column has been added
-                self.pr()
+                self._pr()
             else:
                 raise ValueError(f"The specified column '{column}' does not exist in the DataFrame.")
         else:
             raise ValueError("No DataFrame to append a computational column. Please load a file first using the frm or frml method.")
 
-        gc.collect()
+        self._gc()
         return self
 
     def dc(self, column, steps=1, direction='up'):
@@ -2761,13 +3730,13 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                 self.df[column] = shifted_col
 
                 # Print the DataFrame to ensure the column has been dragged
-                self.pr()
+                self._pr()
             else:
                 raise ValueError(f"The specified column '{column}' does not exist in the DataFrame.")
         else:
             raise ValueError("No DataFrame to perform drag column operation. Please load a file first.")
 
-        gc.collect()
+        self._gc()
         return self
 
     def arc(self, ranges, target_col, new_col_name):
@@ -2804,10 +3773,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             self.df[target_col] = pd.to_numeric(self.df[target_col], errors='coerce')
             # Apply pd.cut
             self.df[new_col_name] = pd.cut(self.df[target_col], bins=range_list, labels=labels, right=False, include_lowest=True)
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to append a ranged classification column. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
     def apc(self, percentiles, target_col, new_col_name):
@@ -2844,10 +3813,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             self.df[target_col] = pd.to_numeric(self.df[target_col], errors='coerce')
             quantiles = [self.df[target_col].quantile(p / 100) for p in percentiles_list]
             self.df[new_col_name] = pd.cut(self.df[target_col], bins=quantiles, labels=labels, include_lowest=True)
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to append a percentile classification column. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
     def ardc(self, date_ranges, target_col, new_col_name):
@@ -2856,10 +3825,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             date_list = [pd.to_datetime(date) for date in date_ranges.split(',')]
             labels = [f"{date_list[i].strftime('%Y-%m-%d')} to {date_list[i + 1].strftime('%Y-%m-%d')}" for i in range(len(date_list) - 1)]
             self.df[new_col_name] = pd.cut(pd.to_datetime(self.df[target_col]), bins=date_list, labels=labels, right=False)
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to append a ranged date classification column. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
     def atcar(self, timestamps_col, reference_col, new_col_name):
@@ -2890,10 +3859,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             # Apply the function to each row
             self.df[new_col_name] = self.df.apply(lambda row: count_timestamps_after(row), axis=1)
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to append a timestamp count column. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
     def atcbr(self, timestamps_col, reference_col, new_col_name):
@@ -2924,10 +3893,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             # Apply the function to each row
             self.df[new_col_name] = self.df.apply(lambda row: count_timestamps_before(row), axis=1)
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to append a timestamp count column. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
     def uj(self, other):
@@ -2970,8 +3939,8 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         print(f"self.df after join: {type(self.df)}")
         print(self.df.head())
 
-        self.pr()
-        gc.collect()
+        self._pr()
+        self._gc()
         return self
 
     def buj(self, other):
@@ -2994,7 +3963,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             # Perform the bag union join without dropping duplicates
             self.df = pd.concat([self.df, other.df], ignore_index=True)
 
-        self.pr()
+        self._pr()
         return self
 
     def lj(self, other, left_on, right_on):
@@ -3007,7 +3976,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
         # Perform the left join directly assigning to self.df
         self.df = self.df.merge(other.df, how='left', left_on=left_on, right_on=right_on)
-        self.pr()
+        self._pr()
         return self
 
     def rj(self, other, left_on, right_on):
@@ -3020,17 +3989,18 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
         # Perform the right join directly assigning to self.df
         self.df = self.df.merge(other.df, how='right', left_on=left_on, right_on=right_on)
-        self.pr()
+        self._pr()
         return self
 
+    @_deferrable
     def rnc(self, rename_pairs):
         """TINKER::[d.rnc({'old_col1': 'new_col1', 'old_col2': 'new_col2'})] Rename columns."""
         if self.df is not None:
             self.df = self.df.rename(columns=rename_pairs)
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to rename columns. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
     def ie(self):
@@ -3039,18 +4009,19 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             return self.df.empty
         else:
             raise ValueError("No DataFrame to check. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
 
     def mnpdz(self, columns):
         """TINKER::[d.mnpdz(['Column1', Column2])] Make numerically parseable by defaulting to zero for specified columns."""
         if self.df is not None:
             for column in columns:
                 self.df[column] = pd.to_numeric(self.df[column], errors='coerce').fillna(0)
-            self.pr()
+            self._pr()
         else:
             print("DataFrame is not initialized.")
         return self
 
+    @_deferrable
     def cs(self, columns):
         """TINKER::[d.cs(['Column1::ASC', 'Column2::DESC'])] Cascade sort by specified columns and order."""
 
@@ -3088,7 +4059,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                 # print(self.df.head())
             except Exception as e:
                 print(f"An error occurred during sorting: {e}")
-            self.pr()
+            self._pr()
         else:
             print("DataFrame is not initialized.")
 
@@ -3126,20 +4097,22 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             # Append the labels to the DataFrame
             self.df['XGB_TYPE'] = labels
-            self.pr()
+            self._pr()
         else:
             print("DataFrame is not initialized.")
         return self
 
     def axlinr(self, target_col, feature_cols, pred_col, boosting_rounds=100, model_path=None):
         """PREDICT::[d.axlinr('target_column','feature1, feature2, feature3','prediction_column_name')] Append XGB regression predictions. Assumes labelling by the .axl() method. Optional params: boosting_rounds (int), model_path (str)"""
+        import xgboost as xgb
+
         if self.df is not None and 'XGB_TYPE' in self.df.columns:
             # Convert feature_cols from string to list
             features = feature_cols.replace(' ', '').split(',')
 
             # Convert categorical columns to 'category' dtype
             for col in features:
-                if self.df[col].dtype == 'object':
+                if pd.api.types.is_string_dtype(self.df[col].dtype):
                     self.df[col] = self.df[col].astype('category')
 
             # Separate data into TRAIN, VALIDATE (if present), and TEST sets
@@ -3181,20 +4154,22 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             columns_order = [col for col in self.df.columns if col not in ['XGB_TYPE', target_col, pred_col]] + ['XGB_TYPE', target_col, pred_col]
             self.df = self.df[columns_order]
             print("RMSE to accuracy: 50% (around 1.0); 60% (around 0.8); 70% (around 0.6); 80% (around 0.4); 90% (around 0.2)")
-            self.pr()
+            self._pr()
         else:
             print("DataFrame is not initialized or 'XGB_TYPE' column is missing.")
         return self
 
     def axlogr(self, target_col, feature_cols, pred_col, boosting_rounds=100, model_path=None):
         """PREDICT::[d.axlogr('target_column','feature1, feature2, feature3','prediction_column_name')] Append XGB logistic regression predictions. Assumes labeling by the .axl() method. Optional params: boosting_rounds (int), model_path (str)"""
+        import xgboost as xgb
+
         if self.df is not None and 'XGB_TYPE' in self.df.columns:
             # Convert feature_cols from string to list
             features = feature_cols.replace(' ', '').split(',')
 
             # Convert categorical columns to 'category' dtype
             for col in features:
-                if self.df[col].dtype == 'object':
+                if pd.api.types.is_string_dtype(self.df[col].dtype):
                     self.df[col] = self.df[col].astype('category')
 
             # Separate data into TRAIN, VALIDATE (if present), and TEST sets
@@ -3236,13 +4211,16 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             columns_order = [col for col in self.df.columns if col not in ['XGB_TYPE', target_col, pred_col]] + ['XGB_TYPE', target_col, pred_col]
             self.df = self.df[columns_order]
             print("AUC to accuracy: 50% (around 0.50); 60% (around 0.65); 70% (around 0.75); 80% (around 0.95); 90% (around 0.95)")
-            self.pr()
+            self._pr()
         else:
             print("DataFrame is not initialized or 'XGB_TYPE' column is missing.")
         return self
 
     def plc(self, y, x=None, save_path=None):
         """PLOT::[d.plc(y='Column1, Column2, Column3')] Plot line chart. Optional param: x (str), i.e. a single column name for the x axis eg. 'Column5', image_save_path (str)"""
+        import matplotlib.pyplot as plt
+        from PIL import Image
+
         y = y.replace(' ', '').split(',')
 
         # Ensure the y columns are numeric
@@ -3287,6 +4265,9 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def pdist(self, y, save_path=None):
         """PLOT::[d.pdist(y='Column1, Column2, Column3')] Plot distribution histograms for the specified columns. Optional param: image_save_path (str)"""
+        import matplotlib.pyplot as plt
+        from PIL import Image
+
         if isinstance(y, str):
             y = y.replace(' ', '').split(',')
         elif isinstance(y, list):
@@ -3341,6 +4322,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def pqq(self, y, save_path=None):
         """PLOT::[d.pqq(y='Column1, Column2, Column3')] Plot Q-Q plots for the specified columns. Optional param: image_save_path (str)"""
+        import matplotlib.pyplot as plt
+        import scipy.stats as stats
+        from PIL import Image
+
         if isinstance(y, str):
             y = y.replace(' ', '').split(',')
         elif isinstance(y, list):
@@ -3390,6 +4375,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def pcr(self, y, save_path=None):
         """PLOT::[d.pcr(y='Column1, Column2, Column3')] Plot correlation heatmap for the specified columns. Optional param: image_save_path (str)"""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from PIL import Image
+
         if isinstance(y, str):
             y = y.replace(' ', '').split(',')
         elif isinstance(y, list):
@@ -3432,6 +4421,13 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def ancc(self, features, operation, cluster_column_name, n_clusters_finding_method=None, visualize=True):
         """APPEND::[d.ancc('Column1,Column2', 'KMEANS', 'new_cluster_column_name', n_clusters_finding_method='FIXED:5', visualize=True)] Append n-cluster column. Available operations: KMEANS/ AGGLOMERATIVE/ MEAN_SHIFT/ GMM/ SPECTRAL/ BIRCH. Optional: visualize (boolean), n_cluster_finding_method (str) i.e. ELBOW/ SILHOUETTE/ FIXED:n (specify a number of n clusters)."""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from sklearn.cluster import KMeans, DBSCAN, AgglomerativeClustering, MeanShift, SpectralClustering, Birch
+        from sklearn.mixture import GaussianMixture
+        from sklearn.metrics import silhouette_score
+        from PIL import Image
+
         def perform_kmeans(X, n_clusters):
             kmeans = KMeans(n_clusters=n_clusters, random_state=0)
             return kmeans.fit_predict(X)
@@ -3597,14 +4593,19 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             if visualize:
                 plot_cluster_analysis(X, feature_list, cluster_column_name, operation)
 
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to append a cluster analysis column. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
     def adbscancc(self, features, cluster_column_name, eps, min_samples, visualize=True):
         """APPEND::[d.adbscancc('Column1,Column2', 'new_cluster_column_name', eps=0.5, min_samples=5, visualize=True)] Append DBSCAN cluster column. Optional: visualize (boolean)."""
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        from sklearn.cluster import KMeans, DBSCAN
+        from PIL import Image
+
         def perform_dbscan(X, eps, min_samples):
             dbscan = DBSCAN(eps=eps, min_samples=min_samples)
             return dbscan.fit_predict(X)
@@ -3680,10 +4681,10 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
             if visualize:
                 plot_cluster_analysis(X, feature_list, cluster_column_name)
 
-            self.pr()
+            self._pr()
         else:
             raise ValueError("No DataFrame to append a cluster analysis column. Please load a file first using the frm or frml method.")
-        gc.collect()
+        self._gc()
         return self
 
     def pnfc(self, n, columns, order_by="FREQ_DESC"):
@@ -3797,12 +4798,13 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
         return self
 
+    @_deferrable
     def rtc(self, columns_to_retain):
         """TINKER::[d.rtc(['column1','column2'])] Retain columns specified and drop the rest."""
         if not isinstance(columns_to_retain, list):
             raise ValueError("columns_to_retain should be a list of column names.")
         self.df = self.df[columns_to_retain]
-        self.pr()
+        self._pr()
         return self
 
     def mad(self, other_p, column_name):
@@ -3812,7 +4814,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         if column_name not in self.df.columns or column_name not in other_p.df.columns:
             raise ValueError("The specified column must exist in both DataFrames.")
         self.df = self.df[self.df[column_name].isin(other_p.df[column_name])]
-        self.pr()
+        self._pr()
         return self
 
     def madc(self, other_p, column_name):
@@ -3822,23 +4824,15 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         if column_name not in self.df.columns or column_name not in other_p.df.columns:
             raise ValueError("The specified column must exist in both DataFrames.")
         self.df = self.df[~self.df[column_name].isin(other_p.df[column_name])]
-        self.pr()
+        self._pr()
         return self
 
     def goaibc(self, job_name, model, columns_to_analyse, classification_options):
         """OPENAI::[batch_id = d.oaibc('fruit_or_vegetable_classification','gpt-3.5-turbo','Column1, Column3','fruit, vegetable, other')] Get OpenAI Batch Classification. Returns a batch id."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_key(key_name):
-            """Load the key from the configuration file."""
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return config.get(key_name)
+        from openai import OpenAI
 
         # Load the API key for OpenAI
-        open_ai_key = load_key('open_ai_key')
+        open_ai_key = _config.get('open_ai_key')
         client = OpenAI(api_key=open_ai_key)
 
         # Prepare the batch input file
@@ -3900,15 +4894,9 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def oaibiua(self, job_name, model, column_to_analyse, prompt, new_column_name):
         """OPENAI::[batch_id = d.oaibiua('price_analysis','gpt-3.5-turbo','screenshot_of_processing_fees','The image is a transaction screenshot taken from a mobile phone. Extract the price value as an integer', 'price')] Get OpenAI Batch Image URL Analysis. Returns a batch id with optional image URL analysis."""
-
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_key(key_name):
-            """Load the key from the configuration file."""
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return config.get(key_name)
+        from openai import OpenAI
+        import requests
+        from PIL import Image, UnidentifiedImageError
 
         def convert_google_drive_url(gdrive_url):
             file_id = gdrive_url.split('id=')[-1]
@@ -3949,7 +4937,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
                 print(f"Exception during image download or processing: {e}")
             return ""  # Return an empty string on error
 
-        open_ai_key = load_key('open_ai_key')
+        open_ai_key = _config.get('open_ai_key')
         client = OpenAI(api_key=open_ai_key)
 
         batch_input_data = []
@@ -4025,17 +5013,9 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def oaibl(self):
         """OPENAI::[d.oaibl()] OpenAI Batch list. Lists OpenAI batch jobs."""
+        from openai import OpenAI
 
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_key(key_name):
-            """Load the key from the configuration file."""
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return config.get(key_name)
-
-        open_ai_key = load_key('open_ai_key')
+        open_ai_key = _config.get('open_ai_key')
         client = OpenAI(api_key=open_ai_key)
 
         # Collect batch statuses
@@ -4061,17 +5041,9 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def oaibc(self, batch_id):
         """OPENAI::[d.oaibc('batch_id_to_cancel')] OpenAI batch cancel. Cancel a batch and print its status."""
+        from openai import OpenAI
 
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_key(key_name):
-            """Load the key from the configuration file."""
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return config.get(key_name)
-
-        open_ai_key = load_key('open_ai_key')
+        open_ai_key = _config.get('open_ai_key')
         client = OpenAI(api_key=open_ai_key)
 
         # Cancel the batch
@@ -4098,17 +5070,9 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def oaibs(self, batch_id):
         """OPENAI::[d.oaibs('batch_id')] OpenAI Batch status. Checks the status of a specific OpenAI batch job."""
+        from openai import OpenAI
 
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_key(key_name):
-            """Load the key from the configuration file."""
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return config.get(key_name)
-
-        open_ai_key = load_key('open_ai_key')
+        open_ai_key = _config.get('open_ai_key')
         client = OpenAI(api_key=open_ai_key)
 
         # Retrieve the batch info
@@ -4125,17 +5089,9 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def goaibs(self, batch_id):
         """OPENAI::[status, output_file_id = d.goaibs('batch_id')] OpenAI Batch get status. Returns the status of a specific OpenAI batch job."""
+        from openai import OpenAI
 
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_key(key_name):
-            """Load the key from the configuration file."""
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return config.get(key_name)
-
-        open_ai_key = load_key('open_ai_key')
+        open_ai_key = _config.get('open_ai_key')
         client = OpenAI(api_key=open_ai_key)
 
         # Retrieve the batch info
@@ -4168,6 +5124,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
     def oaih(self, file_path):
         """OPENAI::[d.oaih('path/to/your/sowed/saved/file')] OpenAI harvest. Open the H5 file, check the status of the batch job, and open the file accordingly."""
+        from openai import OpenAI
 
         def download_output_file(output_file_id, open_ai_key):
             client = OpenAI(api_key=open_ai_key)
@@ -4187,23 +5144,14 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             return tmp_file_path
 
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_key(key_name):
-            """Load the key from the configuration file."""
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return config.get(key_name)
-
-        open_ai_key = load_key('open_ai_key')
+        open_ai_key = _config.get('open_ai_key')
 
         with pd.HDFStore(file_path, mode='r') as store:
             try:
                 storer = store.get_storer('df')
                 if not hasattr(storer.attrs, 'metadata'):
                     print("No harvest metadata found")
-                    self.pr()
+                    self._pr()
                     return self
 
                 metadata = storer.attrs.metadata
@@ -4216,7 +5164,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             if not batch_id or not batch_column_name:
                 print("No harvest metadata found")
-                self.pr()
+                self._pr()
                 return self
 
             self.df = store['df']
@@ -4249,12 +5197,13 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         else:
             print(f"Batch job {batch_id} status: {status}")
 
-        self.pr()
+        self._pr()
         return self
 
     def oaihbid(self, batch_id, batch_column_name):
         """OPENAI::[d.oaihbid('your_batch_id', 'your_batch_column_name')]
         OpenAI harvest by batch ID. Check the status of the batch job using the given batch ID and process the results."""
+        from openai import OpenAI
 
         def download_output_file(output_file_id, open_ai_key):
             client = OpenAI(api_key=open_ai_key)
@@ -4274,16 +5223,7 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
 
             return tmp_file_path
 
-        # Set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_key(key_name):
-            """Load the key from the configuration file."""
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return config.get(key_name)
-
-        open_ai_key = load_key('open_ai_key')
+        open_ai_key = _config.get('open_ai_key')
 
         status, output_file_id = self.goaibs(batch_id)
 
@@ -4333,22 +5273,18 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         else:
             print(f"Batch job {batch_id} status: {status}")
 
-        self.pr()
+        self._pr()
         return self
 
     def oaiatc(self, url_column, transcription_column, participants=None, classify=None, summary_word_length=0, whisper_model="whisper-1", json_mode_model="gpt-4o", chunk_size=4):
         """OPENAI::[d.oaiatc('audio_url_column_name','transcriptions_new_column_name', ...)] Append transcriptions to DataFrame based on URLs in a specified column. Optional params: participants, classify, whisper_model, json_mode_model, chunk_size."""
+        from openai import OpenAI
+        from requests_html import AsyncHTMLSession
+        import filetype
+        from tqdm import tqdm
+        import asyncio
 
-        # Directly set the config path to ~/.rgwfuncsrc
-        config_path = os.path.expanduser("~/.rgwfuncsrc")
-
-        def load_key(key_name):
-            """Load the key from the configuration file."""
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            return config.get(key_name)
-
-        open_ai_key = load_key('open_ai_key')
+        open_ai_key = _config.get('open_ai_key')
         client = OpenAI(api_key=open_ai_key)
 
         async def process_url(session, url):
@@ -4515,5 +5451,5 @@ SELECT * FROM `project_id.dataset_id.your_table_name` ORDER BY your_date_column
         time.sleep(3)
         print()
         self.oc(f'..., {transcription_column}')
-        self.pr()
+        self._pr()
         return self
@@ -0,0 +1,253 @@
+import os
+import re
+import sys
+import json
+import stat
+import importlib
+import types
+import sqlite3
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """A temporary home directory; call it with db_presets to write them to its .rgwfuncsrc."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("RGWML_REPLICA_DIR", str(tmp_path / "replicas"))
+
+    def write(*db_presets):
+        with open(tmp_path / ".rgwfuncsrc", "w") as f:
+            json.dump({"db_presets": list(db_presets)}, f)
+        return tmp_path
+
+    write()
+    return write
+
+
+FAKE_SSH = """#!/bin/sh
+# ssh [-C] [-i key] user@host command: log the call, then run the command on this machine
+echo "$@" >> "$(dirname "$0")/ssh.log"
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -i) shift 2 ;;
+        -*) shift ;;
+        *) shift; break ;;
+    esac
+done
+exec sh -c "$*"
+"""
+
+FAKE_SCP = """#!/bin/sh
+# scp [-C] [-i key] source target: copy on this machine, dropping the user@host: prefixes
+while [ $# -gt 2 ]; do
+    case "$1" in
+        -i) shift 2 ;;
+        *) shift ;;
+    esac
+done
+exec cp "${1#*:}" "${2#*:}"
+"""
+
+
+@pytest.fixture
+def fake_ssh(tmp_path, monkeypatch):
+    """ssh and scp on PATH that run on this machine; returns the log of the ssh calls."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    for name, script in [("ssh", FAKE_SSH), ("scp", FAKE_SCP)]:
+        path = bin_dir / name
+        path.write_text(script)
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return bin_dir / "ssh.log"
+
+
+def _mysql_to_sqlite(query):
+    """The SQLite spelling of the MySQL-only statements rgwml sends: %s placeholders, temporary table drops and UPDATE ... JOIN."""
+    query = query.replace("%s", "?").replace("DROP TEMPORARY TABLE", "DROP TABLE")
+    join = re.match(r"UPDATE (\S+) AS t JOIN (\S+) AS s ON (.*) SET (.*)$", query, re.DOTALL)
+    if join:
+        table, stage, match, assignments = join.groups()
+        # SQLite names the updated columns without the table alias
+        assignments = re.sub(r"\bt\.", "", assignments)
+        query = f"UPDATE {table} AS t SET {assignments} FROM {stage} AS s WHERE {match}"
+    return query
+
+
+class SQLiteCursor:
+    """A DB-API cursor over sqlite3 that accepts the statements of the MySQL driver."""
+
+    def __init__(self, connection, queries):
+        self._cursor = connection.cursor()
+        self._queries = queries
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, query, params=()):
+        self._queries.append(query)
+        self._cursor.execute(_mysql_to_sqlite(query), params or ())
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(_mysql_to_sqlite(query), rows)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size):
+        return self._cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Stand-in for a MySQL connection, backed by a sqlite3 database file.
+
+    Setting alive to False makes is_connected() fail, as for a connection the server dropped.
+    Every query executed is appended to queries.
+    """
+
+    def __init__(self, path, queries):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self.queries = queries
+        self.alive = True
+        self.closed = False
+
+    def cursor(self):
+        if self.closed:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed connection.")
+        return SQLiteCursor(self._connection, self.queries)
+
+    def is_connected(self):
+        return self.alive and not self.closed
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self.closed = True
+        self._connection.close()
+
+
+@pytest.fixture
+def mysql_db(home, tmp_path, monkeypatch):
+    """A "mysql" db_preset whose pooled connections open a local sqlite3 database.
+
+    Yields the sqlite3 path with the preset, every connection opened so far and every query
+    executed attached.
+    """
+    from rgwml import _pool
+
+    connector = types.ModuleType("mysql.connector")
+    connector.Error = sqlite3.Error
+    mysql = types.ModuleType("mysql")
+    mysql.connector = connector
+    monkeypatch.setitem(sys.modules, "mysql", mysql)
+    monkeypatch.setitem(sys.modules, "mysql.connector", connector)
+
+    db = types.SimpleNamespace(path=str(tmp_path / "mysql.sqlite"), opened=[], queries=[])
+    db.preset = {"name": "my", "db_type": "mysql", "host": "localhost", "username": "u", "password": "p", "database": "d"}
+
+    def connect(db_preset, database):
+        connection = SQLiteConnection(db.path, db.queries)
+        db.opened.append(connection)
+        return connection
+
+    monkeypatch.setattr(_pool, "_connect", connect)
+    monkeypatch.setattr(_pool, "_pools", {})
+    home(db.preset)
+    yield db
+    _pool.close_all()
+
+
+class BigQueryStub:
+    """Stand-in for a BigQuery client that runs queries on sqlite3 and serves Arrow record batches.
+
+    Result columns named like a loaded table's columns keep that table's Arrow types, so empty
+    results are still typed. Every query run is kept in queries.
+    """
+
+    def __init__(self):
+        self._db = sqlite3.connect(":memory:", check_same_thread=False)
+        self._types = {}
+        self.queries = []
+
+    def load(self, name, table):
+        import pyarrow as pa
+
+        self._db.execute(f"CREATE TABLE {name} ({', '.join(table.column_names)})")
+        self._db.executemany(f"INSERT INTO {name} VALUES ({', '.join('?' * table.num_columns)})", zip(*table.to_pydict().values()))
+        self._types.update({field.name: field.type for field in table.schema if not pa.types.is_null(field.type)})
+
+    def query(self, query):
+        import pyarrow as pa
+
+        self.queries.append(query)
+        cursor = self._db.execute(query)
+        names = [desc[0] for desc in cursor.description]
+        columns = list(zip(*cursor.fetchall())) or [()] * len(names)
+        arrays = [pa.array(list(values), type=self._types.get(name)) for name, values in zip(names, columns)]
+        return BigQueryJob(pa.Table.from_arrays(arrays, names=names))
+
+    def close(self):
+        self._db.close()
+
+
+class BigQueryJob:
+    def __init__(self, table):
+        self._table = table
+
+    def result(self, page_size=None):
+        return BigQueryRows(self._table, page_size)
+
+
+class BigQueryRows:
+    """A query result read whole with to_arrow() or page by page with to_arrow_iterable()."""
+
+    def __init__(self, table, page_size):
+        self._table = table
+        self._page_size = page_size or max(table.num_rows, 1)
+        self.total_rows = table.num_rows
+
+    def to_arrow(self):
+        return self._table
+
+    def to_arrow_iterable(self):
+        # Like the Storage API, an empty result yields no batches at all
+        for offset in range(0, self._table.num_rows, self._page_size):
+            yield from self._table.slice(offset, self._page_size).to_batches()
+
+    def __iter__(self):
+        return iter(zip(*self._table.to_pydict().values()))
+
+
+@pytest.fixture
+def bigquery(home, monkeypatch):
+    """A "bq" google_big_query db_preset served by a BigQueryStub."""
+    stub = BigQueryStub()
+    # The package re-exports the p class under the module's name, so fetch the module itself
+    monkeypatch.setattr(importlib.import_module("rgwml.p"), "_bq_client", lambda db_preset: stub)
+    home({"name": "bq", "db_type": "google_big_query", "project_id": "project", "json_file_path": "/dev/null"})
+    yield stub
+    stub.close()
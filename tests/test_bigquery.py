@@ -0,0 +1,83 @@
+import pyarrow as pa
+import pandas as pd
+
+from rgwml.p import p
+
+
+EVENTS = pa.table({
+    "id": pa.array(range(1, 8), pa.int64()),
+    "name": pa.array(["a", None, "c", "d", "e", "f", "g"], pa.string()),
+    "amount": pa.array([1.5, 2.0, None, 4.0, 5.0, 6.0, 7.5], pa.float64()),
+})
+
+
+def test_fq_downloads_arrow_results(bigquery):
+    bigquery.load("events", EVENTS)
+    df = p().sv("SILENT").fq("bq", "SELECT * FROM events").gdf()
+
+    assert df["id"].tolist() == list(range(1, 8))
+    assert df["name"].dtype == pd.StringDtype("pyarrow")
+    assert df["name"].isna().tolist() == [False, True] + [False] * 5
+    assert df["amount"].dtype == "float64"
+
+
+def test_fq_empty_result_keeps_the_columns(bigquery):
+    bigquery.load("events", EVENTS)
+    df = p().sv("SILENT").fq("bq", "SELECT * FROM events WHERE id > 100").gdf()
+
+    assert df.empty
+    assert list(df.columns) == ["id", "name", "amount"]
+    assert df["id"].dtype == "int64"
+
+
+def test_fq_streams_pages_into_a_dataset_file(bigquery, tmp_path):
+    bigquery.load("events", EVENTS)
+    path = str(tmp_path / "events.arrow")
+    df = p().sv("SILENT").fq("bq", "SELECT * FROM events", dataset_path=path).gdf()
+
+    in_memory = p().sv("SILENT").fq("bq", "SELECT * FROM events").gdf()
+    assert df["id"].tolist() == list(range(1, 8))
+    assert df["name"].isna().tolist()[:3] == [False, True, False]
+    assert df.dtypes.to_dict() == in_memory.dtypes.to_dict()
+    assert str(df["id"].dtype) == "int64"
+    assert str(df["amount"].dtype) == "float64"
+
+    empty = p().sv("SILENT").fq("bq", "SELECT * FROM events WHERE id > 100", dataset_path=str(tmp_path / "empty.arrow")).gdf()
+    assert empty.empty
+    assert list(empty.columns) == ["id", "name", "amount"]
+    assert empty.dtypes.to_dict() == in_memory.dtypes.to_dict()
+
+
+def test_iter_query_streams_result_pages(bigquery):
+    bigquery.load("events", EVENTS)
+    chunks = [c.gdf() for c in p().sv("SILENT").iter_query("bq", "SELECT * FROM events", 3)]
+
+    assert [chunk["id"].tolist() for chunk in chunks] == [[1, 2, 3], [4, 5, 6], [7]]
+    assert all(chunk["name"].dtype == pd.StringDtype("pyarrow") for chunk in chunks)
+
+
+def test_iter_query_pages_on_a_key_column(bigquery):
+    bigquery.load("events", EVENTS)
+    chunks = [c.gdf()["id"].tolist() for c in p().sv("SILENT").iter_query("bq", "SELECT * FROM events", 3, key_column="id")]
+
+    assert chunks == [[1, 2, 3], [4, 5, 6], [7]]
+    # One ordered query read page by page, not one query per chunk
+    assert len(bigquery.queries) == 1
+
+
+def test_streaming_an_empty_result_yields_nothing(bigquery):
+    bigquery.load("events", EVENTS)
+    query = "SELECT * FROM events WHERE id > 100"
+
+    assert list(p().sv("SILENT").iter_query("bq", query, 3)) == []
+    assert list(p().sv("SILENT").iter_query("bq", query, 3, key_column="id")) == []
+
+
+def test_fcq_reads_bigquery_in_chunks(bigquery):
+    bigquery.load("events", EVENTS)
+    for kwargs in ({"key_column": "id"}, {"key_column": "id", "parallel": 2}):
+        df = p().sv("SILENT").fcq("bq", "SELECT * FROM events", 3, **kwargs).gdf()
+        assert df["id"].tolist() == list(range(1, 8)), kwargs
+
+    empty = p().sv("SILENT").fcq("bq", "SELECT * FROM events WHERE id > 100", 3, key_column="id").gdf()
+    assert empty.empty
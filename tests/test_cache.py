@@ -0,0 +1,40 @@
+import sqlite3
+
+import pytest
+
+from rgwml import _cache
+from rgwml.p import p
+
+
+@pytest.fixture
+def cached_db(mysql_db, tmp_path, monkeypatch):
+    monkeypatch.setenv("RGWML_CACHE_DIR", str(tmp_path / "cache"))
+    with sqlite3.connect(mysql_db.path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT, amount REAL)")
+        conn.executemany("INSERT INTO t VALUES (?, ?, ?)", [(1, "a", 1.5), (2, None, None), (3, "c", 3.0)])
+    return mysql_db
+
+
+def test_miss_and_hit_return_the_same_dtypes(cached_db):
+    miss = p().sv("SILENT").fq("my", "SELECT * FROM t", cache_ttl=60).gdf()
+    hit = p().sv("SILENT").fq("my", "SELECT * FROM t", cache_ttl=60).gdf()
+
+    assert _cache.stats()["hits"] >= 1
+    assert miss.dtypes.to_dict() == hit.dtypes.to_dict()
+    assert miss.equals(hit)
+
+
+def test_hit_skips_the_database(cached_db):
+    p().sv("SILENT").fq("my", "SELECT * FROM t", cache_ttl=60)
+    with sqlite3.connect(cached_db.path) as conn:
+        conn.execute("DELETE FROM t")
+
+    assert len(p().sv("SILENT").fq("my", "SELECT * FROM t", cache_ttl=60).gdf()) == 3
+    assert len(p().sv("SILENT").fq("my", "SELECT * FROM t", cache_ttl=60, cache_refresh=True).gdf()) == 0
+
+
+def test_key_depends_on_the_user():
+    preset = {"name": "my", "db_type": "mysql", "host": "h", "username": "alice", "database": "d"}
+
+    assert _cache.key(preset, "SELECT 1") != _cache.key(dict(preset, username="bob"), "SELECT 1")
+    assert _cache.key(preset, "SELECT  1;") == _cache.key(dict(preset), "SELECT 1")
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from rgwml.p import p
+
+
+def _frame():
+    return p(df=pd.DataFrame({"a": [1.0, np.nan, 3.0], "b": ["x", "y", "z"]})).sv("SILENT")
+
+
+def test_in_place_write_to_clone_leaves_parent_unchanged():
+    d = _frame()
+    c = d.cl()
+    c.gdf().iloc[0, 0] = 99.0
+    c.gdf().fillna({"a": -1}, inplace=True)
+
+    assert d.gdf()["a"].tolist()[0] == 1.0
+    assert d.gdf()["a"].isna().sum() == 1
+    assert c.gdf()["a"].tolist()[0] == 99.0
+
+
+def test_in_place_write_to_parent_leaves_clone_unchanged():
+    d = _frame()
+    c = d.cl()
+    d.gdf().iloc[0, 0] = 99.0
+
+    assert c.gdf()["a"].tolist()[0] == 1.0
+
+
+def test_gdf_keeps_returning_the_same_frame():
+    d = _frame()
+    d.cl()
+    df = d.gdf()
+    df.iloc[0, 0] = 5.0
+
+    assert d.gdf() is df
+    assert d.gdf()["a"].tolist()[0] == 5.0
+
+
+def test_clone_methods_do_not_reach_the_parent():
+    d = _frame()
+    c = d.cl()
+    c.ur("a > 2", {"a": 0})
+
+    assert d.gdf()["a"].tolist()[2] == 3.0
+    assert c.gdf()["a"].tolist()[2] == 0
+
+
+def test_writes_through_the_df_attribute_stay_on_their_side():
+    d = _frame()
+    c = d.cl()
+    c.df.loc[0, "a"] = 100.0
+    c.df.fillna({"a": -1}, inplace=True)
+    d.df.loc[2, "b"] = "changed"
+
+    assert d.df["a"].tolist()[0] == 1.0
+    assert d.df["a"].isna().sum() == 1
+    assert c.df["a"].tolist()[:2] == [100.0, -1]
+    assert c.df["b"].tolist()[2] == "z"
+
+
+def test_clone_copies_nothing_until_the_frame_is_exported():
+    d = _frame()
+    c = d.cl().asc("k", 1)
+
+    assert np.shares_memory(c._df["b"].values, d._df["b"].values)
+    exported = c.df
+    assert not np.shares_memory(exported["b"].values, d._df["b"].values)
@@ -0,0 +1,33 @@
+import sqlite3
+
+import pytest
+
+from rgwml.p import p
+
+
+@pytest.fixture
+def orders(mysql_db):
+    with sqlite3.connect(mysql_db.path) as conn:
+        conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, customer TEXT, amount REAL)")
+        conn.executemany("INSERT INTO orders VALUES (?, ?, ?)", [(i, f"c{i % 3}", None if i % 4 == 0 else i * 1.5) for i in range(1, 12)])
+    return mysql_db
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"key_column": "id"}, {"key_column": "id", "parallel": 2}])
+def test_dataset_path_gives_the_same_frame(orders, tmp_path, kwargs):
+    in_memory = p().sv("SILENT").fcq("my", "SELECT * FROM orders", 4, **kwargs).gdf()
+    on_disk = p().sv("SILENT").fcq("my", "SELECT * FROM orders", 4, dataset_path=str(tmp_path / "orders"), **kwargs).gdf()
+
+    assert in_memory.dtypes.to_dict() == on_disk.dtypes.to_dict()
+    assert str(on_disk["id"].dtype) == "int64"
+    assert str(on_disk["amount"].dtype) == "float64"
+    assert in_memory.equals(on_disk)
+
+
+@pytest.mark.parametrize("kwargs", [{"key_column": "id"}, {"key_column": "id", "parallel": 2}])
+def test_keyset_chunks_are_not_printed_when_silent(orders, capsys, kwargs):
+    p().sv("SILENT").fcq("my", "SELECT * FROM orders", 4, **kwargs)
+    assert capsys.readouterr().out == ""
+
+    p().sv("FULL").fcq("my", "SELECT * FROM orders", 4, **kwargs)
+    assert "c1" in capsys.readouterr().out
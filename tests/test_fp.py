@@ -0,0 +1,165 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rgwml.p import p
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "orders.csv"
+    lines = ["id,zip,city,amount"] + [f"{i},{i:05d},{'' if i % 4 == 0 else 'c' + str(i % 3)},{i * 1.5}" for i in range(1, 26)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def _concat(chunks):
+    return pd.concat([c.gdf() for c in chunks], ignore_index=True)
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"dtype": {"zip": "string"}}, {"compat": True}])
+def test_iter_file_types_csv_chunks_like_fp(csv_path, kwargs):
+    eager = p().sv("SILENT").fp(csv_path, **kwargs).gdf()
+    chunks = list(p().sv("SILENT").iter_file(csv_path, 10, **kwargs))
+
+    assert [len(c.gdf()) for c in chunks] == [10, 10, 5]
+    pd.testing.assert_frame_equal(_concat(chunks), eager)
+
+
+def test_iter_file_keeps_leading_zeros_with_dtype(csv_path):
+    chunk = next(iter(p().sv("SILENT").iter_file(csv_path, 10, dtype={"zip": "string"}))).gdf()
+    assert chunk["zip"].tolist()[:2] == ["00001", "00002"]
+
+
+def test_iter_file_parquet_matches_fp(csv_path, tmp_path):
+    path = str(tmp_path / "orders.parquet")
+    p().sv("SILENT").fp(csv_path).gdf().to_parquet(path)
+    eager = p().sv("SILENT").fp(path).gdf()
+
+    pd.testing.assert_frame_equal(_concat(p().sv("SILENT").iter_file(path, 10)), eager, check_dtype=False)
+
+
+def _pipeline(d, group=False):
+    d = d.f("amount > 3").acc("amount * id", "weighted").ddrf("city").lim(20)
+    return d.g(["city"], ["weighted::sum", "amount::mean", "id::count"]) if group else d
+
+
+@pytest.mark.parametrize("group", [False, True])
+def test_chunked_fp_matches_eager(csv_path, group):
+    eager = _pipeline(p().sv("SILENT").fp(csv_path), group).gdf()
+    chunked = _pipeline(p().sv("SILENT").lz().fp(csv_path, chunk_size=4), group).gdf()
+
+    pd.testing.assert_frame_equal(chunked.reset_index(drop=True), eager.reset_index(drop=True), check_dtype=False)
+
+
+def test_chunked_lim_and_ddrf_carry_across_chunks(csv_path):
+    eager = p().sv("SILENT").fp(csv_path).ddrf("city").gdf()
+    chunked = p().sv("SILENT").lz().fp(csv_path, chunk_size=3).ddrf("city").gdf()
+    assert chunked["id"].tolist() == eager["id"].tolist()
+
+    assert len(p().sv("SILENT").lz().fp(csv_path, chunk_size=3).lim(7).gdf()) == 7
+
+
+def test_ddrf_keeps_distinct_keys_whose_hashes_collide(monkeypatch):
+    p_module = importlib.import_module("rgwml.p")
+    monkeypatch.setattr(pd.util, "hash_pandas_object", lambda obj, index=False: pd.Series(np.zeros(len(obj), dtype=np.uint64)))
+    seen = None
+    kept = []
+    for chunk in [pd.DataFrame({"k": ["a", "b", "a"]}), pd.DataFrame({"k": ["c", "b", None]}), pd.DataFrame({"k": [None, "d", "a"]})]:
+        first, seen = p_module._first_occurrences(chunk, ["k"], seen)
+        kept += chunk["k"][first].tolist()
+
+    assert kept == ["a", "b", "c", None, "d"]
+
+
+@pytest.fixture
+def parquet_path(tmp_path):
+    path = str(tmp_path / "events.parquet")
+    pd.DataFrame({
+        "id": range(1, 41),
+        "city": [None if i % 7 == 0 else f"c{i % 4}" for i in range(1, 41)],
+        "amount": [None if i % 5 == 0 else i * 1.5 for i in range(1, 41)],
+        "day": pd.date_range("2024-01-01", periods=40, freq="D"),
+    }).to_parquet(path, row_group_size=8)
+    return path
+
+
+@pytest.mark.parametrize("expr", [
+    "amount > 30",
+    "city == 'c1' and amount <= 45",
+    "city != 'c2'",
+    "city not in ['c0', 'c3']",
+    "day >= '2024-01-20' or id < 3",
+    "city.str.contains('1', na=False)",
+])
+def test_fp_filter_expr_matches_eager_filter(parquet_path, expr):
+    eager = p().sv("SILENT").fp(parquet_path).f(expr).gdf().reset_index(drop=True)
+    pushed = p().sv("SILENT").fp(parquet_path, filter_expr=expr).gdf()
+
+    pd.testing.assert_frame_equal(pushed, eager)
+
+
+def test_fp_filter_expr_with_usecols_drops_the_filter_columns(parquet_path):
+    pushed = p().sv("SILENT").fp(parquet_path, usecols=["id"], filter_expr="amount > 30 and city == 'c1'").gdf()
+    eager = p().sv("SILENT").fp(parquet_path).f("amount > 30 and city == 'c1'").gdf()
+
+    assert list(pushed.columns) == ["id"]
+    assert pushed["id"].tolist() == eager["id"].tolist()
+
+
+@pytest.fixture
+def partitioned(tmp_path):
+    root = tmp_path / "events"
+    files = []
+    for day in ["2024-01-02", "2024-01-01", "2024-01-03"]:
+        for region in ["west", "east"]:
+            directory = root / f"dt={day}" / f"region={region}"
+            directory.mkdir(parents=True)
+            start = len(files) * 10
+            frame = pd.DataFrame({"id": range(start, start + 10), "amount": [i * 0.5 for i in range(start, start + 10)]})
+            frame.to_parquet(directory / "part-0.parquet")
+            files.append((str(directory / "part-0.parquet"), day, region, frame))
+    (root / "_SUCCESS").write_text("")
+    return str(root), sorted(files)
+
+
+def _sequential(files):
+    return pd.concat([frame.assign(dt=day, region=region) for _, day, region, frame in files], ignore_index=True)
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_fp_directory_reads_files_in_path_order(partitioned, workers):
+    root, files = partitioned
+    loaded = p().sv("SILENT").fp(root, workers=workers).gdf()
+
+    expected = _sequential(files)
+    assert list(loaded.columns) == ["id", "amount", "dt", "region"]
+    assert loaded["id"].tolist() == expected["id"].tolist()
+    assert loaded["region"].tolist() == expected["region"].tolist()
+    assert loaded["dt"].astype(str).tolist() == expected["dt"].tolist()
+
+
+def test_fp_glob_matches_across_worker_counts(partitioned):
+    root, files = partitioned
+    pattern = root + "/dt=*/region=east/*.parquet"
+    one = p().sv("SILENT").fp(pattern, workers=1).gdf()
+    many = p().sv("SILENT").fp(pattern, workers=4).gdf()
+
+    pd.testing.assert_frame_equal(one, many)
+    assert one["id"].tolist() == _sequential([f for f in files if f[2] == "east"])["id"].tolist()
+
+
+@pytest.mark.parametrize("expr", [
+    "region == 'east'",
+    "region == 'east' and amount > 10",
+    "region == 'west' or amount > 25",
+    "region == 'north'",
+])
+def test_fp_directory_filter_matches_eager_filter(partitioned, expr):
+    root, _ = partitioned
+    eager = p().sv("SILENT").fp(root).f(expr).gdf().reset_index(drop=True)
+    pushed = p().sv("SILENT").fp(root, filter_expr=expr, workers=3).gdf()
+
+    pd.testing.assert_frame_equal(pushed, eager)
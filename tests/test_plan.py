@@ -0,0 +1,97 @@
+import pandas as pd
+import pytest
+
+from rgwml import _plan
+from rgwml.p import p
+
+
+def _frame():
+    return pd.DataFrame({
+        "a": [5, 1, 7, 3, 9],
+        "b": ["x", "y", "z", "x", "y"],
+        "c": [1.0, 2.0, 3.0, 4.0, 5.0],
+        "d": ["p", "q", "r", "s", "t"],
+    }, index=[10, 20, 30, 40, 50])
+
+
+PIPELINES = [
+    [("f", ("a > 2",)), ("f", ("c < 5",))],
+    [("acc", ("a + c", "s")), ("f", ("a > 2",)), ("rtc", (["a", "s"],))],
+    [("acc", ("a + c", "unused")), ("lim", (3,)), ("rtc", (["a", "b"],))],
+    [("abc", ("a > 2", "big")), ("f", ("c > 1",)), ("cs", (["a::DESC"],))],
+    [("lim", (4,)), ("f", ("a > 2",))],
+    [("rnc", ({"a": "aa"},)), ("f", ("aa > 2",)), ("ddrf", ("b",))],
+    [("f", ("a > 1",)), ("g", (["b"], ["a::sum", "c::mean"])), ("rtc", (["b", "a_sum"],))],
+]
+
+
+def _run(steps, lazy):
+    d = p(df=_frame()).sv("SILENT")
+    if lazy:
+        d.lz()
+    for name, args in steps:
+        getattr(d, name)(*args)
+    return d.gdf()
+
+
+@pytest.mark.parametrize("steps", PIPELINES)
+def test_lazy_matches_eager_and_keeps_the_index(steps):
+    eager = _run(steps, lazy=False)
+    lazy = _run(steps, lazy=True)
+
+    pd.testing.assert_frame_equal(lazy, eager)
+
+
+def _plan_of(*steps):
+    d = p(df=_frame()).sv("SILENT").lz()
+    for name, args in steps:
+        getattr(d, name)(*args)
+    return d._optimized_plan()
+
+
+def test_adjacent_filters_are_fused():
+    plan = _plan_of(("f", ("a > 2",)), ("f", ("c < 5",)), ("f", ("b == 'x'",)))
+    filters = [step for step in plan if step.op == "f"]
+
+    assert len(filters) == 1
+    assert filters[0].params["filter_expr"] == "((a > 2) and (c < 5)) and (b == 'x')"
+
+
+def test_filters_and_limits_move_ahead_of_appends():
+    plan = _plan_of(("acc", ("a + c", "s")), ("f", ("a > 2",)), ("lim", (2,)), ("rtc", (["a", "s"],)))
+    assert [step.op for step in plan] == [_plan.PROJECT, "f", "lim", "acc", "rtc"]
+
+    # A filter on the appended column has to wait for it
+    plan = _plan_of(("acc", ("a + c", "s")), ("f", ("s > 2",)), ("rtc", (["a", "s"],)))
+    assert [step.op for step in plan] == [_plan.PROJECT, "acc", "f", "rtc"]
+
+
+def test_unread_columns_and_appends_are_pruned():
+    plan = _plan_of(("acc", ("a + c", "unused")), ("f", ("a > 2",)), ("g", (["b"], ["a::sum", "c::max"])), ("rtc", (["b", "a_sum"],)))
+
+    assert [step.op for step in plan] == [_plan.PROJECT, "f", "g", "rtc"]
+    assert plan[0].params["columns"] == ["a", "b"]
+    assert plan[2].params["agg_funcs"] == ["a::sum"]
+
+
+def test_columns_are_pruned_into_a_parquet_source(tmp_path):
+    path = str(tmp_path / "t.parquet")
+    _frame().reset_index(drop=True).to_parquet(path)
+    d = p().sv("SILENT").lz().fp(path).f("a > 2").rtc(["a", "b"])
+    plan = d._optimized_plan()
+
+    assert plan[0].op == "fp"
+    assert plan[0].params["usecols"] == ["a", "b"]
+    assert plan[0].params["filter_expr"] == "a > 2"
+
+
+def test_filters_pushed_into_a_source_renumber_the_rows(tmp_path):
+    path = str(tmp_path / "t.parquet")
+    _frame().reset_index(drop=True).to_parquet(path)
+    eager = p().sv("SILENT").fp(path).f("a > 2").rtc(["a", "b"]).gdf()
+    lazy = p().sv("SILENT").lz().fp(path).f("a > 2").rtc(["a", "b"]).gdf()
+
+    # Documented: the reader never sees the filtered-out rows, so their labels are gone
+    assert eager.index.tolist() == [0, 2, 3, 4]
+    assert lazy.index.tolist() == [0, 1, 2, 3]
+    pd.testing.assert_frame_equal(lazy, eager.reset_index(drop=True))
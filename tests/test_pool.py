@@ -0,0 +1,114 @@
+import time
+import sqlite3
+import threading
+
+import pytest
+
+from rgwml import _pool
+from rgwml.p import p
+
+
+def _fill(db, rows=10):
+    with sqlite3.connect(db.path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?, ?)", [(i, f"v{i}") for i in range(1, rows + 1)])
+
+
+def test_connections_are_reused_and_rolled_back(mysql_db):
+    _fill(mysql_db)
+    with _pool.connection(mysql_db.preset, "d") as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("DELETE FROM t")
+    with _pool.connection(mysql_db.preset, "d") as again:
+        with again.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM t")
+            assert cursor.fetchone() == (10,)
+
+    assert again is conn
+    assert len(mysql_db.opened) == 1
+
+
+def test_pool_never_exceeds_max_size(mysql_db):
+    preset = {**mysql_db.preset, "pool_size": 2}
+    borrowed = threading.Event()
+
+    def third():
+        with _pool.connection(preset, "d"):
+            borrowed.set()
+
+    with _pool.connection(preset, "d") as first:
+        with _pool.connection(preset, "d"):
+            waiter = threading.Thread(target=third)
+            waiter.start()
+            assert not borrowed.wait(0.2)
+            assert len(mysql_db.opened) == 2
+        assert borrowed.wait(5)
+        waiter.join()
+
+    assert len(mysql_db.opened) == 2
+    assert not first.closed
+
+
+def test_idle_connections_are_evicted(mysql_db):
+    preset = {**mysql_db.preset, "pool_idle_timeout": 0.05}
+    with _pool.connection(preset, "d") as first:
+        pass
+    time.sleep(0.1)
+    with _pool.connection(preset, "d") as second:
+        pass
+
+    assert second is not first
+    assert first.closed
+    assert not second.closed
+
+
+def test_dead_connections_are_dropped(mysql_db):
+    with _pool.connection(mysql_db.preset, "d") as first:
+        pass
+    first.alive = False
+    with _pool.connection(mysql_db.preset, "d") as second:
+        pass
+
+    assert second is not first
+    assert first.closed
+    assert len(mysql_db.opened) == 2
+
+
+def test_connection_is_released_when_the_block_raises(mysql_db):
+    preset = {**mysql_db.preset, "pool_size": 1}
+    with pytest.raises(RuntimeError):
+        with _pool.connection(preset, "d") as first:
+            raise RuntimeError("boom")
+
+    assert first.closed
+    # The only slot is free again, so this does not block
+    with _pool.connection(preset, "d") as second:
+        assert not second.closed
+    assert len(mysql_db.opened) == 2
+
+
+def test_pool_size_zero_disables_pooling(mysql_db):
+    preset = {**mysql_db.preset, "pool_size": 0}
+    with _pool.connection(preset, "d") as first:
+        pass
+    with _pool.connection(preset, "d") as second:
+        pass
+
+    assert first.closed and second.closed
+    assert _pool._pools == {}
+
+
+def test_queries_borrow_pooled_connections(mysql_db):
+    _fill(mysql_db, rows=25)
+
+    d = p().sv("SILENT").fq("my", "SELECT * FROM t")
+    assert d.gdf()["id"].tolist() == list(range(1, 26))
+
+    for kwargs in ({"key_column": "id"}, {"key_column": "id", "parallel": 3}, {}):
+        d = p().sv("SILENT").fcq("my", "SELECT * FROM t", 4, **kwargs)
+        assert d.gdf()["id"].tolist() == list(range(1, 26)), kwargs
+
+    chunks = [c.gdf()["id"].tolist() for c in p().sv("SILENT").iter_query("my", "SELECT * FROM t", 10, key_column="id")]
+    assert chunks == [list(range(1, 11)), list(range(11, 21)), list(range(21, 26))]
+
+    assert len(mysql_db.opened) <= _pool.DEFAULT_POOL_SIZE
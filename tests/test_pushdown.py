@@ -0,0 +1,112 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from rgwml.p import p
+
+
+@pytest.fixture
+def sales(mysql_db):
+    with sqlite3.connect(mysql_db.path) as conn:
+        conn.execute("CREATE TABLE sales (id INTEGER PRIMARY KEY, city TEXT, amount REAL, qty INTEGER)")
+        conn.executemany("INSERT INTO sales VALUES (?, ?, ?, ?)", [
+            (1, "Delhi", 10.0, 1), (2, "delhi", 20.0, 2), (3, "Pune", 30.0, None),
+            (4, "Delhi", 40.0, 4), (5, "Goa", 50.0, 5), (6, "Delhi", 60.0, 6),
+        ])
+    return mysql_db
+
+
+def _lazy(*steps, query="SELECT * FROM sales"):
+    d = p().sv("SILENT").lz().fq("my", query)
+    for name, args in steps:
+        getattr(d, name)(*args)
+    return d
+
+
+def _eager(*steps, query="SELECT * FROM sales"):
+    d = p().sv("SILENT").fq("my", query)
+    for name, args in steps:
+        getattr(d, name)(*args)
+    return d.gdf()
+
+
+def _sent(db, *steps, query="SELECT * FROM sales"):
+    """The query the lazy plan sends, and its result."""
+    del db.queries[:]
+    df = _lazy(*steps, query=query).gdf()
+    return db.queries[-1], df
+
+
+def _same(lazy, eager):
+    # The driver returns rows, so a column's dtype depends on whether the fetched rows hold a NULL
+    pd.testing.assert_frame_equal(lazy.reset_index(drop=True), eager.reset_index(drop=True), check_dtype=False)
+
+
+def test_filters_columns_and_limits_run_in_the_database(sales):
+    steps = [("f", ("amount > 15 and qty <= 5",)), ("rtc", (["id", "amount"],)), ("lim", (2,))]
+    sql, df = _sent(sales, *steps)
+
+    assert sql == "SELECT `id`, `amount` FROM (SELECT * FROM sales) AS rgwml_src WHERE (`amount` > 15) AND (`qty` <= 5) LIMIT 2"
+    _same(df, _eager(*steps))
+
+
+def test_negations_keep_nulls_like_pandas(sales):
+    steps = [("f", ("qty != 2",))]
+    sql, df = _sent(sales, *steps)
+
+    assert "WHERE (`qty` <> 2 OR `qty` IS NULL)" in sql
+    _same(df, _eager(*steps))
+
+
+def test_untranslatable_filters_stay_local(sales):
+    steps = [("f", ("amount + qty > 30",))]
+    sql, df = _sent(sales, *steps)
+
+    assert sql == "SELECT * FROM sales"
+    _same(df, _eager(*steps))
+
+
+def test_translatable_part_of_a_filter_is_pushed_and_the_rest_applied_locally(sales):
+    steps = [("f", ("amount > 15 and amount + qty > 45",))]
+    sql, df = _sent(sales, *steps)
+
+    assert sql == "SELECT * FROM (SELECT * FROM sales) AS rgwml_src WHERE (`amount` > 15)"
+    _same(df, _eager(*steps))
+
+
+def test_case_insensitive_string_equality_is_only_a_prefilter(sales):
+    # MySQL collations would match 'delhi' too, so pandas still filters the fetched rows
+    steps = [("f", ("city == 'Delhi'",)), ("lim", (2,))]
+    sql, df = _sent(sales, *steps)
+
+    assert sql == "SELECT * FROM (SELECT * FROM sales) AS rgwml_src WHERE (`city` = 'Delhi')"
+    assert df["id"].tolist() == [1, 4]
+    _same(df, _eager(*steps))
+
+
+def test_filters_after_a_limit_are_not_pushed(sales):
+    steps = [("lim", (3,)), ("f", ("amount > 15",))]
+    sql, df = _sent(sales, *steps)
+
+    assert sql == "SELECT * FROM (SELECT * FROM sales) AS rgwml_src LIMIT 3"
+    assert df["id"].tolist() == [2, 3]
+    _same(df, _eager(*steps))
+
+
+def test_queries_with_order_by_run_as_written(sales):
+    query = "SELECT * FROM sales ORDER BY amount DESC"
+    steps = [("f", ("amount > 15",)), ("lim", (2,))]
+    sql, df = _sent(sales, *steps, query=query)
+
+    assert sql == query
+    _same(df, _eager(*steps, query=query))
+
+
+def test_string_literals_are_escaped(sales):
+    # MySQL escapes with backslashes, which sqlite3 cannot run, so only the plan is checked
+    plan = _lazy(("f", ("city == \"O'Neil\" or amount > 55",)))._optimized_plan()
+    assert plan[0].params["query"] == "SELECT * FROM (SELECT * FROM sales) AS rgwml_src WHERE ((`city` = 'O\\'Neil') OR (`amount` > 55))"
+
+    # String != is not pushed to a case-insensitive dialect at all
+    assert _sent(sales, ("f", ("city != 'Goa'",)))[0] == "SELECT * FROM sales"
@@ -0,0 +1,103 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from rgwml.p import p
+
+
+@pytest.fixture(params=["ssh", "local"])
+def host(request, home, tmp_path, fake_ssh):
+    """A sqlite3 preset executing remotely, over a fake ssh that runs sqlite3 locally or directly."""
+    path = str(tmp_path / "app.sqlite")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, code TEXT, amount REAL)")
+        conn.executemany("INSERT INTO t VALUES (?, ?, ?)", [(1, "007", 1.5), (2, "NA", None), (3, "", 3.0), (4, None, 4.0)])
+    conn.close()
+
+    preset = {"name": "lite", "db_type": "sqlite3", "execution": "remote", "db_path": path, "host": "host", "ssh_user": "me"}
+    if request.param == "local":
+        preset["transport"] = "local"
+    home(preset)
+    return path
+
+
+def _count(path):
+    with sqlite3.connect(path) as conn:
+        count = conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_text_is_not_inferred(host):
+    df = p().sv("SILENT").fslhr("lite", "SELECT * FROM t ORDER BY id").gdf()
+
+    assert df["code"].tolist()[:3] == ["007", "NA", ""]
+    assert df["code"].isna().tolist() == [False, False, False, True]
+    assert df["code"].dtype == pd.StringDtype("pyarrow")
+    assert df["id"].dtype == "int64"
+    assert df["amount"].dtype == "float64"
+    assert df["amount"].isna().tolist() == [False, True, False, False]
+
+
+def test_duplicate_and_mixed_columns(host):
+    df = p().sv("SILENT").sldbq("lite", "SELECT id, id, CASE WHEN id > 2 THEN 'x' ELSE id END AS mixed FROM t ORDER BY id").gdf()
+
+    assert list(df.columns) == ["id", "id", "mixed"]
+    assert df["mixed"].tolist() == ["1", "2", "x", "x"]
+
+
+def test_empty_result(host):
+    df = p().sv("SILENT").fslhr("lite", "SELECT * FROM t WHERE id > 100").gdf()
+
+    assert df.empty
+    assert list(df.columns) == ["id", "code", "amount"]
+
+
+@pytest.mark.parametrize("query", [
+    "SELECT id AS key, amount * 2 AS doubled FROM t WHERE 0 -- nothing",
+    "WITH big AS (SELECT * FROM t WHERE amount > 100) SELECT id AS key, amount AS doubled FROM big;",
+])
+def test_empty_result_keeps_aliased_columns(host, query):
+    assert list(p().sv("SILENT").fslhr("lite", query).gdf().columns) == ["key", "doubled"]
+
+
+def test_empty_result_of_several_statements_has_no_columns(host):
+    assert p().sv("SILENT").fslhr("lite", "SELECT id FROM t WHERE 0; SELECT code FROM t WHERE 0").gdf().columns.empty
+
+
+def test_trailing_comment_on_a_read(host):
+    df = p().sv("SILENT").fslhr("lite", "SELECT id FROM t WHERE id = 1 -- just the first").gdf()
+    assert df["id"].tolist() == [1]
+
+
+def test_trailing_comment_on_a_write_still_commits(host):
+    p().sv("SILENT").sldbq("lite", "INSERT INTO t VALUES (5, '005', 5.0); -- add five")
+    p().sv("SILENT").sldbq("lite", "DELETE FROM t WHERE id = 1 -- and drop one")
+
+    assert _count(host) == 4
+    assert p().sv("SILENT").fslhr("lite", "SELECT code FROM t WHERE id = 5").gdf()["code"].tolist() == ["005"]
+
+
+def test_failed_write_rolls_back(host):
+    with pytest.raises(ValueError, match="SQLite error"):
+        p().sv("SILENT").sldbq("lite", "INSERT INTO t VALUES (5, 'x', 1.0); INSERT INTO missing VALUES (1)")
+
+    assert _count(host) == 4
+    # No transaction was left open on the host
+    p().sv("SILENT").sldbq("lite", "UPDATE t SET code = 'y' WHERE id = 4")
+    assert _count(host) == 4
+
+
+def test_selects_with_different_columns_are_rejected(host):
+    with pytest.raises(ValueError, match="different columns"):
+        p().sv("SILENT").fslhr("lite", "SELECT id FROM t; SELECT code FROM t")
+
+
+def test_ssh_runs_sqlite3_on_the_host(host, fake_ssh, request):
+    p().sv("SILENT").fslhr("lite", "SELECT 1")
+    if request.node.callspec.params["host"] == "local":
+        assert not fake_ssh.exists()
+    else:
+        assert "me@host" in fake_ssh.read_text()
+        assert "sqlite3" in fake_ssh.read_text()
@@ -0,0 +1,151 @@
+import os
+import types
+import sqlite3
+
+import pytest
+
+from rgwml import _replica
+from rgwml.p import p
+
+
+@pytest.fixture(params=["local", "ssh"])
+def remote(request, home, tmp_path, monkeypatch, fake_ssh):
+    """A sqlite3 preset whose "remote" database is a file in a local directory, read directly or over a fake ssh."""
+    path = tmp_path / "remote" / "app.sqlite"
+    path.parent.mkdir()
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?, ?)", [(1, "a"), (2, "b")])
+
+    downloads = []
+    download = _replica._download
+
+    def counting(db_preset, replica_path):
+        downloads.append(replica_path)
+        download(db_preset, replica_path)
+
+    monkeypatch.setattr(_replica, "_download", counting)
+    preset = {"name": "lite", "db_type": "sqlite3", "transport": request.param, "db_path": str(path), "host": "host", "ssh_user": "me"}
+    home(preset)
+    return types.SimpleNamespace(path=str(path), preset=preset, downloads=downloads)
+
+
+def _ids(**kwargs):
+    return p().sv("SILENT").fslh("lite", "SELECT id FROM t ORDER BY id", **kwargs).gdf()["id"].tolist()
+
+
+def _write(path, *statements):
+    with sqlite3.connect(path) as conn:
+        for statement in statements:
+            conn.execute(statement)
+    conn.close()
+
+
+def test_cold_fetch_downloads_the_database(remote):
+    assert _ids() == [1, 2]
+    assert len(remote.downloads) == 1
+    assert os.path.exists(remote.downloads[0])
+    assert os.path.dirname(remote.downloads[0]) == _replica.replica_dir()
+
+
+def test_warm_hit_reuses_the_replica(remote):
+    _ids()
+    assert _ids() == [1, 2]
+    assert p().sv("SILENT").sldbq("lite", "SELECT COUNT(*) AS n FROM t").gdf()["n"].tolist() == [2]
+    assert len(remote.downloads) == 1
+
+
+def test_changed_remote_is_downloaded_again(remote):
+    _ids()
+    _write(remote.path, "INSERT INTO t VALUES (3, 'c')")
+
+    assert _ids() == [1, 2, 3]
+    assert len(remote.downloads) == 2
+
+
+def test_mtime_change_alone_triggers_a_download(remote):
+    _ids()
+    stat = os.stat(remote.path)
+    os.utime(remote.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    _ids()
+    assert len(remote.downloads) == 2
+
+
+def test_size_change_alone_triggers_a_download(remote):
+    _ids()
+    stat = os.stat(remote.path)
+    _write(remote.path, "CREATE TABLE padding (x)", "INSERT INTO padding VALUES (zeroblob(100000))")
+    os.utime(remote.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    _ids()
+    assert len(remote.downloads) == 2
+
+
+def test_same_size_write_within_a_second_triggers_a_download(remote):
+    _ids()
+    stat = os.stat(remote.path)
+    _write(remote.path, "UPDATE t SET v = 'z' WHERE id = 1")
+    # Same second, different fraction: a whole-second mtime would miss this write
+    second, fraction = divmod(stat.st_mtime_ns, 10**9)
+    os.utime(remote.path, ns=(stat.st_atime_ns, second * 10**9 + (fraction + 1000) % 10**9))
+
+    assert os.stat(remote.path).st_size == stat.st_size
+    assert p().sv("SILENT").fslh("lite", "SELECT v FROM t WHERE id = 1").gdf()["v"].tolist() == ["z"]
+    assert len(remote.downloads) == 2
+
+
+def test_write_that_keeps_size_and_mtime_is_caught_by_the_change_counter(remote):
+    _ids()
+    stat = os.stat(remote.path)
+    _write(remote.path, "UPDATE t SET v = 'z' WHERE id = 1")
+    os.utime(remote.path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert os.stat(remote.path).st_size == stat.st_size
+    assert p().sv("SILENT").fslh("lite", "SELECT v FROM t WHERE id = 1").gdf()["v"].tolist() == ["z"]
+    assert len(remote.downloads) == 2
+
+
+def test_checksum_is_part_of_the_signature(remote, home):
+    home(dict(remote.preset, replica_checksum=True))
+    signature = _replica.remote_signature(dict(remote.preset, replica_checksum=True))
+
+    assert len(signature) == 4
+    assert len(signature[3]) == 64
+    assert _ids() == [1, 2]
+    assert _ids() == [1, 2]
+    assert len(remote.downloads) == 1
+
+
+def test_refresh_downloads_an_unchanged_remote(remote):
+    _ids()
+    _ids(refresh=True)
+    assert len(remote.downloads) == 2
+
+
+def test_max_age_skips_the_remote_check(remote, home):
+    home(dict(remote.preset, replica_max_age=3600))
+    _ids()
+    _write(remote.path, "INSERT INTO t VALUES (3, 'c')")
+
+    assert _ids() == [1, 2]
+    assert _ids(refresh=True) == [1, 2, 3]
+
+
+def test_writes_reach_the_remote_and_keep_the_replica_warm(remote):
+    _ids()
+    p().sv("SILENT").sldbq("lite", "INSERT INTO t VALUES (3, 'c')")
+
+    with sqlite3.connect(remote.path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone() == (3,)
+    assert _ids() == [1, 2, 3]
+    assert len(remote.downloads) == 1
+
+
+def test_failed_write_marks_the_replica_stale(remote):
+    _ids()
+    with pytest.raises(ValueError, match="SQLite error"):
+        p().sv("SILENT").sldbq("lite", "INSERT INTO missing VALUES (1)")
+
+    assert _ids() == [1, 2]
+    assert len(remote.downloads) == 2
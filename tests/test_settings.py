@@ -0,0 +1,49 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+from rgwml.p import p
+
+
+def _import_with(**env):
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    return subprocess.run([sys.executable, "-c", "from rgwml.p import p; print(p.verbosity, p.gc_policy)"],
+                          env={**os.environ, "PYTHONPATH": src, **env}, capture_output=True, text=True)
+
+
+def test_verbosity_env_is_read_case_insensitively():
+    result = _import_with(RGWML_VERBOSITY="silent")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[0] == "SILENT"
+
+
+def test_invalid_verbosity_env_fails_at_import():
+    result = _import_with(RGWML_VERBOSITY="QUIET")
+    assert result.returncode != 0
+    assert "RGWML_VERBOSITY must be one of SILENT, SUMMARY, FULL" in result.stderr
+
+
+def test_sv_rejects_unknown_levels():
+    with pytest.raises(ValueError, match="verbosity must be one of"):
+        p().sv("QUIET")
+
+
+def test_gc_policy_env_accepts_rss_thresholds():
+    result = _import_with(RGWML_GC_POLICY="rss:4096")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[1] == "RSS:4096"
+
+
+@pytest.mark.parametrize("policy, message", [("SOMETIMES", "RGWML_GC_POLICY must be one of"),
+                                             ("RSS:lots", "RGWML_GC_POLICY RSS threshold must be a number")])
+def test_invalid_gc_policy_env_fails_at_import(policy, message):
+    result = _import_with(RGWML_GC_POLICY=policy)
+    assert result.returncode != 0
+    assert message in result.stderr
+
+
+def test_sgc_rejects_unknown_policies():
+    with pytest.raises(ValueError, match="policy must be one of"):
+        p().sgc("SOMETIMES")
@@ -0,0 +1,175 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from rgwml import _pool
+from rgwml.p import p
+
+
+def _table(path, rows, not_null_w=False):
+    with sqlite3.connect(path) as conn:
+        w = "NOT NULL" if not_null_w else "DEFAULT 'w'"
+        conn.execute(f"CREATE TABLE t (id INTEGER, region TEXT, v TEXT, w TEXT {w})")
+        conn.executemany("INSERT INTO t (id, region, v, w) VALUES (?, ?, ?, 'w')", rows)
+    conn.close()
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT id, region, v, w FROM t ORDER BY id IS NULL, id, v").fetchall()
+    conn.close()
+    return rows
+
+
+def _changes():
+    return pd.DataFrame({
+        "id": [1, 3, 3, None, None],
+        "region": ["a", "a", "a", "a", "a"],
+        "v": ["x1", "z1", "z2", "n1", "n2"],
+    })
+
+
+def test_dbiu_counts_and_merges_with_last_row_winning(mysql_db, capsys):
+    _table(mysql_db.path, [(1, "a", "x"), (2, "a", "y")])
+    p(df=_changes()).dbiu("my", "d", "t", ["id", "region"])
+
+    assert "t: 3 rows inserted, 1 rows updated" in capsys.readouterr().out
+    assert _rows(mysql_db.path) == [(1, "a", "x1", "w"), (2, "a", "y", "w"), (3, "a", "z2", "w"), (None, "a", "n1", "w"), (None, "a", "n2", "w")]
+    assert any(" JOIN rgwml_stage_" in query for query in mysql_db.queries)
+
+
+def test_dbiu_writes_only_the_insert_columns(mysql_db):
+    _table(mysql_db.path, [(1, "a", "x"), (2, "a", "y")])
+    df = pd.DataFrame({"id": [2, 5], "region": ["a", "b"], "v": ["y1", "q"], "w": ["ignored", "ignored"]})
+    p(df=df).sv("SILENT").dbiu("my", "d", "t", ["id", "region"], insert_columns=["v"])
+
+    assert _rows(mysql_db.path) == [(1, "a", "x", "w"), (2, "a", "y1", "w"), (5, "b", "q", "w")]
+
+
+def test_dbiu_failure_leaves_the_table_untouched(mysql_db, capsys):
+    _table(mysql_db.path, [(1, "a", "x"), (2, "a", "y")], not_null_w=True)
+    before = _rows(mysql_db.path)
+
+    # The update of key 1 runs first; inserting key 3 without w then fails
+    df = pd.DataFrame({"id": [1, 3], "region": ["a", "a"], "v": ["x1", "z"], "w": [None, None]})
+    p(df=df).dbiu("my", "d", "t", ["id", "region"], insert_columns=["v"])
+
+    assert "Error: NOT NULL constraint failed" in capsys.readouterr().out
+    assert _rows(mysql_db.path) == before
+    with _pool.connection(mysql_db.preset, "d") as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sqlite_temp_master WHERE name LIKE 'rgwml_stage_%'")
+            assert cursor.fetchone() == (0,)
+
+
+INDEXES = {
+    "unique": "CREATE UNIQUE INDEX t_key ON t (id, region)",
+    "plain": None,
+    "non-unique": "CREATE INDEX t_key ON t (id, region)",
+}
+
+
+def _sqlite_table(tmp_path, index, not_null_w=False):
+    path = str(tmp_path / "lite.sqlite")
+    _table(path, [(1, "a", "x"), (2, "a", "y")], not_null_w)
+    if INDEXES[index]:
+        with sqlite3.connect(path) as conn:
+            conn.execute(INDEXES[index])
+        conn.close()
+    return path
+
+
+def _schema(path):
+    with sqlite3.connect(path) as conn:
+        schema = conn.execute("SELECT type, name FROM sqlite_master ORDER BY name").fetchall()
+    conn.close()
+    return schema
+
+
+@pytest.mark.parametrize("index", INDEXES)
+def test_dbiusp_counts_and_merges_with_last_row_winning(tmp_path, capsys, index):
+    path = _sqlite_table(tmp_path, index)
+    schema = _schema(path)
+    p(df=_changes()).dbiusp(path, "t", ["id", "region"], print_query=True)
+
+    out = capsys.readouterr().out
+    assert "t: 3 rows inserted, 1 rows updated" in out
+    assert ("ON CONFLICT (id, region) DO UPDATE" in out) == (index == "unique")
+    # Only a table without an index on the keys gets a temporary one
+    assert ("CREATE INDEX rgwml_key_" in out) == (index == "plain")
+    assert _rows(path) == [(1, "a", "x1", "w"), (2, "a", "y", "w"), (3, "a", "z2", "w"), (None, "a", "n1", "w"), (None, "a", "n2", "w")]
+    assert _schema(path) == schema
+
+
+@pytest.mark.parametrize("index", INDEXES)
+def test_dbiusp_empty_frame_changes_nothing(tmp_path, capsys, index):
+    path = _sqlite_table(tmp_path, index)
+    before = _rows(path)
+    p(df=_changes().head(0)).dbiusp(path, "t", ["id", "region"])
+
+    assert "t: 0 rows inserted, 0 rows updated" in capsys.readouterr().out
+    assert _rows(path) == before
+
+
+@pytest.mark.parametrize("index", INDEXES)
+def test_dbiusp_failure_rolls_back(tmp_path, capsys, index):
+    path = _sqlite_table(tmp_path, index, not_null_w=True)
+    before = _rows(path)
+    schema = _schema(path)
+
+    # Key 1 is updated first; inserting key 3 without w then fails
+    df = pd.DataFrame({"id": [1, 3], "region": ["a", "a"], "v": ["x1", "z"]})
+    p(df=df).dbiusp(path, "t", ["id", "region"], batch_size=1)
+
+    assert "SQLite Error: NOT NULL constraint failed" in capsys.readouterr().out
+    assert _rows(path) == before
+    assert _schema(path) == schema
+
+
+def test_dbiusp_counts_keys_beyond_one_lookup_batch(tmp_path, capsys):
+    path = _sqlite_table(tmp_path, "unique")
+    df = pd.DataFrame({"id": range(1, 1201), "region": "a", "v": "n"})
+    p(df=df).dbiusp(path, "t", ["id", "region"])
+
+    assert "t: 1198 rows inserted, 2 rows updated" in capsys.readouterr().out
+
+
+def test_dbuoi_updates_matches_and_inserts_the_rest_once(mysql_db, capsys):
+    _table(mysql_db.path, [(1, "a", "x"), (2, "a", "y")])
+    df = pd.DataFrame({
+        "id": [1, 1, 3, None],
+        "region": ["a", "a", "a", "a"],
+        "v": ["x1", "x2", "z", "n"],
+        "w": ["new", "new", "new", "new"],
+    })
+    p(df=df).dbuoi("my", "d", "t", ["id", "region"], ["v"])
+
+    assert "t: 2 rows inserted, 1 rows updated" in capsys.readouterr().out
+    # The matched key takes the last duplicate's v and keeps its w; it is not inserted again
+    assert _rows(mysql_db.path) == [(1, "a", "x2", "w"), (2, "a", "y", "w"), (3, "a", "z", "new"), (None, "a", "n", "new")]
+    assert not any(query.startswith("SELECT * FROM t") for query in mysql_db.queries)
+
+
+def test_dbuoi_with_only_matches_inserts_nothing(mysql_db, capsys):
+    _table(mysql_db.path, [(1, "a", "x"), (2, "a", "y")])
+    df = pd.DataFrame({"id": [2, 1], "region": ["a", "a"], "v": ["y1", "x1"]})
+    p(df=df).dbuoi("my", "d", "t", ["id", "region"], ["v"])
+
+    assert "t: 0 rows inserted, 2 rows updated" in capsys.readouterr().out
+    assert _rows(mysql_db.path) == [(1, "a", "x1", "w"), (2, "a", "y1", "w")]
+
+
+def test_dbuoi_failure_rolls_back(mysql_db):
+    _table(mysql_db.path, [(1, "a", "x"), (2, "a", "y")], not_null_w=True)
+    before = _rows(mysql_db.path)
+
+    df = pd.DataFrame({"id": [1, 3], "region": ["a", "a"], "v": ["x1", "z"], "w": ["w", None]})
+    with pytest.raises(sqlite3.IntegrityError, match="NOT NULL"):
+        p(df=df).dbuoi("my", "d", "t", ["id", "region"], ["v"])
+
+    assert _rows(mysql_db.path) == before
+    with _pool.connection(mysql_db.preset, "d") as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM sqlite_temp_master WHERE name LIKE 'rgwml_stage_%'")
+            assert cursor.fetchone() == (0,)